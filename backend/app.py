@@ -1,22 +1,37 @@
 # backend/app.py - Main Flask application
-from flask import Flask, jsonify, request, send_from_directory, session, redirect, url_for, Response, send_file
+from flask import Flask, jsonify, request, send_from_directory, session, redirect, url_for, Response, send_file, stream_with_context, g
 from flask_cors import CORS
 from functools import wraps
 from datetime import datetime, timezone, timedelta
+import hmac
 import json
-import io
-import csv
 import os
+import time
 import uuid
-import requests # For IP geolocation
 from config import config
 # Import new functions for candidate management
 from utils.data_handler import (
-    get_candidates, get_votes, save_votes, get_election_status, save_election_status,
-    add_candidate, remove_candidate, load_translations # <-- Import load_translations
+    get_candidates, get_candidates_json, get_votes, save_votes, get_election_status, save_election_status,
+    add_candidate, remove_candidate, load_translations, # <-- Import load_translations
+    append_vote, snapshot_votes, export_votes_json, VOTES_FILE, get_cache_stats, has_voter_voted,
+    get_results_tally, rebuild_vote_indexes, iter_votes, get_data_version, freeze_votes,
+    get_languages, get_translations_json, get_translations_digest, set_photo_store
 )
 from models import Candidate, Vote, VotesData, ElectionStatus
 from utils.auth import GoogleAuth, VoterSession
+from utils.tally import TallyEngine
+from utils.csv_export import iter_votes_csv, gzip_chunks, parse_layout
+from utils.http_cache import make_etag, conditional_json, json_object
+from utils.events import EventBroker
+from utils.audit_log import AuditLog
+from utils.geoip import LanguageResolver
+from utils.roster import VoterRoster, parse_roster
+from utils.election_phase import PhaseEngine, ElectionSchedule, parse_timestamp
+from utils.metrics import REGISTRY, REQUEST_DURATION, stats_samples
+from utils.outbound import OutboundExecutor, UpstreamUnavailable
+from utils.static_assets import StaticAssets, IMMUTABLE
+from utils.photos import PhotoStore
+from utils.prerender import PageRenderer
 
 def create_app(config_name='default'):
     app = Flask(__name__, static_folder='../frontend')
@@ -24,44 +39,222 @@ def create_app(config_name='default'):
     CORS(app, supports_credentials=True) # Enable CORS with credentials
     app.secret_key = app.config['SECRET_KEY']
 
+    # Bounded pool with deadlines and circuit breakers for calls to Google and ipinfo.io (see utils/outbound.py)
+    outbound = OutboundExecutor(max_workers=app.config['OUTBOUND_MAX_WORKERS'],
+                                max_pending=app.config['OUTBOUND_MAX_PENDING'],
+                                timeout=app.config['OUTBOUND_TIMEOUT'],
+                                failure_threshold=app.config['OUTBOUND_FAILURE_THRESHOLD'],
+                                reset_timeout=app.config['OUTBOUND_RESET_TIMEOUT'])
+
     # Initialize Google Auth utility
     google_auth = GoogleAuth(
         client_id=app.config['GOOGLE_CLIENT_ID'],
         client_secret=app.config['GOOGLE_CLIENT_SECRET'],
-        redirect_uri=app.config['GOOGLE_REDIRECT_URI']
+        redirect_uri=app.config['GOOGLE_REDIRECT_URI'],
+        auth_uri=app.config['GOOGLE_AUTH_URI'],
+        token_uri=app.config['GOOGLE_TOKEN_URI'],
+        certs_url=app.config['GOOGLE_CERTS_URL'],
+        userinfo_url=app.config['GOOGLE_USERINFO_URL'],
+        timeout=app.config['GOOGLE_HTTP_TIMEOUT'],
+        pool_size=app.config['GOOGLE_HTTP_POOL_SIZE'],
+        outbound=outbound
     )
 
-    # Initialize Voter Session utility (in-memory)
-    voter_session = VoterSession()
+    # Candidate photos: fetched once through the outbound pool, then served from PHOTOS_FOLDER (see utils/photos.py)
+    photo_store = None
+    if app.config['PHOTO_CACHE']:
+        try:
+            photo_store = PhotoStore(app.config['PHOTOS_FOLDER'], size=app.config['PHOTO_SIZE'],
+                                     max_bytes=app.config['PHOTO_MAX_BYTES'], timeout=app.config['PHOTO_TIMEOUT'],
+                                     outbound=outbound, allowed_hosts=app.config['PHOTO_ALLOWED_HOSTS'])
+        except RuntimeError as e:
+            print(f"ERROR: Photo cache disabled: {e}. Candidate photos are hot-linked from their source URLs "
+                  f"until this is fixed (or set PHOTO_CACHE=false).")
+    set_photo_store(photo_store)
+
+    # Initialize Voter Session utility (in-memory LRU/TTL store, write-behind persistence)
+    login_log = AuditLog(os.path.join(app.config['DATA_FOLDER'], 'voter_login_log.ndjson'),
+                         max_bytes=app.config['LOGIN_LOG_MAX_BYTES'],
+                         max_age_seconds=app.config['LOGIN_LOG_MAX_AGE_SECONDS'],
+                         compress=app.config['LOGIN_LOG_COMPRESS'])
+    voter_session = VoterSession(ttl_seconds=app.config['SESSION_TTL_SECONDS'],
+                                 max_entries=app.config['SESSION_CACHE_SIZE'],
+                                 flush_interval=app.config['SESSION_FLUSH_INTERVAL'],
+                                 sweep_interval=app.config['SESSION_SWEEP_INTERVAL'],
+                                 login_log=login_log)
+
+    # Eligible voters and admins, indexed by email (roster file + environment lists, reloaded on change)
+    roster = VoterRoster(app.config['VOTER_ROSTER_FILE'],
+                         eligible_env=os.environ.get('PHOENIX_ELIGIBLE_VOTER_EMAILS', ''),
+                         admin_env=os.environ.get('PHOENIX_ADMIN_EMAILS', ''),
+                         use_bloom_filter=app.config['ROSTER_BLOOM_FILTER'],
+                         reload_interval=app.config['ROSTER_RELOAD_INTERVAL'])
+
+    def is_eligible_voter(voter_info):
+        """Current roster eligibility of a session's user (not the flag captured at login)."""
+        return bool(voter_info) and roster.is_eligible(voter_info.get('email'))
+
+    def session_user(voter_info):
+        """The signed-in user as returned by /api/auth/session and /api/bootstrap."""
+        return {
+            'name': voter_info['name'],
+            'email': voter_info['email'],
+            # Include isAdmin flag based on session data
+            'isAdmin': voter_info.get('is_admin', False), # <--- RETURN THIS FLAG
+            'isEligibleVoter': is_eligible_voter(voter_info), # <--- RETURN THIS FLAG (current roster)
+            'hasVoted': voter_info.get('has_voted', False)  # ← Add this line
+        }
+
+    # Replay any ballots journaled since the last snapshot into votes.json
+    snapshot_votes()
+    # Build the has-voted index and results tally up front so the first requests don't pay for it
+    rebuild_vote_indexes()
+
+    # Server-sent events for status transitions and turnout (see utils/events.py)
+    event_broker = EventBroker(poll_interval=app.config['EVENTS_POLL_INTERVAL'],
+                               turnout_interval=app.config['EVENTS_TURNOUT_INTERVAL'],
+                               max_clients=app.config['EVENTS_MAX_CLIENTS'])
+
+    # Election phase engine: the schedule is parsed once per stored version, every route asks it (see utils/election_phase.py)
+    phase_engine = PhaseEngine(get_election_status, check_interval=app.config['ELECTION_PHASE_CHECK_INTERVAL'])
+    final_results = {} # ETag -> pre-serialized results body, filled when the election closes
+
+    def election_status_payload():
+        """Current election status as served by /api/election/status (is_open follows the schedule)."""
+        return phase_engine.payload()
+
+    def results_etag():
+        return make_etag('results', get_data_version('votes'), get_data_version('candidates'))
+
+    def build_results():
+        """Final results: the tally maintained at vote time, joined with the public candidate data."""
+        tally = get_results_tally()
+        return {
+            'isOpen': False,
+            'totalVotes': tally.vote_count,
+            'results': tally.to_results(get_candidates(include_private=False))
+        }
+
+    def on_election_start():
+        freeze_votes(False)
+        final_results.clear()
+        event_broker.publish('status', election_status_payload())
+
+    def on_election_end():
+        # Freeze the ballot store, fold the journal into the snapshot and serialize the final results once
+        freeze_votes(True)
+        event_broker.publish('status', election_status_payload())
+        snapshot_votes()
+        with app.app_context():
+            body = app.json.response(build_results()).get_data()
+        final_results.clear()
+        final_results[results_etag()] = body
+
+    phase_engine.on_start(on_election_start)
+    phase_engine.on_end(on_election_end)
+    phase_engine.start()
 
     # --- NEW: IP-based Language Detection Function ---
+    # Cached, offline-first GeoIP lookups (see utils/geoip.py)
+    geoip_database = app.config['GEOIP_DATABASE']
+    language_resolver = LanguageResolver(
+        database_path=geoip_database if geoip_database and os.path.exists(geoip_database) else None,
+        lookup_url=app.config['GEOIP_LOOKUP_URL'],
+        token=os.environ.get('IPINFO_TOKEN'), # Use environment variable for API token
+        timeout=app.config['GEOIP_TIMEOUT'],
+        cache_size=app.config['GEOIP_CACHE_SIZE'],
+        cache_ttl=app.config['GEOIP_CACHE_TTL'],
+        outbound=outbound,
+        wait=app.config['GEOIP_WAIT']
+    )
+
     def get_user_language(request):
         """Determines user language based on IP or Accept-Language header."""
         # 1. Check Accept-Language header (browser preference)
         accept_language = request.headers.get('Accept-Language')
         if accept_language and 'ar' in accept_language.lower():
             return 'ar'
-        # 2. GeoIP lookup based on IP (requires service like ipinfo.io)
+        # 2. GeoIP lookup based on IP: cache, then local database, then the remote service
         user_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
         try:
-            # Use environment variable for API token
-            ipinfo_token = os.environ.get('IPINFO_TOKEN')
-            if ipinfo_token:
-                # Free tier often doesn't require a token for country lookup
-                url = f"https://ipinfo.io/{user_ip}/country"
-                if ipinfo_token:
-                    url += f"?token={ipinfo_token}"
-                response = requests.get(url, timeout=5)
-                if response.status_code == 200:
-                    country = response.text.strip()
-                    # List of Arabic speaking countries ISO codes (example)
-                    arabic_countries = ['SA', 'AE', 'EG', 'IQ', 'MA', 'YE', 'SY', 'TN', 'JO', 'OM', 'LB', 'KW', 'QA', 'BH', 'PS', 'DZ']
-                    if country in arabic_countries:
-                        return 'ar'
+            return language_resolver.language_for_ip(user_ip)
         except Exception as e:
             app.logger.warning(f"GeoIP lookup failed for IP {user_ip}: {e}")
         return 'en' # Default
 
+    def page_context(requested_lang):
+        """
+        The session's user, whether they see private candidate fields, and the page language: requested_lang
+        if translations exist for it, else detected as for /api/language.
+        """
+        voter_session_id = session.get('voter_session_id')
+        voter_info = voter_session.get_session(voter_session_id) if voter_session_id else None
+        user = session_user(voter_info) if voter_info else None
+        include_private = bool(user) and (user['isAdmin'] or user['isEligibleVoter'])
+        languages = get_languages()
+        lang = requested_lang
+        if lang not in languages:
+            lang = get_user_language(request)
+        if lang not in languages:
+            lang = 'en' if 'en' in languages or not languages else languages[0]
+        return user, include_private, lang
+
+    # --- Request timing and metrics (see utils/metrics.py) ---
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_duration(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # Label by route pattern, not path, so /api/candidates/<id> is one series; unmatched paths share one
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_DURATION.observe(time.perf_counter() - started, request.method, route, str(response.status_code))
+        return response
+
+    def collect_component_metrics():
+        """Counters the caches, session store and other components already keep, read at scrape time."""
+        caches = get_cache_stats()
+        caches['sessions'] = voter_session.store.stats()
+        caches['geoip'] = language_resolver.stats()
+        caches['prerender'] = page_renderer.stats()
+        yield ('phoenix_cache_hits_total', 'counter', 'Cache hits by cache.', stats_samples(caches, 'hits'))
+        yield ('phoenix_cache_misses_total', 'counter', 'Cache misses by cache.', stats_samples(caches, 'misses'))
+        yield ('phoenix_cache_invalidations_total', 'counter', 'Read-through cache invalidations.',
+               stats_samples(caches, 'invalidations'))
+        sessions = caches['sessions']
+        yield ('phoenix_sessions_cached', 'gauge', 'Voter sessions held in memory.', [({}, sessions['cached'])])
+        yield ('phoenix_sessions_pending_writes', 'gauge', 'Session changes waiting for the write-behind flush.',
+               [({}, sessions['pending'])])
+        yield ('phoenix_sessions_flushes_total', 'counter', 'Write-behind session flushes.', [({}, sessions['flushes'])])
+        log_stats = login_log.stats()
+        yield ('phoenix_login_log_entries_total', 'counter', 'Login audit log entries by outcome.',
+               [({'outcome': 'written'}, log_stats['written']), ({'outcome': 'dropped'}, log_stats['dropped'])])
+        yield ('phoenix_login_log_queued', 'gauge', 'Login audit log entries waiting to be written.',
+               [({}, log_stats['queued'])])
+        google_latency = google_auth.stats()['latency']
+        yield ('phoenix_google_calls_total', 'counter', 'Calls to Google endpoints by operation.',
+               stats_samples(google_latency, 'count', 'operation'))
+        yield ('phoenix_google_call_errors_total', 'counter', 'Failed calls to Google endpoints by operation.',
+               stats_samples(google_latency, 'errors', 'operation'))
+        roster_stats = roster.stats()
+        yield ('phoenix_roster_entries', 'gauge', 'Voter roster size by role.',
+               [({'role': 'voter'}, roster_stats['voters']), ({'role': 'admin'}, roster_stats['admins'])])
+        outbound_stats = outbound.stats()
+        yield ('phoenix_outbound_rejected_total', 'counter', 'Outbound calls refused or abandoned, by reason.',
+               [({'reason': 'saturated'}, outbound_stats['saturated']), ({'reason': 'timeout'}, outbound_stats['timeouts'])])
+        yield ('phoenix_outbound_circuit_open', 'gauge', '1 while the circuit to an upstream is open (or half-open).',
+               [({'upstream': name}, int(circuit['state'] != 'closed'))
+                for name, circuit in sorted(outbound_stats['circuits'].items())])
+        yield ('phoenix_election_open', 'gauge', '1 while the election is open.', [({}, int(phase_engine.is_open()))])
+
+    REGISTRY.register_collector('app', collect_component_metrics)
+
+    # Frontend files: the build in STATIC_DIST_FOLDER if present and current, else the sources (see utils/static_assets.py)
+    static_assets = StaticAssets(app.static_folder, app.config['STATIC_DIST_FOLDER'])
+    page_renderer = PageRenderer(static_assets)
+
     # --- WRAPPER: Require Admin Access ---
     def require_admin(func):
         @wraps(func)
@@ -81,10 +274,35 @@ def create_app(config_name='default'):
     # Serve static files from the frontend folder
     @app.route('/')
     def serve_index():
-        # Determine language for initial load (conceptual, might need JS handling)
-        # lang = get_user_language(request)
-        # Could inject lang into template or let frontend handle it
-        return send_from_directory(app.static_folder, 'index.html')
+        """
+        index.html pre-rendered for the visitor's language (the preferredLanguage cookie, else detected) and
+        privacy tier, with the bootstrap data and session embedded. Falls back to the static page on errors.
+        """
+        if not app.config['PRERENDER_INDEX']:
+            return static_assets.send('index.html', request)
+        try:
+            user, include_private, lang = page_context(request.cookies.get('preferredLanguage'))
+            election = election_status_payload()
+            page = page_renderer.page(lang, include_private)
+            compressed = bool(request.accept_encodings['gzip'])
+            etag = make_etag('index', page.digest, user, compressed, get_data_version('election_status'), election['phase'])
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = Response(page.body(json_object({
+                    'authenticated': user is not None,
+                    'user': user,
+                    'election': election
+                }), gzip=compressed), mimetype='text/html')
+                if compressed:
+                    response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.update(('Cookie', 'Accept-Encoding', 'Accept-Language'))
+            return response
+        except Exception as e:
+            app.logger.error(f"Error pre-rendering index.html, serving the static page: {e}")
+            return static_assets.send('index.html', request)
 
     # --- NEW: API to get determined language ---
     @app.route('/api/language')
@@ -117,41 +335,38 @@ def create_app(config_name='default'):
         code = request.args.get('code')
         if not code:
             return jsonify({'message': 'Authorization code not found'}), 400
-        # Exchange authorization code for access and ID tokens
-        tokens = google_auth.exchange_code_for_tokens(code)
-        if not tokens:
-            return jsonify({'message': 'Failed to exchange authorization code'}), 400
-        # Verify ID token
-        user_info = google_auth.verify_id_token(tokens['id_token'])
-        if not user_info:
-            return jsonify({'message': 'Failed to verify user identity'}), 400
+        try:
+            # One deadline for all of the login's calls to Google (token exchange, then certs if not cached)
+            with google_auth.deadline(app.config['LOGIN_DEADLINE']):
+                # Exchange authorization code for access and ID tokens
+                tokens = google_auth.exchange_code_for_tokens(code)
+                if not tokens:
+                    return jsonify({'message': 'Failed to exchange authorization code'}), 400
+                # Verify ID token
+                user_info = google_auth.verify_id_token(tokens['id_token'])
+                if not user_info:
+                    return jsonify({'message': 'Failed to verify user identity'}), 400
+        except UpstreamUnavailable as e:
+            # Google is slow or down: fail fast rather than tie up the worker; the user can simply retry
+            app.logger.warning(f"Login aborted: {e}")
+            return jsonify({'message': 'Google sign-in is temporarily unavailable. Please try again shortly.'}), 503, \
+                {'Retry-After': str(int(app.config['OUTBOUND_RESET_TIMEOUT']))}
         # --- MODIFIED: Check for Admin AND Eligible Voter Access AFTER user_info is available ---
         user_email = user_info.get('email')
         is_admin = False
         is_eligible_voter = False
         if user_email:
-            # Get the comma-separated list from the environment variable for ADMINS
-            admin_emails_str = os.environ.get('PHOENIX_ADMIN_EMAILS', '')
-            admin_emails_list = [email.strip() for email in admin_emails_str.split(',') if email.strip()]
-            if user_email in admin_emails_list:
+            # Hash-set lookups in the voter roster (file + PHOENIX_ADMIN_EMAILS / PHOENIX_ELIGIBLE_VOTER_EMAILS)
+            if roster.is_admin(user_email):
                 is_admin = True
                 app.logger.info(f"[Admin] User {user_email} granted admin access via Google Auth.")
-            # Get the comma-separated list from the environment variable for ELIGIBLE VOTERS
-            eligible_voters_str = os.environ.get('PHOENIX_ELIGIBLE_VOTER_EMAILS', '')
-            eligible_voters_list = [email.strip() for email in eligible_voters_str.split(',') if email.strip()]
-            # If list is empty, maybe everyone with a Google account can vote? Or deny all?
-            # For security, let's assume list must be populated.
-            if eligible_voters_list and user_email in eligible_voters_list:
+            # For security, an empty roster makes nobody eligible
+            if roster.is_eligible(user_email):
                  is_eligible_voter = True
                  app.logger.info(f"[Voter] User {user_email} is eligible to vote.")
-            # else:
-            #     app.logger.info(f"[User] User {user_email} authenticated via Google Auth (not eligible voter).")
         # --- END MODIFIED ---
-        # Check if user has already voted
-        has_voted = False
-        votes_data = get_votes()
-        if votes_data and user_info['user_id'] in votes_data.voter_ids:
-            has_voted = True
+        # Check if user has already voted (indexed lookup, no vote file parsing)
+        has_voted = has_voter_voted(user_info['user_id'])
         # Create voter session (PASS THE is_admin AND is_eligible_voter FLAGS)
         session_id = voter_session.create_session(
             user_info['user_id'],  # This is the Google User ID (sub)
@@ -185,16 +400,36 @@ def create_app(config_name='default'):
             return jsonify({'authenticated': False}), 401
         return jsonify({
             'authenticated': True,
-            'user': {
-                'name': voter_info['name'],
-                'email': voter_info['email'],
-                # Include isAdmin flag based on session data
-                'isAdmin': voter_info.get('is_admin', False), # <--- RETURN THIS FLAG
-                'isEligibleVoter': voter_info.get('is_eligible_voter', False), # <--- RETURN THIS FLAG
-                'hasVoted': voter_info.get('has_voted', False)  # ← Add this line
-            }
+            'user': session_user(voter_info)
         }), 200
 
+    @app.route('/api/bootstrap')
+    def bootstrap():
+        """
+        Everything the page needs for first paint in one response: session, language and its translations,
+        candidates at the session's privacy level and the election status. ?lang= is the client's saved choice;
+        without it the language is detected as for /api/language. Built from the same caches as the
+        individual endpoints (candidates and translations are spliced in pre-serialized).
+        """
+        try:
+            user, include_private, lang = page_context(request.args.get('lang'))
+            languages = get_languages()
+            election = election_status_payload()
+            etag = make_etag('bootstrap', user, lang, include_private, get_data_version('candidates'),
+                             get_translations_digest(lang), get_data_version('election_status'), election['phase'])
+            return conditional_json(etag, lambda: json_object({
+                'authenticated': user is not None,
+                'user': user,
+                'language': lang,
+                'languages': languages,
+                'translations': get_translations_json(lang) or {},
+                'candidates': get_candidates_json(include_private=include_private),
+                'election': election
+            }), cache_control='private, no-cache', vary='Cookie')
+        except Exception as e:
+            app.logger.error(f"Error building bootstrap payload: {e}")
+            return jsonify({'message': 'Error loading application data. Please try again later.'}), 500
+
     @app.route('/api/auth/demo', methods=['POST'])
     def demo_auth():
         # Create a demo user session (not an admin, not an eligible voter for real election)
@@ -241,16 +476,18 @@ def create_app(config_name='default'):
                 voter_info = voter_session.get_session(voter_session_id)
                 if voter_info:
                     # Check if user is an eligible voter or an admin
-                    is_eligible_voter = voter_info.get('is_eligible_voter', False)
                     is_admin = voter_info.get('is_admin', False)
-                    if is_eligible_voter or is_admin:
+                    if is_admin or is_eligible_voter(voter_info):
                         include_private = True
 
-            # Load candidates with appropriate privacy level
-            candidates = get_candidates(include_private=include_private)
-            # Convert Candidate objects to dictionaries for JSON serialization
-            candidates_dicts = [c.to_dict(include_private=include_private) for c in candidates]
-            return jsonify(candidates_dicts), 200
+            # Separate ETag and Cache-Control per privacy level; the payload depends on the session cookie
+            tier = 'private' if include_private else 'public'
+            etag = make_etag('candidates', tier, get_data_version('candidates'))
+            # Candidates with the appropriate privacy level, serialized once per candidates version
+            return conditional_json(
+                etag,
+                lambda: get_candidates_json(include_private=include_private),
+                cache_control=f'{tier}, no-cache', vary='Cookie')
         except Exception as e:
                 app.logger.error(f"Error fetching candidates: {e}")
                 return jsonify({"message": "Error loading candidates. Please try again later."}), 500
@@ -269,82 +506,30 @@ def create_app(config_name='default'):
                 return jsonify({'message': 'Invalid session'}), 401
     
             # Check if user is an eligible voter or an admin
-            is_eligible_voter = voter_info.get('is_eligible_voter', False)
             is_admin = voter_info.get('is_admin', False)
 
-            if not (is_eligible_voter or is_admin):
+            if not (is_admin or is_eligible_voter(voter_info)):
                 user_email = voter_info.get('email', 'Unknown')
                 app.logger.warning(f"User {user_email} attempted to view results but is not eligible.")
                 return jsonify({'message': 'You are not authorized to view election results.'}), 403
             # --- END CRITICAL CHECK ---
 
-            # --- NEW: Check election status FIRST based on schedule---
-            status = get_election_status()
-            current_time = datetime.now(timezone.utc)
-            is_election_open = False
-            # Calculate if election is currently open based on scheduled times
-            if status.start_time and status.end_time:
-                try:
-                    start_dt = datetime.fromisoformat(status.start_time.replace('Z', '+00:00')) if isinstance(status.start_time, str) else status.start_time
-                    end_dt = datetime.fromisoformat(status.end_time.replace('Z', '+00:00')) if isinstance(status.end_time, str) else status.end_time
-                    is_election_open = start_dt <= current_time < end_dt
-                except ValueError as e:
-                    app.logger.error(f"Error parsing election start/end times for results: {e}")
-
+            # --- NEW: Check election phase FIRST based on schedule---
             # --- MODIFIED: Return placeholder or restricted data if election is open (scheduled) ---
-            if is_election_open:
-                return jsonify({
+            if phase_engine.is_open():
+                return conditional_json(make_etag('results', 'open'), lambda: {
                     'isOpen': True,
                     'message': 'Election is currently open. Results will be available after the election closes.',
                     'totalVotes': 0,
                     'results': []
-                }), 200
-
-            # If election is NOT open (scheduled), proceed to calculate and show results
-            votes_data = get_votes()
-            if not votes_data:
-                return jsonify({
-                    'isOpen': False,
-                    'totalVotes': 0,
-                    'results': []
-                }), 200
+                }, cache_control='private, no-cache')
 
-            # Get candidates (public data)
-            candidates = get_candidates(include_private=False)
-
-            # Calculate results
-            candidate_votes = {}
-            total_votes = len(votes_data.voter_ids)
-            # Initialize vote counts for all candidates
-            for candidate in candidates:
-                candidate_votes[candidate.id] = {'name': candidate.name, 'councilVotes': 0, 'executiveVotes': 0}
-            # Count votes
-            for vote in votes_data.votes:
-                for candidate_id in vote.selected_candidates:
-                    if candidate_id in candidate_votes:
-                        candidate_votes[candidate_id]['councilVotes'] += 1
-                for candidate_id in vote.executive_candidates:
-                    if candidate_id in candidate_votes:
-                        candidate_votes[candidate_id]['executiveVotes'] += 1
-
-            # Prepare results list
-            results = [
-                {
-                    'id': candidate_id,
-                    'name': vote_data['name'],
-                    'councilVotes': vote_data['councilVotes'],
-                    'executiveVotes': vote_data['executiveVotes']
-                }
-                for candidate_id, vote_data in candidate_votes.items()
-            ]
-            # Sort results
-            results.sort(key=lambda x: (-x['councilVotes'], -x['executiveVotes']))
-
-            return jsonify({
-                'isOpen': False,
-                'totalVotes': total_votes,
-                'results': results
-            }), 200
+            # If election is NOT open (scheduled), serve the tally maintained at vote time
+            # (serialized once at close, unless ballots or candidates have changed since)
+            etag = results_etag()
+            body = final_results.get(etag)
+            return conditional_json(etag, (lambda: body) if body is not None else build_results,
+                                    cache_control='private, no-cache')
 
         except Exception as e:
             app.logger.error(f"Error calculating results: {e}")
@@ -353,21 +538,10 @@ def create_app(config_name='default'):
     @app.route('/api/election/status')
     def get_election_status_api():
         try:
-            status = get_election_status()
-            current_time = datetime.now(timezone.utc)
-         # --- NEW LOGIC: Calculate is_open based on time ---
-            is_open = False
-            if status.start_time and status.end_time:
-                start_dt = datetime.fromisoformat(status.start_time.replace('Z', '+00:00')) if isinstance(status.start_time, str) else status.start_time
-                end_dt = datetime.fromisoformat(status.end_time.replace('Z', '+00:00')) if isinstance(status.end_time, str) else status.end_time
-                # Safe to compare: all are offset-aware UTC
-                is_open = start_dt <= current_time < end_dt
-            # Return using the correct attribute name (is_open)
-            return jsonify({
-                 'is_open': is_open,
-                 'start_time': status.start_time,
-                 'end_time': status.end_time
-             }), 200
+            payload = election_status_payload()
+            # The phase changes with the clock, so it is part of the ETag alongside the stored schedule
+            etag = make_etag('election_status', get_data_version('election_status'), payload['phase'])
+            return conditional_json(etag, lambda: payload, cache_control='public, no-cache')
         except Exception as e:
             app.logger.error(f"Error fetching election status: {e}")
             # It's better to return an error code if status fetch fails
@@ -378,6 +552,31 @@ def create_app(config_name='default'):
                  'end_time': None,
                 'message': "Error fetching election status."}), 500
 
+    # --- Push channel: status transitions and turnout as server-sent events ---
+    @app.route('/api/events')
+    def election_events():
+        """
+        text/event-stream of 'status' events (same payload as /api/election/status) and 'turnout' events
+        ({totalVotes, isOpen}). Turnout goes to admins, and to eligible voters once voting has closed.
+        """
+        voter_session_id = session.get('voter_session_id')
+        voter_info = voter_session.get_session(voter_session_id) if voter_session_id else None
+        is_admin = bool(voter_info and voter_info.get('is_admin', False))
+        is_voter = is_eligible_voter(voter_info)
+
+        def allow(event, data):
+            if event == 'turnout':
+                return is_admin or (is_voter and not data['isOpen'])
+            return True
+
+        event_broker.start_watcher(election_status_payload, lambda: get_results_tally().vote_count)
+        q = event_broker.subscribe()
+        if q is None:
+            # Too many open streams in this worker; the client keeps its fetched state
+            return jsonify({'message': 'Event stream unavailable'}), 503
+        return Response(event_broker.stream(q, allow), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
     # --- VOTING ROUTE (Key Changes Highlighted: datetime.datetime -> datetime, indentation fix) ---
     @app.route('/api/votes/submit', methods=['POST'])
     def submit_vote():
@@ -388,12 +587,13 @@ def create_app(config_name='default'):
         if not voter_info:
             return jsonify({'message': 'Invalid session'}), 401
         # --- MODIFIED: Check if user is eligible to vote ---
-        if not voter_info.get('is_eligible_voter', False):
+        if not is_eligible_voter(voter_info):
              user_email = voter_info.get('email', 'Unknown')
              app.logger.warning(f"User {user_email} attempted to vote but is not eligible.")
              return jsonify({'message': 'You are not authorized to vote in this election.'}), 403 # Forbidden
         # --- END MODIFIED ---
-        if voter_info.get('has_voted', False):
+        # Don't trust the session flag alone: another session of the same voter may have voted since login
+        if voter_info.get('has_voted', False) or has_voter_voted(voter_info['user_id']):
             return jsonify({'message': 'You have already voted'}), 400
         data = request.get_json()
         selected_candidates = data.get('selectedCandidates', [])
@@ -409,28 +609,8 @@ def create_app(config_name='default'):
         # Ensure all executive candidates are also selected as council members
         if not set(executive_candidates).issubset(set(selected_candidates)):
             return jsonify({'message': 'All executive candidates must also be selected as council members'}), 400
-        # Check election status
-        election_status = get_election_status()
-        # --- NEW: Calculate is_open dynamically for vote submission ---
-        is_election_open = False
-        if election_status.start_time and election_status.end_time:
-            try:
-                # Parse start and end times (ensure they are timezone-aware)
-                # FIXED: Use datetime.fromisoformat instead of datetime.datetime.fromisoformat
-                start_dt = datetime.fromisoformat(election_status.start_time.replace('Z', '+00:00')) if isinstance(election_status.start_time, str) else election_status.start_time
-                end_dt = datetime.fromisoformat(election_status.end_time.replace('Z', '+00:00')) if isinstance(election_status.end_time, str) else election_status.end_time
-                current_time = datetime.now(timezone.utc) # Use timezone.now() or utcnow()
-                # Calculate if election is currently open based on time
-                is_election_open = start_dt <= current_time < end_dt
-            except ValueError as e:
-                app.logger.error(f"Error parsing election start/end times for vote submission: {e}")
-                # If parsing fails, assume closed for safety
-                # FIXED: Correct indentation for this line
-                is_election_open = False
-        else:
-            # If start or end time is missing, assume closed
-            is_election_open = False
-        if not is_election_open:
+        # Check election phase (unscheduled, unparsable or past the window all count as closed)
+        if not phase_engine.is_open():
             return jsonify({'message': 'Election is currently closed'}), 400
         # Record the vote
         new_vote = Vote(id=str(uuid.uuid4()),
@@ -439,14 +619,19 @@ def create_app(config_name='default'):
                         executive_candidates=executive_candidates,
                         voter_name=voter_info['name'],
                         voter_email=voter_info['email'],
-                        timestamp=None) # Let Vote model handle timestamp
-        votes_data = get_votes()
-        votes_data.voter_ids.append(voter_info['user_id'])
-        votes_data.votes.append(new_vote)
-        if save_votes(votes_data):
+                        timestamp=datetime.now(timezone.utc).isoformat())
+        # Append-only: one journal record per ballot instead of rewriting votes.json
+        if append_vote(new_vote):
             # Update session to mark user as having voted
             voter_session.update_session(voter_session_id, has_voted=True)
             return jsonify({'message': 'Vote submitted successfully'}), 200
+        elif has_voter_voted(voter_info['user_id']):
+            # Lost a race with a concurrent submission from the same voter
+            voter_session.update_session(voter_session_id, has_voted=True)
+            return jsonify({'message': 'You have already voted'}), 400
+        elif not phase_engine.is_open():
+            # The election closed while this ballot was in flight (the ballot store is frozen)
+            return jsonify({'message': 'Election is currently closed'}), 400
         else:
             return jsonify({'message': 'Failed to save vote'}), 500
 
@@ -477,8 +662,7 @@ def create_app(config_name='default'):
                 if not data.get(field):
                      return jsonify({"message": f"Missing required field: {field}"}), 400
             # Check election status - candidates can only be added before election day
-            election_status = get_election_status()
-            if election_status.is_open:
+            if phase_engine.is_open():
                  return jsonify({"message": "Cannot add candidates while election is open."}), 400
             success, message_or_error = add_candidate(data) # <-- CALL NEW FUNCTION
             if success:
@@ -496,8 +680,7 @@ def create_app(config_name='default'):
         """Remove a candidate by ID."""
         try:
              # Check election status - candidates can only be removed before election day
-            election_status = get_election_status()
-            if election_status.is_open:
+            if phase_engine.is_open():
                  return jsonify({"message": "Cannot remove candidates while election is open."}), 400
             success, message_or_error = remove_candidate(candidate_id) # <-- CALL NEW FUNCTION
             if success:
@@ -513,9 +696,18 @@ def create_app(config_name='default'):
     @require_admin
     def toggle_election():
         try:
-            current_status = get_election_status()
-            new_status = ElectionStatus(is_open=not current_status.is_open)
+            # Toggling edits the window itself, so the stored flag and the schedule can't disagree:
+            # closing ends the election now; opening starts it now, keeping a scheduled end still ahead
+            schedule = phase_engine.schedule()
+            now = datetime.now(timezone.utc)
+            if phase_engine.is_open():
+                new_status = ElectionStatus(is_open=False, start_time=schedule.start, end_time=now)
+            else:
+                end_time = schedule.end if schedule.end and schedule.end > now else None
+                new_status = ElectionStatus(is_open=True, start_time=now, end_time=end_time)
             if save_election_status(new_status):
+                phase_engine.phase() # Run the start/end hooks now
+                event_broker.publish('status', election_status_payload())
                 action = "opened" if new_status.is_open else "closed"
                 return jsonify({'message': f'Election successfully {action}', 'is_open': new_status.is_open}), 200
             else:
@@ -531,10 +723,9 @@ def create_app(config_name='default'):
         Exports the raw votes.json file by sending it as a downloadable attachment.
         """
         try:
-            # 1. Define the path to the votes.json file
-            # Make sure this path correctly points to your 'backend/data/votes.json'
-            # os.path.dirname(__file__) gets the directory of the current app.py file.
-            VOTES_FILE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'votes.json')
+            # 1. Write votes.json from all recorded ballots so the export is complete
+            export_votes_json()
+            VOTES_FILE_PATH = VOTES_FILE
 
             # 2. Check if the file actually exists to prevent errors
             if not os.path.exists(VOTES_FILE_PATH):
@@ -562,46 +753,36 @@ def create_app(config_name='default'):
     @app.route('/api/admin/votes/export/csv', methods=['GET'])
     @require_admin
     def export_votes_to_csv():
+        """
+        Streams the ballots as CSV with candidate names, a chunk of rows at a time.
+        Query parameters:
+          columns=voter_email,timestamp,executive,council  column layout (default: CSV_EXPORT_COLUMNS)
+          ids=1   write candidate IDs instead of names
+          gzip=1  gzip-compress the download (votes_export_with_names.csv.gz)
+        """
+        try:
+            layout = parse_layout(request.args.get('columns') or app.config['CSV_EXPORT_COLUMNS'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         try:
-            # Get votes and candidates data
-            votes_data = get_votes()
-            # Get candidates WITH PRIVATE DATA for name lookup if needed, though public names are usually fine
             # Using public data for names is safer and sufficient
             candidates = get_candidates(include_private=False)
-            # Create a lookup dictionary for candidate ID to name
-            candidate_lookup = {c.id: c.name for c in candidates}
-            voter_email_lookup = {vote.voter_id: vote.voter_email for vote in votes_data.votes}
-            # Create a StringIO object to hold CSV data
-            output = io.StringIO()
-            writer = csv.writer(output)
-            # Write header row
-            header = ['Voter Name']
-            header.extend([f'Executive {i+1}' for i in range(7)])
-            header.extend([f'Council {i+1}' for i in range(8)]) # 15 total - 7 exec = 8 council only
-            writer.writerow(header)
-            # Write vote data
-            for vote in votes_data.votes:
-                voter_email = voter_email_lookup.get(vote.voter_id, f"Unknown Email ({vote.voter_id})")
-                row = [voter_email] # Start with Voter ID
-                # Add Executive Officers (up to 7) - Lookup names
-                executive_names_list = [candidate_lookup.get(cid, f"Unknown ID: {cid}") for cid in vote.executive_candidates[:7]]
-                executive_names_list.extend([''] * (7 - len(executive_names_list)))
-                row.extend(executive_names_list)
-                # Add remaining Council Members (up to 8) - Lookup names
-                # Filter out candidates already listed as Executive Officers
-                remaining_council_ids = [cid for cid in vote.selected_candidates if cid not in set(vote.executive_candidates)]
-                remaining_council_names_list = [candidate_lookup.get(cid, f"Unknown ID: {cid}") for cid in remaining_council_ids[:8]]
-                remaining_council_names_list.extend([''] * (8 - len(remaining_council_names_list)))
-                row.extend(remaining_council_names_list)
-                writer.writerow(row)
-            # Get the CSV string
-            csv_data = output.getvalue()
-            output.close()
-            # Prepare response
+            if request.args.get('ids') == '1':
+                candidate_labels = {c.id: str(c.id) for c in candidates}
+            else:
+                candidate_labels = {c.id: c.name for c in candidates}
+            chunks = iter_votes_csv(iter_votes(), candidate_labels, layout)
+            filename = 'votes_export_with_names.csv'
+            if request.args.get('gzip') == '1':
+                return Response(
+                    stream_with_context(gzip_chunks(chunks)),
+                    mimetype='application/gzip',
+                    headers={"Content-Disposition": f"attachment;filename={filename}.gz"}
+                )
             return Response(
-                csv_data,
+                stream_with_context(chunks),
                 mimetype='text/csv',
-                headers={"Content-Disposition": "attachment;filename=votes_export_with_names.csv"}
+                headers={"Content-Disposition": f"attachment;filename={filename}"}
             )
         except FileNotFoundError as e:
             app.logger.error(f"Data file not found during CSV export: {e}")
@@ -611,26 +792,138 @@ def create_app(config_name='default'):
             return jsonify({'message': 'An internal server error occurred during CSV export.'}), 500
     # --- END NEW ROUTE ---
 
+    # --- Voter roster bulk import ---
+    @app.route('/api/admin/roster/import', methods=['POST'])
+    @require_admin
+    def import_roster():
+        """
+        Adds eligible voters/admins to the roster file. Body: JSON {"emails": [...], "role": "voter"|"admin"} or
+        {"entries": [{"email", "role"}]}, or a CSV ('email[,role]') / NDJSON (application/x-ndjson) upload.
+        ?replace=1 (or "replace": true) replaces the roster file instead of adding to it.
+        """
+        try:
+            replace = request.args.get('replace', '').lower() in ('1', 'true', 'yes')
+            rejected = 0
+            if request.is_json:
+                data = request.get_json() or {}
+                replace = replace or bool(data.get('replace'))
+                if 'entries' in data:
+                    rows = [json.dumps(entry) for entry in data.get('entries') or []]
+                else:
+                    role = data.get('role', 'voter')
+                    rows = [json.dumps({'email': email, 'role': role}) for email in data.get('emails') or []]
+                entries, rejected = parse_roster('\n'.join(rows), 'ndjson')
+            else:
+                upload = request.files.get('file')
+                text = (upload.read() if upload else request.get_data()).decode('utf-8-sig')
+                is_ndjson = 'ndjson' in (request.mimetype or '') or (upload and upload.filename.endswith(('.ndjson', '.jsonl')))
+                entries, rejected = parse_roster(text, 'ndjson' if is_ndjson else 'csv')
+            if not entries and not replace:
+                return jsonify({'message': 'No valid roster entries found.', 'rejected': rejected}), 400
+            result = roster.import_entries(entries, replace=replace)
+            result.update({'rejected': rejected, 'roster': roster.stats()})
+            app.logger.info(f"[Admin] Roster import: {result['added']} added, {rejected} rejected, {result['total']} total.")
+            return jsonify(result), 200
+        except Exception as e:
+            app.logger.error(f"Error importing voter roster: {e}")
+            return jsonify({'message': 'An internal server error occurred during roster import.'}), 500
+
+    @app.route('/api/admin/cache/stats', methods=['GET'])
+    @require_admin
+    def cache_stats():
+        """Hit/miss counters of the in-process data caches."""
+        stats = get_cache_stats()
+        stats['sessions'] = voter_session.store.stats()
+        stats['login_log'] = login_log.stats()
+        stats['geoip'] = language_resolver.stats()
+        stats['google_auth'] = google_auth.stats()
+        stats['roster'] = roster.stats()
+        stats['outbound'] = outbound.stats()
+        if photo_store is not None:
+            stats['photos'] = photo_store.stats()
+        return jsonify(stats), 200
+
+    @app.route('/api/admin/metrics', methods=['GET'])
+    def metrics():
+        """Request latency, storage I/O and cache counters of this worker, in the Prometheus text format."""
+        def render():
+            return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+        token = app.config['METRICS_TOKEN']
+        if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return render()
+        return require_admin(render)()
+
+    # --- Recounts, audits and what-if analyses (vectorized tally engine) ---
+    @app.route('/api/admin/results/analysis', methods=['POST'])
+    @require_admin
+    def analyze_results():
+        """Recount all ballots, optionally excluding candidates or voters and re-weighting ballots by voter ID."""
+        try:
+            data = request.get_json(silent=True) or {}
+            exclude_candidates = data.get('excludeCandidates', [])
+            exclude_voters = data.get('excludeVoters', [])
+            weights = data.get('weights', {})
+            seats = data.get('seats', 15)
+            if (not isinstance(exclude_candidates, list) or not all(isinstance(cid, int) for cid in exclude_candidates)
+                    or not isinstance(exclude_voters, list) or not isinstance(weights, dict)
+                    or not all(isinstance(w, (int, float)) for w in weights.values()) or not isinstance(seats, int)):
+                return jsonify({'message': 'Invalid analysis parameters'}), 400
+            engine = TallyEngine(get_votes().votes, get_candidates(include_private=False))
+            return jsonify(engine.ranking(exclude_candidates=exclude_candidates, weights=weights,
+                                          exclude_voters=exclude_voters, seats=seats)), 200
+        except Exception as e:
+            app.logger.error(f"Error analyzing results: {e}", exc_info=True)
+            return jsonify({'message': 'An internal server error occurred during results analysis.'}), 500
+
+    @app.route('/api/admin/results/audit', methods=['GET'])
+    @require_admin
+    def audit_results():
+        """Recount all ballots and check the vectorized, loop-based and maintained tallies agree."""
+        try:
+            engine = TallyEngine(get_votes().votes, get_candidates(include_private=False))
+            return jsonify(engine.verify(get_results_tally())), 200
+        except Exception as e:
+            app.logger.error(f"Error auditing results: {e}", exc_info=True)
+            return jsonify({'message': 'An internal server error occurred during results audit.'}), 500
+
     # --- SERVE STATIC FILES ---
     @app.route('/<path:filename>')
     def serve_static(filename):
-        return send_from_directory(app.static_folder, filename)
+        return static_assets.send(filename, request)
+
+    @app.route('/photos/<photo_id>')
+    def serve_photo(photo_id):
+        """A stored candidate photo, as WebP if the browser takes it. Ids are content hashes, so it never changes."""
+        found = photo_store.find(photo_id, accept_webp='image/webp' in request.headers.get('Accept', '')) \
+            if photo_store is not None else None
+        if not found:
+            return jsonify({'message': 'Photo not found'}), 404
+        path, mimetype = found
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=os.path.basename(path))
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept')
+        return response
 
     # --- NEW: API ENDPOINT FOR TRANSLATIONS ---
     @app.route('/api/translations')
     def get_translations():
         """API endpoint to serve translation data."""
-        # Load translations (consider caching for performance in production)
-        # For simplicity, loading on each request. Cache in memory or use Flask-Caching.
-        translations_data = load_translations()
-        if translations_data:
-            return jsonify(translations_data), 200
-        else:
-            # Return an empty object or a default set if loading failed
-            # return jsonify({"message": "Translations not available"}), 500 # Or 500 if critical
-            return jsonify({}), 200 # Or return 500 if critical
+        # All languages, joined from the per-language bytes cached below (re-read only when translations.json changes)
+        # Return an empty object if loading failed (or 500 if critical)
+        etag = make_etag('translations', get_data_version('translations'))
+        return conditional_json(etag, lambda: json_object({lang: get_translations_json(lang) for lang in get_languages()}),
+                                cache_control='public, no-cache')
     # --- END NEW: API ENDPOINT FOR TRANSLATIONS ---
 
+    @app.route('/api/translations/<lang>')
+    def get_language_translations(lang):
+        """One language's translations; the frontend loads other languages only when the user switches."""
+        digest = get_translations_digest(lang)
+        if digest is None:
+            return jsonify({'message': f"Unknown language '{lang}'", 'languages': get_languages()}), 404
+        return conditional_json(make_etag('translations', lang, digest), lambda: get_translations_json(lang),
+                                cache_control='public, no-cache')
+
     # app.py - Inside create_app function, add this new route (IMPROVED)
     @app.route('/api/admin/election/schedule', methods=['POST'])
     @require_admin
@@ -649,27 +942,31 @@ def create_app(config_name='default'):
                 return jsonify({'message': 'Both start_time and end_time are required.'}), 400
 
             # Parse the datetime strings (assuming ISO format, e.g., "2024-06-15T10:00:00Z")
-            try:
-                # Ensure datetime parsing is correct (it was already correct in the provided code)
-                start_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-                end_time = datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
-            except ValueError as ve: # Catch specific parsing error
-                app.logger.warning(f"schedule_election: Invalid datetime format provided: {ve}")
+            # Times without an offset are taken as UTC, so the window always compares against an aware clock
+            start_time = parse_timestamp(start_time_str)
+            end_time = parse_timestamp(end_time_str)
+            if start_time is None or end_time is None:
+                app.logger.warning(f"schedule_election: Invalid datetime format provided: {start_time_str!r}, {end_time_str!r}")
                 return jsonify({'message': 'Invalid datetime format. Use ISO 8601 (e.g., 2024-06-15T10:00:00Z).'}), 400
 
             if start_time >= end_time:
                 return jsonify({'message': 'Start time must be before end time.'}), 400
 
-            # Create new ElectionStatus object
-            new_status = ElectionStatus(is_open=False, start_time=start_time, end_time=end_time)
+            # Create new ElectionStatus object (the stored flag mirrors the window at save time)
+            now = datetime.now(timezone.utc).timestamp()
+            new_status = ElectionStatus(is_open=ElectionSchedule(start_time, end_time).phase_at(now) == 'open',
+                                        start_time=start_time, end_time=end_time)
 
             # Save to file/database
             if save_election_status(new_status):
+                phase_engine.phase() # Run the start/end hooks now
+                event_broker.publish('status', election_status_payload())
                 # --- IMPROVEMENT 2: Return ISO formatted strings for consistency ---
+                # (ElectionStatus already stores them as ISO strings)
                 return jsonify({
                     'message': 'Election schedule updated successfully.',
-                    'start_time': new_status.start_time.isoformat() if new_status.start_time else None,
-                    'end_time': new_status.end_time.isoformat() if new_status.end_time else None
+                    'start_time': new_status.start_time,
+                    'end_time': new_status.end_time
                 }), 200
             else:
                 app.logger.error("schedule_election: Failed to save election status to data handler.")
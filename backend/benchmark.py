@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Voting Flow Benchmark for Phoenix Council Elections
+
+Runs N simulated voters, C at a time, through the whole flow against a throwaway copy of data/:
+  demo_login  POST /api/auth/demo
+  login       /auth/google/login + /auth/google/callback against a local fake Google (token, certs, userinfo)
+  candidates  GET /api/candidates
+  vote        POST /api/votes/submit (one random valid ballot per voter)
+  results     GET /api/results (after an admin closes the election)
+  export      GET /api/admin/votes/export/csv
+For each scenario it reports throughput, p50/p95/p99 latency and data-file growth. The JSON report
+goes to stdout (or --output), a summary table to stderr. Your real data folder is never touched.
+
+Usage:
+    python3 benchmark.py                                  # 200 voters, 16 at a time, Flask test client
+    python3 benchmark.py --voters 1000 --concurrency 32 --storage sqlite
+    python3 benchmark.py --server                         # real HTTP via a local threaded WSGI server
+    python3 benchmark.py --scenarios login,vote --output bench.json
+"""
+
+import argparse
+import atexit
+import concurrent.futures
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+SOURCE_DATA_FOLDER = os.path.join(BACKEND_DIR, 'data')
+SCENARIOS = ('demo_login', 'login', 'candidates', 'vote', 'results', 'export')
+CLIENT_ID = 'benchmark-client.apps.googleusercontent.com'
+ADMIN_EMAIL = 'admin@bench.local'
+
+
+class FakeGoogle:
+    """
+    Local stand-in for Google's OAuth endpoints. The authorization code is the voter's email;
+    the token endpoint answers with an RS256-signed ID token for it.
+    """
+    def __init__(self):
+        import rsa
+        from google.auth import crypt
+        public_key, private_key = rsa.newkeys(1024) # Stub key only: 2048-bit generation takes seconds in pure Python
+        self.certs = {'bench-key': public_key.save_pkcs1().decode()}
+        self.signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), key_id='bench-key')
+        self.requests = {'token': 0, 'certs': 0, 'userinfo': 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, name='fake-google', daemon=True).start()
+
+    def id_token(self, email: str) -> str:
+        from google.auth import jwt
+        now = int(time.time())
+        return jwt.encode(self.signer, {
+            'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': f'bench-{email}',
+            'email': email, 'email_verified': True, 'name': email.split('@')[0], 'iat': now, 'exp': now + 3600
+        }).decode('utf-8')
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive, like Google
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith('/certs'):
+                    fake._count('certs')
+                    self._send(fake.certs, {'Cache-Control': 'public, max-age=3600'})
+                else:
+                    fake._count('userinfo')
+                    self._send({'email': 'unknown@bench.local'})
+
+            def do_POST(self):
+                fake._count('token')
+                form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8'))
+                email = form.get('code', ['unknown@bench.local'])[0]
+                self._send({'access_token': f'access-{email}', 'id_token': fake.id_token(email),
+                            'token_type': 'Bearer', 'expires_in': 3600})
+
+        return Handler
+
+    def environment(self) -> Dict[str, str]:
+        return {
+            'GOOGLE_CLIENT_ID': CLIENT_ID,
+            'GOOGLE_CLIENT_SECRET': 'benchmark-secret',
+            'GOOGLE_AUTH_URI': self.base_url + '/auth',
+            'GOOGLE_TOKEN_URI': self.base_url + '/token',
+            'GOOGLE_CERTS_URL': self.base_url + '/certs',
+            'GOOGLE_USERINFO_URL': self.base_url + '/userinfo',
+            'OAUTHLIB_INSECURE_TRANSPORT': '1', # The stub speaks plain http
+        }
+
+
+# --- Clients: the same scenarios run through Flask's test client or over real HTTP ---
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, **kwargs) -> Tuple[int, Any, bytes]:
+        response = self.client.open(path, method=method, **kwargs)
+        return response.status_code, response.headers, response.get_data() # get_data drains streamed bodies
+
+
+class HTTPSession:
+    def __init__(self, base_url: str):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def request(self, method: str, path: str, **kwargs) -> Tuple[int, Any, bytes]:
+        response = self.session.request(method, self.base_url + path, allow_redirects=False, **kwargs)
+        return response.status_code, response.headers, response.content
+
+
+# --- Measurement ---
+def data_file_sizes(folder: str) -> Dict[str, int]:
+    sizes = {}
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                sizes[os.path.relpath(path, folder)] = os.path.getsize(path)
+            except OSError:
+                pass # Rotated or replaced while we were listing
+    return sizes
+
+def run_scenario(name: str, jobs: List[Callable[[], bool]], concurrency: int, data_folder: str,
+                 settle: float) -> Dict[str, Any]:
+    """Runs the jobs on a thread pool; each job is one timed operation that returns True on success."""
+    from utils.timing import LatencyRecorder
+    recorder = LatencyRecorder(window=max(len(jobs), 1))
+    failures: List[str] = []
+
+    def timed(job: Callable[[], bool]):
+        start = time.perf_counter()
+        try:
+            ok = job()
+        except Exception as e:
+            ok = False
+            failures.append(f"{type(e).__name__}: {e}")
+        recorder.record(name, (time.perf_counter() - start) * 1000, error=not ok)
+
+    before = data_file_sizes(data_folder)
+    wall_start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, jobs))
+    wall = time.perf_counter() - wall_start
+    time.sleep(settle) # Let write-behind sessions and the audit log reach the disk before measuring growth
+    after = data_file_sizes(data_folder)
+
+    latency = recorder.stats().get(name, {})
+    growth = {path: after.get(path, 0) - before.get(path, 0)
+              for path in sorted(set(before) | set(after)) if after.get(path, 0) != before.get(path, 0)}
+    return {
+        'name': name,
+        'ops': len(jobs),
+        'errors': latency.get('errors', 0),
+        'firstError': failures[0] if failures else None,
+        'wallSeconds': round(wall, 3),
+        'throughput': round(len(jobs) / wall, 1) if wall > 0 else None, # ops/s
+        'latencyMs': {key: latency.get(key) for key in ('avgMs', 'p50Ms', 'p95Ms', 'p99Ms', 'maxMs')},
+        'dataGrowthBytes': sum(after.values()) - sum(before.values()),
+        'fileGrowthBytes': growth,
+    }
+
+
+# --- Setup ---
+def prepare_data_folder(voters: int) -> str:
+    """Copies candidates and translations into a temp folder, opens the election and writes the roster."""
+    folder = tempfile.mkdtemp(prefix='phoenix-bench-')
+    for name in ('candidates.json', 'translations.json'):
+        shutil.copy(os.path.join(SOURCE_DATA_FOLDER, name), folder)
+    now = datetime.now(timezone.utc)
+    with open(os.path.join(folder, 'election_status.json'), 'w', encoding='utf-8') as f:
+        json.dump({'is_open': True, 'start_time': (now - timedelta(minutes=1)).isoformat(),
+                   'end_time': (now + timedelta(days=1)).isoformat()}, f)
+    with open(os.path.join(folder, 'voter_roster.csv'), 'w', encoding='utf-8') as f:
+        f.write(f'email,role\n{ADMIN_EMAIL},admin\n')
+        f.writelines(f'{voter_email(i)},voter\n' for i in range(voters))
+    return folder
+
+def voter_email(index: int) -> str:
+    return f'voter{index:06d}@bench.local'
+
+def random_ballot(candidate_ids: List[int], rng: random.Random) -> Dict[str, List[int]]:
+    council = rng.sample(candidate_ids, 15)
+    return {'selectedCandidates': council, 'executiveCandidates': rng.sample(council, 7)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the voting flow end to end.")
+    parser.add_argument('--voters', type=int, default=200, help="Number of simulated voters (default 200)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Voters in flight at once (default 16)")
+    parser.add_argument('--storage', choices=('json', 'sqlite'), default='json', help="Storage backend")
+    parser.add_argument('--server', action='store_true', help="Go through a local WSGI server instead of the test client")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument('--repeat', type=int, default=3, help="Requests per voter in the candidates/results scenarios")
+    parser.add_argument('--export-repeat', type=int, default=5, help="CSV exports in the export scenario")
+    parser.add_argument('--seed', type=int, default=1, help="Ballot randomization seed")
+    parser.add_argument('--settle', type=float, default=1.2, help="Seconds to wait before measuring data growth")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--keep-data', action='store_true', help="Keep the temporary data folder")
+    parser.add_argument('--verbose', action='store_true', help="Show the application's own output")
+    args = parser.parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    # The data folder, roster and Google endpoints are configured through the environment, so all of
+    # this has to happen before the application (and its Config) is imported
+    data_folder = prepare_data_folder(args.voters)
+    if args.keep_data:
+        print(f"Data folder: {data_folder}", file=sys.stderr)
+    else:
+        atexit.register(shutil.rmtree, data_folder, True) # Registered first, so it runs after the app's exit flushes
+    fake_google = FakeGoogle()
+    os.environ.update(fake_google.environment())
+    os.environ.update({'DATA_FOLDER': data_folder, 'STORAGE_BACKEND': args.storage,
+                       'PHOENIX_ADMIN_EMAILS': '', 'PHOENIX_ELIGIBLE_VOTER_EMAILS': ''})
+
+    report_stream = sys.stdout
+    app_output = sys.stderr if args.verbose else open(os.devnull, 'w')
+    with contextlib.redirect_stdout(app_output): # The app prints (e.g. every auth URL); keep stdout for the report
+        from app import create_app
+        app = create_app('production')
+        if not args.verbose:
+            app.logger.setLevel(logging.ERROR)
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = None
+        if args.server:
+            from werkzeug.serving import make_server
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, name='benchmark-server', daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+            new_session = lambda: HTTPSession(base_url)
+        else:
+            new_session = lambda: TestClientSession(app)
+
+        rng = random.Random(args.seed)
+        admin = new_session()
+        voters = [(voter_email(i), new_session()) for i in range(args.voters)]
+        logged_in = False
+
+        def login(email: str, client) -> bool:
+            status, headers, _ = client.request('GET', '/auth/google/login')
+            if status != 302:
+                return False
+            state = parse_qs(urlparse(headers['Location']).query)['state'][0]
+            status, headers, _ = client.request('GET', f'/auth/google/callback?state={state}&code={quote(email)}')
+            return status == 302 and 'authenticated=true' in headers.get('Location', '')
+
+        def expect(status_code: int, method: str, path: str, client, **kwargs) -> Callable[[], bool]:
+            return lambda: client.request(method, path, **kwargs)[0] == status_code
+
+        results = []
+        checks = {}
+        for name in SCENARIOS:
+            if name not in scenarios:
+                continue
+            if name in ('candidates', 'vote', 'results', 'export') and not logged_in:
+                # Untimed setup when the login scenario itself was not selected
+                setup = [lambda e=email, c=client: login(e, c) for email, client in voters]
+                setup.append(lambda: login(ADMIN_EMAIL, admin))
+                run_scenario('setup_login', setup, args.concurrency, data_folder, 0)
+                logged_in = True
+            if name == 'demo_login':
+                jobs = [expect(200, 'POST', '/api/auth/demo', new_session()) for _ in range(args.voters)]
+            elif name == 'login':
+                jobs = [lambda e=email, c=client: login(e, c) for email, client in voters]
+                jobs.append(lambda: login(ADMIN_EMAIL, admin))
+                logged_in = True
+            elif name == 'candidates':
+                jobs = [expect(200, 'GET', '/api/candidates', client) for _, client in voters for _ in range(args.repeat)]
+            elif name == 'vote':
+                candidate_ids = [c['id'] for c in json.loads(admin.request('GET', '/api/candidates')[2])]
+                jobs = [expect(200, 'POST', '/api/votes/submit', client, json=random_ballot(candidate_ids, rng))
+                        for _, client in voters]
+            elif name == 'results':
+                # Results are only published once voting has closed
+                if json.loads(admin.request('GET', '/api/election/status')[2]).get('is_open'):
+                    admin.request('POST', '/api/admin/election/toggle', json={})
+                jobs = [expect(200, 'GET', '/api/results', client) for _, client in voters for _ in range(args.repeat)]
+            else: # export
+                jobs = [expect(200, 'GET', '/api/admin/votes/export/csv', admin) for _ in range(args.export_repeat)]
+            result = run_scenario(name, jobs, args.concurrency, data_folder, args.settle)
+            results.append(result)
+            print(f"{name:<11} {result['ops']:>7} ops {result['errors']:>5} err {result['throughput'] or 0:>9.1f} op/s  "
+                  f"p50 {result['latencyMs']['p50Ms'] or 0:>8.2f}  p95 {result['latencyMs']['p95Ms'] or 0:>8.2f}  "
+                  f"p99 {result['latencyMs']['p99Ms'] or 0:>8.2f} ms  +{result['dataGrowthBytes']} B", file=sys.stderr)
+
+        # End-of-run consistency checks and the app's own cache counters
+        status, _, body = admin.request('GET', '/api/results')
+        if status == 200 and 'vote' in scenarios:
+            total_votes = json.loads(body).get('totalVotes')
+            checks['totalVotes'] = total_votes
+            checks['votesMatch'] = total_votes == args.voters - next(r['errors'] for r in results if r['name'] == 'vote')
+        status, _, body = admin.request('GET', '/api/admin/cache/stats')
+        app_stats = json.loads(body) if status == 200 else None
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        'meta': {
+            'startedAt': started_at,
+            'storage': args.storage,
+            'mode': 'server' if args.server else 'test_client',
+            'voters': args.voters,
+            'concurrency': args.concurrency,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'scenarios': results,
+        'checks': checks,
+        'fakeGoogleRequests': fake_google.requests,
+        'appStats': app_stats,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output, file=report_stream)
+    return 1 if any(r['errors'] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
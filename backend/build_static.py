@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Frontend Build for Phoenix Council Elections
+
+Bundles the local scripts referenced by frontend/index.html (in page order) into one file, minifies it (with
+rjsmin, if installed) and the stylesheets, names each output after its content hash and writes .gz (and .br, if
+the brotli package is installed) variants next to it. If node is installed, the bundle must parse (node --check)
+or nothing is written. index.html is rewritten to the hashed names. Everything goes to frontend/dist,
+which the app serves with immutable caching (see utils/static_assets.py). Rerun after editing the frontend;
+until then the app falls back to the unbuilt files.
+
+Usage:
+    python3 build_static.py                 # frontend -> frontend/dist
+    python3 build_static.py --no-minify     # bundle and hash only (readable output for debugging)
+    python3 build_static.py --check         # exit 1 if frontend/dist is missing or stale
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.static_assets import MANIFEST_NAME, content_hash, source_hashes
+try:
+    import brotli # Optional: pip install brotli
+except ImportError:
+    brotli = None
+try:
+    import rjsmin # Optional: pip install rjsmin
+except ImportError:
+    rjsmin = None
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
+DIST_DIR = os.path.join(FRONTEND_DIR, 'dist')
+BUNDLE_NAME = 'js/app.js'
+COMPRESS_MIN_BYTES = 256 # Smaller files aren't worth a compressed variant
+
+SCRIPT_TAG = re.compile(r'[ \t]*<script\s+src="(?!https?:|//)([^"]+\.js)"\s*>\s*</script>[ \t]*\n?')
+STYLESHEET_HREF = re.compile(r'(<link\s+rel="stylesheet"\s+href=")(?!https?:|//)([^"]+\.css)(")')
+
+# --- Minifiers ---
+# JavaScript goes through rjsmin, an established minifier; without it the bundle is left unminified rather
+# than risk a hand-rolled one. The CSS minifier below only drops comments and whitespace.
+def minify_js(source: str) -> str:
+    if rjsmin is None:
+        return source
+    return rjsmin.jsmin(source) + '\n'
+
+def check_js_syntax(path: str) -> Optional[str]:
+    """Parses a script with `node --check`: an error message, or None if it parses (or node isn't installed)."""
+    node = shutil.which('node')
+    if node is None:
+        return None
+    result = subprocess.run([node, '--check', path], capture_output=True, text=True)
+    if result.returncode == 0:
+        return None
+    return (result.stderr or result.stdout).strip() or 'syntax error'
+
+def minify_css(source: str) -> str:
+    out = []
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in '"\'':
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+        elif c.isspace():
+            while i < n and source[i].isspace():
+                i += 1
+            if out and out[-1] not in '{};,:>' and i < n and source[i] not in '{};,>':
+                out.append(' ')
+        else:
+            if c in '{},>' and out and out[-1] == ' ':
+                out.pop()
+            if c == '}' and out and out[-1] == ';':
+                out.pop() # Last declaration needs no semicolon
+            out.append(c)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+# --- Build ---
+def _hashed_name(logical: str, data: bytes) -> str:
+    root, ext = os.path.splitext(logical)
+    return f"{root}.{content_hash(data)}{ext}"
+
+def _write(relpath: str, data: bytes):
+    """Writes a dist file plus its compressed variants."""
+    path = os.path.join(DIST_DIR, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if len(data) < COMPRESS_MIN_BYTES:
+        return
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0)) # mtime=0: identical input, identical output
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+def _read(relpath: str) -> str:
+    with open(os.path.join(FRONTEND_DIR, relpath), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def build(minify: bool = True) -> dict:
+    html = _read('index.html')
+    scripts = SCRIPT_TAG.findall(html)
+    stylesheets = [match[1] for match in STYLESHEET_HREF.findall(html)]
+    assets = {}
+
+    # One bundle for all local scripts. They are classic scripts sharing globals, so concatenation keeps their
+    # semantics; the ';' guards against a file that ends without one.
+    bundle = ''.join(f"/* {name} */\n{minify_js(_read(name)) if minify else _read(name)}\n;\n" for name in scripts)
+    bundle_bytes = bundle.encode('utf-8')
+    assets[BUNDLE_NAME] = _hashed_name(BUNDLE_NAME, bundle_bytes)
+    with tempfile.NamedTemporaryFile('wb', suffix='.js', delete=False) as f:
+        f.write(bundle_bytes)
+    try:
+        error = check_js_syntax(f.name)
+    finally:
+        os.remove(f.name)
+    if error:
+        raise SyntaxError(f"The JavaScript bundle does not parse; frontend/dist was left as it was.\n{error}")
+
+    styles = {}
+    for name in stylesheets:
+        css = _read(name)
+        styles[name] = (minify_css(css) if minify else css).encode('utf-8')
+        assets[name] = _hashed_name(name, styles[name])
+
+    # index.html: the first local script tag becomes the bundle, the others go
+    tags = iter(range(len(scripts)))
+    html = SCRIPT_TAG.sub(lambda m: f'    <script src="{assets[BUNDLE_NAME]}"></script>\n' if next(tags) == 0 else '', html)
+    html = STYLESHEET_HREF.sub(lambda m: m.group(1) + assets[m.group(2)] + m.group(3), html)
+
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    _write(assets[BUNDLE_NAME], bundle_bytes)
+    for name, data in styles.items():
+        _write(assets[name], data)
+    _write('index.html', html.encode('utf-8'))
+
+    manifest = {
+        'builtAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'assets': assets,
+        'sources': source_hashes(FRONTEND_DIR, ['index.html'] + scripts + stylesheets)
+    }
+    with open(os.path.join(DIST_DIR, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def _size_report(manifest: dict):
+    for relpath in list(manifest['assets'].values()) + ['index.html']:
+        path = os.path.join(DIST_DIR, relpath)
+        sizes = [f"{os.path.getsize(path):>8} B"]
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(path + suffix):
+                sizes.append(f"{suffix[1:]} {os.path.getsize(path + suffix):>7} B")
+        print(f"  {relpath:<32} " + '  '.join(sizes))
+
+def check() -> int:
+    try:
+        with open(os.path.join(DIST_DIR, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            sources = json.load(f).get('sources', {})
+    except (OSError, ValueError):
+        print(f"❌ No build in {DIST_DIR}")
+        return 1
+    stale = [name for name, digest in source_hashes(FRONTEND_DIR, sources).items() if digest != sources[name]]
+    if stale:
+        print(f"❌ Stale build; changed since: {', '.join(sorted(stale))}")
+        return 1
+    print("✅ Build is up to date")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the frontend into frontend/dist.')
+    parser.add_argument('--no-minify', action='store_true', help='Bundle and hash without minifying')
+    parser.add_argument('--check', action='store_true', help='Only check that the build is up to date')
+    args = parser.parse_args()
+    if args.check:
+        return check()
+    print("📦 Building frontend for Phoenix Council Elections")
+    print("=" * 60)
+    try:
+        manifest = build(minify=not args.no_minify)
+    except SyntaxError as e:
+        print(f"❌ {e}")
+        return 1
+    _size_report(manifest)
+    if rjsmin is None and not args.no_minify:
+        print("ℹ️  rjsmin not installed: JavaScript was bundled unminified (pip install rjsmin)")
+    if shutil.which('node') is None:
+        print("ℹ️  node not installed: the bundle's syntax was not checked")
+    if brotli is None:
+        print("ℹ️  brotli not installed: wrote gzip variants only (pip install brotli for .br files)")
+    print(f"✅ Wrote {DIST_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
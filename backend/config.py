@@ -5,7 +5,71 @@ class Config:
     FRONTEND_URL = os.environ.get('FRONTEND_URL') or 'https://majiddaas2.pythonanywhere.com'
     ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD') or 'admin2024'
     # Adjust the path logic here if your data folder is located differently relative to config.py
-    DATA_FOLDER = os.path.join(os.path.dirname(__file__), 'data') # e.g., /path/to/config.py/data
+    DATA_FOLDER = os.environ.get('DATA_FOLDER') or os.path.join(os.path.dirname(__file__), 'data') # e.g., /path/to/config.py/data
+    # Number of journaled ballots after which the vote journal is folded into votes.json (0 = only on startup/export)
+    VOTES_SNAPSHOT_INTERVAL = int(os.environ.get('VOTES_SNAPSHOT_INTERVAL') or 100)
+    # Vote snapshot format for the JSON backend: 'json' (votes.json) or 'binary' (compact votes.bin, see migrate_votes.py)
+    VOTES_SNAPSHOT_FORMAT = os.environ.get('VOTES_SNAPSHOT_FORMAT') or 'json'
+    # Storage backend: 'json' (flat files in DATA_FOLDER) or 'sqlite' (WAL-mode database, safe for several workers)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'json'
+    SQLITE_DATABASE = os.environ.get('SQLITE_DATABASE') or os.path.join(DATA_FOLDER, 'phoenix.db')
+    # Default column layout of the CSV vote export (see utils/csv_export.py); overridable per request with ?columns=
+    CSV_EXPORT_COLUMNS = os.environ.get('CSV_EXPORT_COLUMNS') or 'voter,executive,council'
+    # Server-sent events (/api/events): status poll and turnout push intervals in seconds, and a cap on
+    # open connections per worker (each one holds a worker thread; clients fall back to polling beyond it)
+    EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL') or 1.0)
+    EVENTS_TURNOUT_INTERVAL = float(os.environ.get('EVENTS_TURNOUT_INTERVAL') or 10.0)
+    EVENTS_MAX_CLIENTS = int(os.environ.get('EVENTS_MAX_CLIENTS') or 500)
+    # Voter sessions: lifetime, in-memory LRU size, write-behind flush and expired-session sweep intervals (seconds)
+    SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS') or 24 * 3600)
+    SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE') or 10000)
+    SESSION_FLUSH_INTERVAL = float(os.environ.get('SESSION_FLUSH_INTERVAL') or 1.0)
+    SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL') or 300)
+    # Login audit log (data/voter_login_log.ndjson): rotate at this size or age; gzip rotated segments
+    LOGIN_LOG_MAX_BYTES = int(os.environ.get('LOGIN_LOG_MAX_BYTES') or 10 * 1024 * 1024)
+    LOGIN_LOG_MAX_AGE_SECONDS = int(os.environ.get('LOGIN_LOG_MAX_AGE_SECONDS') or 24 * 3600)
+    LOGIN_LOG_COMPRESS = (os.environ.get('LOGIN_LOG_COMPRESS') or 'true').lower() in ('1', 'true', 'yes')
+    # Language detection (/api/language): optional offline CIDR -> country CSV, remote fallback (used only with
+    # IPINFO_TOKEN; point GEOIP_LOOKUP_URL at a local stand-in for testing), cache size and TTL in seconds
+    GEOIP_DATABASE = os.environ.get('GEOIP_DATABASE') or os.path.join(DATA_FOLDER, 'geoip.csv')
+    GEOIP_LOOKUP_URL = os.environ.get('GEOIP_LOOKUP_URL') or 'https://ipinfo.io/{ip}/country'
+    GEOIP_TIMEOUT = float(os.environ.get('GEOIP_TIMEOUT') or 2.0)
+    GEOIP_CACHE_SIZE = int(os.environ.get('GEOIP_CACHE_SIZE') or 10000)
+    GEOIP_CACHE_TTL = float(os.environ.get('GEOIP_CACHE_TTL') or 86400)
+    GEOIP_WAIT = float(os.environ.get('GEOIP_WAIT') or 0.5) # Seconds a request waits for a remote lookup
+    # Outbound calls to Google and ipinfo.io (see utils/outbound.py): pool threads, calls in flight before new ones
+    # are refused, seconds a request waits for one (well below the HTTP timeouts, or it never cuts a call short),
+    # seconds a whole Google login may wait, and the per-upstream circuit breaker (failures to open, seconds open)
+    OUTBOUND_MAX_WORKERS = int(os.environ.get('OUTBOUND_MAX_WORKERS') or 8)
+    OUTBOUND_MAX_PENDING = int(os.environ.get('OUTBOUND_MAX_PENDING') or 32)
+    OUTBOUND_TIMEOUT = float(os.environ.get('OUTBOUND_TIMEOUT') or 3.0)
+    LOGIN_DEADLINE = float(os.environ.get('LOGIN_DEADLINE') or 5.0)
+    OUTBOUND_FAILURE_THRESHOLD = int(os.environ.get('OUTBOUND_FAILURE_THRESHOLD') or 5)
+    OUTBOUND_RESET_TIMEOUT = float(os.environ.get('OUTBOUND_RESET_TIMEOUT') or 30.0)
+    # Candidate photos (see utils/photos.py): remote photos are downloaded once into PHOTOS_FOLDER and served
+    # locally as square thumbnails of PHOTO_SIZE pixels (JPEG + WebP; needs Pillow); max download size
+    PHOTO_CACHE = (os.environ.get('PHOTO_CACHE') or 'true').lower() in ('1', 'true', 'yes')
+    PHOTOS_FOLDER = os.environ.get('PHOTOS_FOLDER') or os.path.join(DATA_FOLDER, 'photos')
+    PHOTO_SIZE = int(os.environ.get('PHOTO_SIZE') or 200)
+    PHOTO_MAX_BYTES = int(os.environ.get('PHOTO_MAX_BYTES') or 5 * 1024 * 1024)
+    PHOTO_TIMEOUT = float(os.environ.get('PHOTO_TIMEOUT') or 10.0) # HTTP timeout of a photo download
+    # Comma-separated photo hosts to fetch from. Empty: any host that resolves only to public addresses
+    PHOTO_ALLOWED_HOSTS = os.environ.get('PHOTO_ALLOWED_HOSTS') or ''
+
+    # Election phase ticker: how often (seconds) to look for schedule changes; scheduled open/close is exact
+    ELECTION_PHASE_CHECK_INTERVAL = float(os.environ.get('ELECTION_PHASE_CHECK_INTERVAL') or 1.0)
+    # Voter roster (see utils/roster.py): CSV 'email,role' or NDJSON file of eligible voters and admins, merged with
+    # PHOENIX_ELIGIBLE_VOTER_EMAILS / PHOENIX_ADMIN_EMAILS; optional Bloom-filter pre-check; file change check interval
+    VOTER_ROSTER_FILE = os.environ.get('VOTER_ROSTER_FILE') or os.path.join(DATA_FOLDER, 'voter_roster.csv')
+    ROSTER_BLOOM_FILTER = (os.environ.get('ROSTER_BLOOM_FILTER') or 'false').lower() in ('1', 'true', 'yes')
+    ROSTER_RELOAD_INTERVAL = float(os.environ.get('ROSTER_RELOAD_INTERVAL') or 2.0)
+    # Built frontend (python3 build_static.py): hashed, minified, precompressed assets served with immutable
+    # caching; set to '' to always serve the unbuilt frontend folder
+    STATIC_DIST_FOLDER = os.environ.get('STATIC_DIST_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'dist'))
+    # Serve index.html pre-rendered per language and privacy tier (see utils/prerender.py)
+    PRERENDER_INDEX = (os.environ.get('PRERENDER_INDEX') or 'true').lower() in ('1', 'true', 'yes')
+    # Prometheus metrics (/api/admin/metrics): readable by admins, or by a scraper sending 'Authorization: Bearer <token>'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or ''
 
     # Google OAuth2 Configuration
     # To set up Google OAuth2:
@@ -22,6 +86,14 @@ class Config:
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET') or ''
     # --- FIX: Removed trailing spaces ---
     GOOGLE_REDIRECT_URI = os.environ.get('GOOGLE_REDIRECT_URI') or 'https://majiddaas2.pythonanywhere.com/auth/google/callback' # <-- No trailing spaces
+    # Google endpoints (defaults in utils/auth.py; override to test against a local fake OAuth server, which
+    # over plain http also needs OAUTHLIB_INSECURE_TRANSPORT=1), request timeout and connection pool size
+    GOOGLE_AUTH_URI = os.environ.get('GOOGLE_AUTH_URI')
+    GOOGLE_TOKEN_URI = os.environ.get('GOOGLE_TOKEN_URI')
+    GOOGLE_CERTS_URL = os.environ.get('GOOGLE_CERTS_URL')
+    GOOGLE_USERINFO_URL = os.environ.get('GOOGLE_USERINFO_URL')
+    GOOGLE_HTTP_TIMEOUT = float(os.environ.get('GOOGLE_HTTP_TIMEOUT') or 10.0)
+    GOOGLE_HTTP_POOL_SIZE = int(os.environ.get('GOOGLE_HTTP_POOL_SIZE') or 10)
 
     @staticmethod
     def init_app(app):
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Vote File Migration for Phoenix Council Elections
+
+Converts data/votes.json (plus any ballots still in the vote journal) to the compact
+binary ballot format in data/votes.bin, or back again with --to-json.
+
+Usage:
+    python3 migrate_votes.py            # votes.json -> votes.bin
+    python3 migrate_votes.py --to-json  # votes.bin  -> votes.json
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models import encode_votes, decode_votes, encode_timestamp, decode_timestamp
+from utils.storage import (
+    JSONStorage, _save_json_file, _save_binary_file,
+    VOTES_FILE, VOTES_BINARY_FILE
+)
+
+
+def _stored_timestamp(timestamp):
+    """The timestamp as the binary format keeps it (UTC, microseconds); None if unreadable (encode_votes warns)."""
+    try:
+        return decode_timestamp(encode_timestamp(timestamp))
+    except (ValueError, TypeError, AttributeError, OverflowError):
+        return None
+
+
+def _same_ballots(a, b) -> bool:
+    """Compares ballots ignoring selection order (bitsets store selections in id order)."""
+    if a.voter_ids != b.voter_ids or len(a.votes) != len(b.votes):
+        return False
+    for x, y in zip(a.votes, b.votes):
+        if (x.id, x.voter_id, x.voter_name, x.voter_email) != (y.id, y.voter_id, y.voter_name, y.voter_email):
+            return False
+        if sorted(x.selected_candidates) != y.selected_candidates or sorted(x.executive_candidates) != y.executive_candidates:
+            return False
+        if _stored_timestamp(x.timestamp) != y.timestamp:
+            return False
+    return True
+
+
+def to_binary() -> int:
+    votes_data = JSONStorage().load_votes() # votes.json plus journaled ballots
+    encoded = encode_votes(votes_data)
+    if not _same_ballots(votes_data, decode_votes(encoded)):
+        print("❌ Round-trip check failed; votes.bin was not written.")
+        return 1
+    if not _save_binary_file(VOTES_BINARY_FILE, encoded):
+        return 1
+    json_size = os.path.getsize(VOTES_FILE) if os.path.exists(VOTES_FILE) else 0
+    print(f"✅ Wrote {len(votes_data.votes)} ballots to {VOTES_BINARY_FILE}")
+    print(f"   votes.json: {json_size:,} bytes -> votes.bin: {len(encoded):,} bytes")
+    print()
+    print("To use it, set VOTES_SNAPSHOT_FORMAT=binary and restart the app.")
+    print("votes.json is then only rewritten when votes are exported.")
+    return 0
+
+
+def to_json() -> int:
+    if not os.path.exists(VOTES_BINARY_FILE):
+        print(f"❌ {VOTES_BINARY_FILE} not found.")
+        return 1
+    with open(VOTES_BINARY_FILE, 'rb') as f:
+        votes_data = decode_votes(f.read())
+    if not _save_json_file(VOTES_FILE, votes_data.to_dict()):
+        return 1
+    print(f"✅ Wrote {len(votes_data.votes)} ballots to {VOTES_FILE}")
+    print("Unset VOTES_SNAPSHOT_FORMAT (or set it to json) before restarting the app.")
+    return 0
+
+
+def main():
+    print("🗳️  Vote file migration for Phoenix Council Elections")
+    print("=" * 60)
+    if '--to-json' in sys.argv[1:]:
+        return to_json()
+    return to_binary()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
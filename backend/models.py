@@ -1,9 +1,17 @@
 # models.py
-from dataclasses import dataclass, asdict
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from dataclasses import dataclass, asdict, field, fields
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+from datetime import datetime, timezone
+import struct
+import sys
 
-@dataclass
+# Slotted dataclasses (no per-instance __dict__) where supported (Python 3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Keys considered 'private' (omitted from to_dict(include_private=False)); matches data_handler.py
+CANDIDATE_PRIVATE_KEYS = frozenset({'email', 'phone', 'place_of_birth', 'residence', 'full_name', 'date_of_birth'})
+
+@dataclass(**_SLOTS)
 class Candidate:
     # --- Core fields present or expected in the application data flow ---
     id: int
@@ -27,20 +35,15 @@ class Candidate:
     facebook_url: str = "" 
 
     def to_dict(self, include_private: bool = False) -> Dict[str, Any]:
-        """Converts the Candidate object to a dictionary."""
-        # Use asdict to get all fields defined in the dataclass
-        data = asdict(self)
-        
-        # Define which keys are considered 'private' and should be conditionally included
-        # Updated based on data_handler.py logic for private fields
-        private_keys = ['email', 'phone', 'place_of_birth', 'residence','full_name','date_of_birth']
-        
-        # If private fields should NOT be included, remove them
-        if not include_private:
-            for key in private_keys:
-                data.pop(key, None) # Remove key if it exists, do nothing if it doesn't
-                
-        return data
+        """Converts the Candidate object to a dictionary (fields in declaration order)."""
+        # Plain attribute reads: asdict() would deep-copy every field recursively
+        if include_private:
+            return {name: getattr(self, name) for name in CANDIDATE_FIELDS}
+        return {name: getattr(self, name) for name in CANDIDATE_PUBLIC_FIELDS}
+
+# Field names, and the subset served without the private keys
+CANDIDATE_FIELDS = tuple(f.name for f in fields(Candidate))
+CANDIDATE_PUBLIC_FIELDS = tuple(name for name in CANDIDATE_FIELDS if name not in CANDIDATE_PRIVATE_KEYS)
 
 # --- MODIFIED: Vote dataclass ---
 @dataclass
@@ -91,6 +94,37 @@ class VotesData:
             "votes": [vote.to_dict() for vote in self.votes]
         }
 
+@dataclass
+class ResultsTally:
+    """Running council/executive vote counts per candidate, updated one ballot at a time."""
+    vote_count: int = 0
+    council_votes: Dict[int, int] = field(default_factory=dict)
+    executive_votes: Dict[int, int] = field(default_factory=dict)
+
+    def add_ballot(self, selected_candidates: List[int], executive_candidates: List[int]):
+        self.vote_count += 1
+        for candidate_id in selected_candidates:
+            self.council_votes[candidate_id] = self.council_votes.get(candidate_id, 0) + 1
+        for candidate_id in executive_candidates:
+            self.executive_votes[candidate_id] = self.executive_votes.get(candidate_id, 0) + 1
+
+    def copy(self) -> 'ResultsTally':
+        return ResultsTally(self.vote_count, dict(self.council_votes), dict(self.executive_votes))
+
+    def to_results(self, candidates: List[Candidate]) -> List[Dict[str, Any]]:
+        """Results rows for the given candidates, sorted by council then executive votes."""
+        results = [
+            {
+                'id': candidate.id,
+                'name': candidate.name,
+                'councilVotes': self.council_votes.get(candidate.id, 0),
+                'executiveVotes': self.executive_votes.get(candidate.id, 0)
+            }
+            for candidate in candidates
+        ]
+        results.sort(key=lambda x: (-x['councilVotes'], -x['executiveVotes']))
+        return results
+
 @dataclass
 class ElectionStatus:
     # Using __init__ to handle datetime conversion is fine
@@ -130,3 +164,163 @@ class ElectionStatus:
             end_time=end_time
         )
 
+# --- Compact binary ballot encoding ---
+# Layout of a ballot file (all integers little-endian):
+#   header    magic 'PHXV', format version (u8), flags (u8), bitset width in bytes (u16),
+#             ballot count (u32), explicit voter_ids count (u32)
+#   ballots   ballot count x fixed-width records: timestamp in microseconds since the epoch (i64,
+#             BALLOT_NO_TIMESTAMP if unknown), council bitset, executive bitset
+#   identity  ballot count x (vote id, voter id, voter name, voter email), each u16 length + UTF-8
+#   voter_ids only if flags & BALLOT_FLAG_VOTER_IDS: explicit voter_ids list (u16 length + UTF-8 each),
+#             otherwise voter_ids is the voter id of each ballot in order
+# Bit n of a bitset is set when candidate id n was selected, so selections decode in ascending id order.
+BALLOT_FILE_MAGIC = b'PHXV'
+BALLOT_FILE_VERSION = 1
+BALLOT_FLAG_VOTER_IDS = 0x01
+BALLOT_NO_TIMESTAMP = -(2 ** 63)
+_BALLOT_HEADER = struct.Struct('<4sBBHII')
+BALLOT_HEADER_SIZE = _BALLOT_HEADER.size
+_BALLOT_TIMESTAMP = struct.Struct('<q')
+_STRING_LENGTH = struct.Struct('<H')
+
+def encode_candidate_bitset(candidate_ids: List[int], width: int) -> bytes:
+    """Packs candidate ids into a fixed-width bitset."""
+    bits = 0
+    for candidate_id in candidate_ids:
+        bits |= 1 << candidate_id
+    return bits.to_bytes(width, 'little')
+
+def decode_candidate_bitset(data: bytes) -> List[int]:
+    """Unpacks a bitset into a sorted list of candidate ids."""
+    bits = int.from_bytes(data, 'little')
+    candidate_ids = []
+    while bits:
+        low_bit = bits & -bits
+        candidate_ids.append(low_bit.bit_length() - 1)
+        bits ^= low_bit
+    return candidate_ids
+
+def encode_timestamp(timestamp: Optional[str]) -> int:
+    """ISO timestamp -> microseconds since the epoch (naive times are taken as UTC)."""
+    if not timestamp:
+        return BALLOT_NO_TIMESTAMP
+    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+def encode_ballot_timestamp(vote: 'Vote') -> int:
+    """encode_timestamp() of a ballot's timestamp; an unreadable one is stored as unknown rather than failing."""
+    try:
+        return encode_timestamp(vote.timestamp)
+    except (ValueError, TypeError, AttributeError, OverflowError):
+        print(f"Warning: Ballot {vote.id} has an unreadable timestamp {vote.timestamp!r}; storing it without one.")
+        return BALLOT_NO_TIMESTAMP
+
+def decode_timestamp(micros: int) -> Optional[str]:
+    if micros == BALLOT_NO_TIMESTAMP:
+        return None
+    seconds, micro = divmod(micros, 1_000_000)
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(microsecond=micro).isoformat()
+
+def _encode_string(value: str) -> bytes:
+    data = (value or '').encode('utf-8')
+    if len(data) > 0xFFFF:
+        raise ValueError(f"String too long for ballot encoding ({len(data)} bytes)")
+    return _STRING_LENGTH.pack(len(data)) + data
+
+def _decode_string(data: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _STRING_LENGTH.unpack_from(data, offset)
+    offset += _STRING_LENGTH.size
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+def encode_votes(votes_data: VotesData) -> bytes:
+    """Encodes VotesData into the compact binary ballot format."""
+    all_ids = [cid for vote in votes_data.votes for cid in vote.selected_candidates + vote.executive_candidates]
+    if any(not isinstance(cid, int) or cid < 0 for cid in all_ids):
+        raise ValueError("Candidate ids must be non-negative integers for bitset encoding")
+    width = max(all_ids, default=0) // 8 + 1
+    derived_voter_ids = [vote.voter_id for vote in votes_data.votes]
+    flags = 0 if list(votes_data.voter_ids) == derived_voter_ids else BALLOT_FLAG_VOTER_IDS
+    parts = [_BALLOT_HEADER.pack(BALLOT_FILE_MAGIC, BALLOT_FILE_VERSION, flags, width, len(votes_data.votes),
+                                 len(votes_data.voter_ids) if flags & BALLOT_FLAG_VOTER_IDS else 0)]
+    for vote in votes_data.votes:
+        parts.append(_BALLOT_TIMESTAMP.pack(encode_ballot_timestamp(vote)))
+        parts.append(encode_candidate_bitset(vote.selected_candidates, width))
+        parts.append(encode_candidate_bitset(vote.executive_candidates, width))
+    for vote in votes_data.votes:
+        for value in (vote.id, vote.voter_id, vote.voter_name, vote.voter_email):
+            parts.append(_encode_string(value))
+    if flags & BALLOT_FLAG_VOTER_IDS:
+        parts.extend(_encode_string(voter_id) for voter_id in votes_data.voter_ids)
+    return b''.join(parts)
+
+def read_ballot_header(data: bytes) -> Tuple[int, int, int, int]:
+    """Validates the header. Returns (flags, bitset width, ballot count, explicit voter_ids count)."""
+    if len(data) < _BALLOT_HEADER.size:
+        raise ValueError("Ballot data too short")
+    magic, version, flags, width, ballot_count, voter_id_count = _BALLOT_HEADER.unpack_from(data, 0)
+    if magic != BALLOT_FILE_MAGIC or version != BALLOT_FILE_VERSION:
+        raise ValueError(f"Not a version {BALLOT_FILE_VERSION} ballot file")
+    return flags, width, ballot_count, voter_id_count
+
+def _skip_string(data: bytes, offset: int) -> int:
+    (length,) = _STRING_LENGTH.unpack_from(data, offset)
+    return offset + _STRING_LENGTH.size + length
+
+def iter_ballot_selections(data: bytes) -> Iterator[Tuple[List[int], List[int]]]:
+    """Yields (council ids, executive ids) per ballot without decoding the identity table (for the tally)."""
+    _, width, ballot_count, _ = read_ballot_header(data)
+    offset = _BALLOT_HEADER.size + _BALLOT_TIMESTAMP.size
+    record_size = _BALLOT_TIMESTAMP.size + 2 * width
+    for _ in range(ballot_count):
+        yield (decode_candidate_bitset(data[offset:offset + width]),
+               decode_candidate_bitset(data[offset + width:offset + 2 * width]))
+        offset += record_size
+
+def read_ballot_voter_ids(data: bytes) -> List[str]:
+    """The voter_ids list, decoding only the voter id strings (for the has-voted index)."""
+    flags, width, ballot_count, voter_id_count = read_ballot_header(data)
+    offset = _BALLOT_HEADER.size + ballot_count * (_BALLOT_TIMESTAMP.size + 2 * width)
+    voter_ids = []
+    for _ in range(ballot_count):
+        offset = _skip_string(data, offset) # Vote id
+        voter_id, offset = _decode_string(data, offset)
+        offset = _skip_string(data, _skip_string(data, offset)) # Voter name and email
+        voter_ids.append(voter_id)
+    if flags & BALLOT_FLAG_VOTER_IDS:
+        voter_ids = []
+        for _ in range(voter_id_count):
+            voter_id, offset = _decode_string(data, offset)
+            voter_ids.append(voter_id)
+    return voter_ids
+
+def decode_votes(data: bytes) -> VotesData:
+    """Decodes the compact binary ballot format back into VotesData."""
+    flags, width, ballot_count, voter_id_count = read_ballot_header(data)
+    offset = _BALLOT_HEADER.size
+    records = []
+    for _ in range(ballot_count):
+        (micros,) = _BALLOT_TIMESTAMP.unpack_from(data, offset)
+        offset += _BALLOT_TIMESTAMP.size
+        selected = decode_candidate_bitset(data[offset:offset + width])
+        executive = decode_candidate_bitset(data[offset + width:offset + 2 * width])
+        offset += 2 * width
+        records.append((micros, selected, executive))
+    votes = []
+    for micros, selected, executive in records:
+        vote_id, offset = _decode_string(data, offset)
+        voter_id, offset = _decode_string(data, offset)
+        voter_name, offset = _decode_string(data, offset)
+        voter_email, offset = _decode_string(data, offset)
+        votes.append(Vote(id=vote_id, voter_id=voter_id, selected_candidates=selected, executive_candidates=executive,
+                          timestamp=decode_timestamp(micros), voter_name=voter_name, voter_email=voter_email))
+    if flags & BALLOT_FLAG_VOTER_IDS:
+        voter_ids = []
+        for _ in range(voter_id_count):
+            voter_id, offset = _decode_string(data, offset)
+            voter_ids.append(voter_id)
+    else:
+        voter_ids = [vote.voter_id for vote in votes]
+    return VotesData(voter_ids=voter_ids, votes=votes)
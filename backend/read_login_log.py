@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Login Audit Log Reader for Phoenix Council Elections
+
+Streams login entries from data/voter_login_log.ndjson and its rotated (possibly gzipped)
+segments, oldest first, plus the older voter_login_log.json list if present. One JSON entry
+is printed per line.
+
+Usage:
+    python3 read_login_log.py                                  # all entries
+    python3 read_login_log.py --email voter@example.com
+    python3 read_login_log.py --google-id 1234567890
+    python3 read_login_log.py --since 2025-09-13T08:00:00Z --until 2025-09-13T20:00:00Z
+    python3 read_login_log.py --count                          # number of matching entries only
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils.audit_log import iter_audit_log
+
+LOGIN_LOG_FILE = os.path.join(Config.DATA_FOLDER, 'voter_login_log.ndjson')
+LEGACY_LOGIN_LOG_FILE = os.path.join(Config.DATA_FOLDER, 'voter_login_log.json')
+
+
+def _timestamp(value: str) -> datetime.datetime:
+    dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream and filter the login audit log.")
+    parser.add_argument('--email', help="Only entries for this email")
+    parser.add_argument('--google-id', help="Only entries for this Google user ID")
+    parser.add_argument('--since', type=_timestamp, help="Only entries at or after this ISO time (UTC if no offset)")
+    parser.add_argument('--until', type=_timestamp, help="Only entries before this ISO time")
+    parser.add_argument('--count', action='store_true', help="Print the number of matching entries only")
+    args = parser.parse_args()
+
+    fields = {}
+    if args.email:
+        fields['email'] = args.email
+    if args.google_id:
+        fields['google_id'] = args.google_id
+    entries = iter_audit_log(LOGIN_LOG_FILE, since=args.since, until=args.until,
+                             timestamp_field='login_timestamp', legacy_json_file=LEGACY_LOGIN_LOG_FILE, **fields)
+    if args.count:
+        print(sum(1 for _ in entries))
+        return 0
+    try:
+        for entry in entries:
+            print(json.dumps(entry, ensure_ascii=False))
+    except BrokenPipeError: # e.g. piped into head
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
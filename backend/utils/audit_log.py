@@ -0,0 +1,226 @@
+# utils/audit_log.py
+# Append-only NDJSON audit log with size/age-based rotation and optional gzip of rotated segments.
+# Entries are queued and written by a background thread, so request handlers never wait on audit I/O.
+# Several worker processes may share one log: appends and rotation happen under a lock file.
+import atexit
+import datetime
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+try:
+    import fcntl # Cross-process lock (POSIX only)
+except ImportError:
+    fcntl = None
+from utils.metrics import count_io
+
+class AuditLog:
+    def __init__(self, filepath: str, max_bytes: int = 10 * 1024 * 1024, max_age_seconds: float = 86400,
+                 compress: bool = True, queue_size: int = 10000):
+        self.filepath = filepath # e.g. data/voter_login_log.ndjson; rotated segments get a timestamp suffix
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.compress = compress
+        self._queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock() # The writer thread and the exit flush must not interleave
+        self.written = 0
+        self.dropped = 0
+
+    # --- Producer side ---
+    def record(self, entry: Dict[str, Any]) -> bool:
+        """Queues an entry without blocking. Returns False if the queue is full (entry dropped)."""
+        self._start()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"Warning: Audit log queue full; dropped entry for {self.filepath}")
+            return False
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    # --- Writer side ---
+    def _run(self):
+        while True:
+            entry = self._queue.get() # Block until there is something to write
+            batch = [entry]
+            while True: # Everything else already queued goes into the same write
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        """Writes everything still queued (called at exit)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        data = ''.join(json.dumps(entry, separators=(',', ':'), default=str) + '\n' for entry in batch)
+        try:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            with self._write_lock, open(self.filepath + '.lock', 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    rotated = self._rotate_if_due()
+                    with open(self.filepath, 'a', encoding='utf-8') as f:
+                        f.write(data)
+                    count_io('write', self.filepath, len(data.encode('utf-8')))
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            self.written += len(batch)
+            if rotated and self.compress:
+                self._compress(rotated) # Outside the lock; readers handle both forms
+        except Exception as e:
+            print(f"Error writing audit log {self.filepath}: {e}")
+
+    def _segment_started(self) -> Optional[datetime.datetime]:
+        """Timestamp of the first entry in the current segment."""
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                first = json.loads(f.readline())
+            return _parse_timestamp(first.get('timestamp') or first.get('login_timestamp'))
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _rotate_if_due(self) -> Optional[str]:
+        """Renames the current segment if it is too big or too old. Caller must hold the lock file."""
+        try:
+            size = os.path.getsize(self.filepath)
+        except FileNotFoundError:
+            return None
+        if not size:
+            return None
+        due = size >= self.max_bytes
+        if not due and self.max_age_seconds:
+            started = self._segment_started()
+            due = started is not None and (_utcnow() - started).total_seconds() >= self.max_age_seconds
+        if not due:
+            return None
+        root, ext = os.path.splitext(self.filepath)
+        stamp = _utcnow().strftime('%Y%m%dT%H%M%SZ')
+        rotated = f"{root}.{stamp}{ext}"
+        counter = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + '.gz'):
+            rotated = f"{root}.{stamp}-{counter}{ext}"
+            counter += 1
+        os.replace(self.filepath, rotated)
+        return rotated
+
+    @staticmethod
+    def _compress(filepath: str):
+        try:
+            with open(filepath, 'rb') as src, gzip.open(filepath + '.gz.tmp', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(filepath + '.gz.tmp', filepath + '.gz')
+            os.remove(filepath)
+        except OSError as e:
+            print(f"Error compressing audit log segment {filepath}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {'queued': self._queue.qsize(), 'written': self.written, 'dropped': self.dropped}
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+def _parse_timestamp(value: Any) -> Optional[datetime.datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+# --- Reader ---
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+def audit_log_segments(filepath: str) -> List[str]:
+    """Rotated segments (oldest first), then the current file."""
+    root, ext = os.path.splitext(filepath)
+    rotated = [path for path in glob.glob(f"{glob.escape(root)}.*{ext}*")
+               if path != filepath and not path.endswith(('.tmp', '.lock'))]
+    segments = sorted(rotated, key=lambda path: (_mtime(path), path)) # Segments are never written after rotation
+    if os.path.exists(filepath):
+        segments.append(filepath)
+    return segments
+
+def _iter_segment(path: str) -> Iterator[Dict[str, Any]]:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue # Torn line after a crash
+            if isinstance(entry, dict):
+                yield entry
+
+def iter_audit_log(filepath: str, since: Optional[datetime.datetime] = None,
+                   until: Optional[datetime.datetime] = None, timestamp_field: str = 'timestamp',
+                   legacy_json_file: Optional[str] = None,
+                   match: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                   **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Streams entries from all segments, oldest first, one at a time. Optional filters: a [since, until)
+    time window on timestamp_field, exact field values (e.g. email='a@b.c'), and a match predicate.
+    legacy_json_file, if given, is a pre-NDJSON log (one JSON list) read before the segments.
+    """
+    def sources() -> Iterator[Dict[str, Any]]:
+        if legacy_json_file and os.path.exists(legacy_json_file):
+            try:
+                with open(legacy_json_file, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read legacy log {legacy_json_file}: {e}")
+                legacy = []
+            if isinstance(legacy, list):
+                yield from (entry for entry in legacy if isinstance(entry, dict))
+        for path in audit_log_segments(filepath):
+            try:
+                yield from _iter_segment(path)
+            except FileNotFoundError:
+                continue # Compressed or rotated while we were listing
+
+    for entry in sources():
+        if any(entry.get(key) != value for key, value in fields.items()):
+            continue
+        if since or until:
+            ts = _parse_timestamp(entry.get(timestamp_field))
+            if ts is None or (since and ts < since) or (until and ts >= until):
+                continue
+        if match and not match(entry):
+            continue
+        yield entry
@@ -3,20 +3,46 @@ import os
 import json
 from typing import Optional, Dict, Any, List  # Added List import
 import datetime
+import re
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 
 # --- Imports ---
 from google_auth_oauthlib.flow import Flow
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests  # For token verification
+from google.auth import jwt as google_jwt  # For token verification
+from oauthlib.oauth2.rfc6749.errors import OAuth2Error
 import requests as http_requests  # For general HTTP requests (e.g., userinfo)
+from requests.adapters import HTTPAdapter
+from utils.storage import StorageBackend, get_storage
+from utils.session_store import SessionStore
+from utils.audit_log import AuditLog
+from utils.timing import LatencyRecorder
+from utils.outbound import OutboundExecutor, UpstreamUnavailable
 
 
 class GoogleAuth:
-    def __init__(self, client_id: str, client_secret: str, redirect_uri: str):
+    # Google endpoints; all overridable so a local fake OAuth server can stand in for Google
+    AUTH_URI = 'https://accounts.google.com/o/oauth2/auth'
+    TOKEN_URI = 'https://oauth2.googleapis.com/token'
+    CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs' # Same key set google.oauth2.id_token uses
+    USERINFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
+    DEFAULT_CERTS_TTL = 3600 # Seconds, if the certs response doesn't advertise max-age
+    CERTS_REFRESH_MIN_INTERVAL = 60 # Unknown key IDs trigger at most one early refresh per minute
+
+    def __init__(self, client_id: str, client_secret: str, redirect_uri: str,
+                 auth_uri: Optional[str] = None, token_uri: Optional[str] = None,
+                 certs_url: Optional[str] = None, userinfo_url: Optional[str] = None,
+                 timeout: float = 10.0, pool_size: int = 10, outbound: Optional[OutboundExecutor] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
+        self.certs_url = certs_url or self.CERTS_URL
+        self.userinfo_url = userinfo_url or self.USERINFO_URL
+        self.timeout = timeout
+        self.outbound = outbound # Bounded pool + circuit breaker for the calls to Google (None = call inline)
+        self._deadline = threading.local() # Overall deadline of the calls made in deadline() blocks, per thread
 
         # OAuth2 scopes - REMOVED trailing spaces
         self.scopes = [
@@ -24,22 +50,71 @@ class GoogleAuth:
             'https://www.googleapis.com/auth/userinfo.email',   # CORRECTED: Removed trailing spaces
             'https://www.googleapis.com/auth/userinfo.profile'   # CORRECTED: Removed trailing spaces
         ]
+        # Client config is built once and shared by every Flow
+        self.client_config = {
+            "web": {
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "auth_uri": auth_uri or self.AUTH_URI,
+                "token_uri": token_uri or self.TOKEN_URI,
+                "redirect_uris": [self.redirect_uri]
+            }
+        }
+
+        # One connection pool for all calls to Google (token exchange, certs, userinfo), so logins
+        # reuse keep-alive TLS connections instead of handshaking each time
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.http = http_requests.Session()
+        self.http.mount('https://', self._adapter)
+        self.http.mount('http://', self._adapter)
+
+        # Token verification certificates, cached for their advertised lifetime
+        self._certs: Dict[str, str] = {}
+        self._certs_expire = 0.0 # time.monotonic() deadline
+        self._certs_fetched = 0.0
+        self._certs_lock = threading.Lock()
+        self.cert_fetches = 0
+        self.latency = LatencyRecorder()
+
+    def _flow(self) -> Flow:
+        flow = Flow.from_client_config(self.client_config, scopes=self.scopes)
+        flow.redirect_uri = self.redirect_uri
+        # Flow brings its own OAuth2Session (a requests.Session); route it through the shared pool
+        flow.oauth2session.mount('https://', self._adapter)
+        flow.oauth2session.mount('http://', self._adapter)
+        return flow
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """All calls to Google inside the block together wait at most `seconds` (e.g. a whole login)."""
+        self._deadline.at = time.monotonic() + seconds
+        try:
+            yield
+        finally:
+            self._deadline.at = None
+
+    def _call(self, fn, expected=()):
+        """Runs a network call to Google, on the outbound pool if there is one (may raise UpstreamUnavailable)."""
+        if self.outbound is None:
+            return fn()
+        timeout = None # The executor's per-call deadline
+        deadline = getattr(self._deadline, 'at', None)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise UpstreamUnavailable('google', 'deadline passed')
+            timeout = min(remaining, self.outbound.timeout)
+        return self.outbound.call('google', fn, timeout=timeout, expected=expected)
+
+    def _get(self, url: str, **kwargs) -> http_requests.Response:
+        response = self.http.get(url, timeout=self.timeout, **kwargs)
+        if response.status_code >= 500:
+            response.raise_for_status() # Server errors count against the circuit; 4xx are the caller's business
+        return response
 
     def get_authorization_url(self) -> tuple[str, str]:
         """Generate Google OAuth2 authorization URL."""
-        flow = Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",      # CORRECTED: Removed trailing spaces
-                    "token_uri": "https://oauth2.googleapis.com/token",           # CORRECTED: Removed trailing spaces
-                    "redirect_uris": [self.redirect_uri]
-                }
-            },
-            scopes=self.scopes
-        )
-        flow.redirect_uri = self.redirect_uri
+        flow = self._flow()
 
         authorization_url, state = flow.authorization_url(
             access_type='offline',
@@ -49,41 +124,63 @@ class GoogleAuth:
         return authorization_url, state
 
     def exchange_code_for_tokens(self, authorization_code: str) -> Optional[Dict[str, Any]]:
-        """Exchange authorization code for access and ID tokens."""
-        flow = Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",      # CORRECTED: Removed trailing spaces
-                    "token_uri": "https://oauth2.googleapis.com/token",           # CORRECTED: Removed trailing spaces
-                    "redirect_uris": [self.redirect_uri]
-                }
-            },
-            scopes=self.scopes
-        )
-        flow.redirect_uri = self.redirect_uri
+        """Exchange authorization code for access and ID tokens. Raises UpstreamUnavailable if Google is unreachable or too slow."""
+        flow = self._flow()
 
         try:
-            flow.fetch_token(code=authorization_code)
+            with self.latency.measure('token_exchange'):
+                # An OAuth error response (e.g. a reused code) means Google answered, so it doesn't trip the circuit
+                self._call(lambda: flow.fetch_token(code=authorization_code, timeout=self.timeout),
+                           expected=(OAuth2Error,))
             return {
                 'access_token': flow.credentials.token,
                 'id_token': flow.credentials.id_token,
                 'refresh_token': flow.credentials.refresh_token
             }
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             print(f"Error exchanging code for tokens: {e}")
             return None
 
+    def _get_certs(self, key_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        Google's signing certificates ({key id: x509 PEM}). Refetched when the cached set has expired
+        (Cache-Control max-age), or early when a token names a key we don't have (key rotation).
+        """
+        now = time.monotonic()
+        certs = self._certs
+        if now < self._certs_expire and (key_id is None or key_id in certs):
+            return certs
+        with self._certs_lock:
+            now = time.monotonic()
+            certs = self._certs
+            stale = now >= self._certs_expire
+            unknown_key = key_id is not None and key_id not in certs
+            if not stale and not (unknown_key and now - self._certs_fetched >= self.CERTS_REFRESH_MIN_INTERVAL):
+                return certs
+            with self.latency.measure('certs_fetch'):
+                response = self._call(lambda: self._get(self.certs_url))
+                response.raise_for_status()
+                certs = response.json()
+            self.cert_fetches += 1
+            max_age = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+            ttl = int(max_age.group(1)) if max_age else self.DEFAULT_CERTS_TTL
+            age = response.headers.get('Age', '')
+            if age.isdigit(): # Time already spent in an intermediate cache
+                ttl -= int(age)
+            self._certs = certs
+            self._certs_fetched = now
+            self._certs_expire = now + max(ttl, 0)
+            return certs
+
     def verify_id_token(self, id_token_str: str) -> Optional[Dict[str, Any]]:
-        """Verify Google ID token and extract user information."""
+        """Verify Google ID token and extract user information. Raises UpstreamUnavailable if Google is unreachable or too slow."""
         try:
-            # Verify the token
-            idinfo = id_token.verify_oauth2_token(
-                id_token_str,
-                google_requests.Request(),
-                self.client_id
-            )
+            # Verify the token (signature, expiry, audience) against the cached certificates
+            with self.latency.measure('verify_id_token'):
+                key_id = google_jwt.decode_header(id_token_str).get('kid')
+                idinfo = google_jwt.decode(id_token_str, certs=self._get_certs(key_id), audience=self.client_id)
 
             # Validate issuer - Use a robust check against known good issuers (trimmed)
             # Note: The actual issuer might be 'accounts.google.com' or 'https://accounts.google.com'
@@ -104,154 +201,107 @@ class GoogleAuth:
                 'picture': idinfo.get('picture', ''),
                 'email_verified': idinfo.get('email_verified', False)
             }
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             print(f"Error verifying ID token: {e}")
             return None
 
     def get_user_info(self, access_token: str) -> Optional[Dict[str, Any]]:
-        """Get user info from Google API."""
+        """Get user info from Google API. Raises UpstreamUnavailable if Google is unreachable or too slow."""
         try:
-            # CORRECTED: Removed trailing space from the URL
-            response = http_requests.get(
-                'https://www.googleapis.com/oauth2/v2/userinfo', # CORRECTED: Removed trailing space
-                headers={'Authorization': f'Bearer {access_token}'}
-            )
-            response.raise_for_status()
+            with self.latency.measure('userinfo'):
+                response = self._call(lambda: self._get(self.userinfo_url,
+                                                        headers={'Authorization': f'Bearer {access_token}'}))
+                response.raise_for_status()
             return response.json()
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             print(f"Error getting user info: {e}")
             return None
 
+    def stats(self) -> Dict[str, Any]:
+        """Per-call latency (ms) and certificate cache state."""
+        return {
+            'latency': self.latency.stats(),
+            'certFetches': self.cert_fetches,
+            'certKeys': len(self._certs),
+            'certsExpireIn': max(0, round(self._certs_expire - time.monotonic())),
+            'circuit': self.outbound.breaker('google').stats() if self.outbound else None
+        }
+
 # Voter session management
 class VoterSession:
-    def __init__(self):
+    def __init__(self, storage: Optional[StorageBackend] = None, ttl_seconds: float = 86400,
+                 max_entries: int = 10000, flush_interval: float = 1.0, sweep_interval: float = 300,
+                 login_log: Optional[AuditLog] = None):
         current_dir = os.path.dirname(os.path.abspath(__file__))  # backend/utils
         backend_dir = os.path.dirname(current_dir)               # backend
         self.data_dir = os.path.join(backend_dir, 'data')       # backend/data # Store self.data_dir correctly
-        self.sessions_file = os.path.join(self.data_dir, 'voter_sessions.json')
+        # Sessions are kept by the configured storage backend (voter_sessions.json or SQLite),
+        # behind an in-memory LRU/TTL store with write-behind persistence
+        self.storage = storage or get_storage()
+        self.store = SessionStore(self.storage, ttl_seconds=ttl_seconds, max_entries=max_entries,
+                                  flush_interval=flush_interval, sweep_interval=sweep_interval,
+                                  sweep_lock_path=os.path.join(self.data_dir, 'session_sweep.lock'))
+        self.store.start()
         # --- NEW: Define the login log file path ---
-        self.login_log_file = os.path.join(self.data_dir, 'voter_login_log.json')
-        self._load_sessions()
-
-    def _load_sessions(self):
-        """Load existing voter sessions from file."""
-        try:
-            with open(self.sessions_file, 'r') as f:
-                self.sessions = json.load(f)
-        except FileNotFoundError:
-            self.sessions = {}
-        except json.JSONDecodeError as e:
-            print(f"Error decoding voter_sessions.json: {e}. Initializing empty sessions.")
-            self.sessions = {}
-
-    def _save_sessions(self):
-        """Save voter sessions to file."""
-        try:
-            os.makedirs(os.path.dirname(self.sessions_file), exist_ok=True)
-            with open(self.sessions_file, 'w') as f:
-                json.dump(self.sessions, f, indent=2, default=str)  # Handles datetime
-        except Exception as e:
-            print(f"Error saving voter sessions: {e}")
+        # NDJSON audit log with rotation, written by a background thread (see utils/audit_log.py).
+        # voter_login_log.json is the older single-list format, still read by read_login_log.py.
+        self.login_log_file = os.path.join(self.data_dir, 'voter_login_log.ndjson')
+        self.legacy_login_log_file = os.path.join(self.data_dir, 'voter_login_log.json')
+        self.login_log = login_log or AuditLog(self.login_log_file)
 
     def create_session(self, user_id: str, email: str, name: str,
                        has_voted: bool = False, is_admin: bool = False,
                        is_eligible_voter: bool = True) -> str:
         """Create a new voter session."""
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {
+        self.store.create(session_id, {
             'user_id': user_id,
             'email': email,
             'name': name,
             # Use UTC for consistency
             'created_at': datetime.datetime.utcnow().isoformat() + 'Z',
+            'expires_at': self.store.new_expiry(),
             'has_voted': has_voted,
             'is_admin': is_admin,
             'is_eligible_voter': is_eligible_voter
-        }
-        self._save_sessions()
+        })
         return session_id
 
-    # --- NEW: Helper functions for login log ---
-
-    def _load_login_log(self) -> List[Dict[str, Any]]:
-        """Load existing login log data from file."""
-        try:
-            with open(self.login_log_file, 'r') as f:
-                data = json.load(f)
-                # Ensure it's a list
-                if isinstance(data, list):
-                    return data
-                else:
-                    print(f"Warning: {self.login_log_file} does not contain a list. Initializing empty log.")
-                    return []
-        except FileNotFoundError:
-            # It's okay if the file doesn't exist yet
-            return []
-        except json.JSONDecodeError as e:
-            print(f"Error decoding {self.login_log_file}: {e}. Initializing empty log.")
-            return []
-
-    def _save_login_log(self, log_data: List[Dict[str, Any]]) -> bool:
-        """Save login log data to file."""
-        try:
-            os.makedirs(os.path.dirname(self.login_log_file), exist_ok=True)
-            # Use indent for readability, default=str handles datetime if needed directly in dict
-            with open(self.login_log_file, 'w') as f:
-                json.dump(log_data, f, indent=2, default=str) # default=str handles datetime objects if passed directly
-            return True
-        except Exception as e:
-            print(f"Error saving login log to {self.login_log_file}: {e}")
-            return False
-
     # --- NEW: Main function to log a login event ---
     def log_login(self, google_user_id: str, email: str, name: str = ""):
         """
         Logs a voter login event with Google ID, email, and timestamp.
-        This creates a static record of each login attempt.
+        This creates a static record of each login attempt. The entry is queued and appended
+        to the audit log in the background, so the caller never waits on file I/O.
         """
-        try:
-            # 1. Load existing log data
-            log_entries = self._load_login_log()
-
-            # 2. Create new log entry
-            # Using UTC time and 'Z' suffix for clarity
-            new_entry = {
-                "google_id": google_user_id,
-                "email": email,
-                "name": name, # Optional, but good to log
-                "login_timestamp": datetime.datetime.utcnow().isoformat() + 'Z' # Explicit UTC
-                # Add other relevant static data if needed (e.g., IP address - be mindful of privacy)
-            }
-
-            # 3. Append new entry
-            log_entries.append(new_entry)
-
-            # 4. Save updated log data
-            success = self._save_login_log(log_entries)
-            if success:
-                print(f"Logged login for Google ID: {google_user_id}, Email: {email}")
-            else:
-                print(f"Failed to log login for Google ID: {google_user_id}")
-
-        except Exception as e:
-            print(f"Error in log_login: {e}")
-
+        # Using UTC time and 'Z' suffix for clarity
+        new_entry = {
+            "google_id": google_user_id,
+            "email": email,
+            "name": name, # Optional, but good to log
+            "login_timestamp": datetime.datetime.utcnow().isoformat() + 'Z' # Explicit UTC
+            # Add other relevant static data if needed (e.g., IP address - be mindful of privacy)
+        }
+        if not self.login_log.record(new_entry):
+            print(f"Failed to log login for Google ID: {google_user_id}")
 
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get session by ID."""
-        return self.sessions.get(session_id)
+        """Get session by ID (None if unknown or expired)."""
+        return self.store.get(session_id)
 
     def update_session(self, session_id: str, **kwargs):
         """Update session fields."""
-        if session_id in self.sessions:
-            self.sessions[session_id].update(kwargs)
-            self._save_sessions()
+        session_data = self.store.get(session_id)
+        if session_data is not None:
+            self.store.update(session_id, dict(session_data, **kwargs)) # Copy: the cached dict is shared
 
     def delete_session(self, session_id: str):
         """Delete a session."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            self._save_sessions()
+        self.store.delete(session_id)
 
 # Make sure the class is actually instantiated if needed elsewhere,
 # or that the app.py correctly imports and uses it.
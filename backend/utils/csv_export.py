@@ -0,0 +1,91 @@
+# utils/csv_export.py
+# Streaming CSV export of ballots. Rows are written into a small reusable buffer and yielded in
+# chunks, so memory stays flat however many ballots there are. Optionally gzip-compressed on the fly.
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator, List, Dict, Callable, Tuple
+from models import Vote
+
+EXECUTIVE_SLOTS = 7
+COUNCIL_ONLY_SLOTS = 8 # 15 total - 7 exec = 8 council only
+
+# Per-voter columns: key -> (header, value)
+VOTER_COLUMNS: Dict[str, Tuple[str, Callable[[Vote], str]]] = {
+    'voter': ('Voter Name', lambda vote: vote.voter_email), # Original export: email under a 'Voter Name' header
+    'voter_name': ('Voter Name', lambda vote: vote.voter_name),
+    'voter_email': ('Voter Email', lambda vote: vote.voter_email),
+    'voter_id': ('Voter ID', lambda vote: vote.voter_id),
+    'vote_id': ('Vote ID', lambda vote: vote.id),
+    'timestamp': ('Timestamp', lambda vote: vote.timestamp or ''),
+}
+# Candidate blocks: 'executive' = the 7 executive officers, 'council' = the 8 remaining council members
+BLOCK_COLUMNS = ('executive', 'council')
+DEFAULT_EXPORT_LAYOUT = ['voter', 'executive', 'council']
+
+def parse_layout(columns: str) -> List[str]:
+    """Parses a comma-separated column layout (e.g. 'voter_email,timestamp,executive,council')."""
+    if not columns:
+        return list(DEFAULT_EXPORT_LAYOUT)
+    layout = [column.strip() for column in columns.split(',') if column.strip()]
+    unknown = [column for column in layout if column not in VOTER_COLUMNS and column not in BLOCK_COLUMNS]
+    if unknown or not layout:
+        raise ValueError(f"Unknown export column(s): {', '.join(unknown) or '(none given)'}. "
+                         f"Use: {', '.join(list(VOTER_COLUMNS) + list(BLOCK_COLUMNS))}")
+    return layout
+
+def _header(layout: List[str]) -> List[str]:
+    header = []
+    for column in layout:
+        if column == 'executive':
+            header.extend(f'Executive {i+1}' for i in range(EXECUTIVE_SLOTS))
+        elif column == 'council':
+            header.extend(f'Council {i+1}' for i in range(COUNCIL_ONLY_SLOTS))
+        else:
+            header.append(VOTER_COLUMNS[column][0])
+    return header
+
+def iter_votes_csv(votes: Iterable[Vote], candidate_labels: Dict[int, str], layout: List[str],
+                   rows_per_chunk: int = 500) -> Iterator[str]:
+    """
+    Yields the CSV text in chunks of rows_per_chunk rows. candidate_labels maps candidate id to the
+    text written in the executive/council columns (name or id).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_header(layout))
+    rows_in_buffer = 0
+
+    def label(candidate_id):
+        return candidate_labels.get(candidate_id, f"Unknown ID: {candidate_id}")
+
+    for vote in votes:
+        row = []
+        for column in layout:
+            if column == 'executive':
+                names = [label(cid) for cid in vote.executive_candidates[:EXECUTIVE_SLOTS]]
+                row.extend(names + [''] * (EXECUTIVE_SLOTS - len(names)))
+            elif column == 'council':
+                # Council members not already listed as Executive Officers
+                executive_ids = set(vote.executive_candidates)
+                names = [label(cid) for cid in vote.selected_candidates if cid not in executive_ids][:COUNCIL_ONLY_SLOTS]
+                row.extend(names + [''] * (COUNCIL_ONLY_SLOTS - len(names)))
+            else:
+                row.append(VOTER_COLUMNS[column][1](vote))
+        writer.writerow(row)
+        rows_in_buffer += 1
+        if rows_in_buffer >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            rows_in_buffer = 0
+    yield buffer.getvalue()
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Gzip-compresses a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31) # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
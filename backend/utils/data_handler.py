@@ -1,70 +1,111 @@
 # utils/data_handler.py
+import hashlib
 import json
 import os
+import threading
 # Removed redundant datetime import
-from typing import List, Any, Dict, Union, Tuple # For type hints in new functions
+from typing import List, Any, Dict, Union, Tuple, Callable, Optional, Iterator # For type hints in new functions
 from config import Config
-from models import Candidate, Vote, VotesData, ElectionStatus
+from models import Candidate, Vote, VotesData, ElectionStatus, ResultsTally
+# Persistence goes through the configured storage backend (JSON files or SQLite)
+from utils.storage import (
+    get_storage, file_version, CANDIDATES_FILE, VOTES_FILE, ELECTION_STATUS_FILE, VOTES_JOURNAL_FILE
+)
 
 # --- Constants ---
 DATA_DIR = Config.DATA_FOLDER # Use the configured data folder
-CANDIDATES_FILE = os.path.join(DATA_DIR, 'candidates.json')
-VOTES_FILE = os.path.join(DATA_DIR, 'votes.json')
-ELECTION_STATUS_FILE = os.path.join(DATA_DIR, 'election_status.json') # Standardize to .json
-
-# --- Helper Functions for File I/O ---
-# --- FIX 1: Corrected type hint syntax for default_data parameter ---
-def _load_json_file(filepath: str, default_data: Any) -> Any:
-    """Loads data from a JSON file. Returns default_data if file not found or invalid."""
-    try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Warning: File {filepath} not found. Using default data.")
-        return default_data
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from {filepath}: {e}. Using default data.")
-        return default_data
-
-# --- FIX 2: Corrected type hint syntax for data parameter ---
-def _save_json_file(filepath: str, data: Any) -> bool:
-    """Saves data to a JSON file."""
-    try:
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4) # Use indent for readability
-        return True
-    except Exception as e:
-        print(f"Error saving data to {filepath}: {e}")
-        return False
+TRANSLATIONS_FILE = os.path.join(DATA_DIR, 'translations.json')
+
+# --- Read-through Cache ---
+class ReadThroughCache:
+    """
+    Holds one parsed object in memory and reloads it only when its version token changes.
+    version_fn must be much cheaper than loader (e.g. a file stat or a single-row query), which
+    lets other processes' writes be picked up. Local writes should call invalidate().
+    """
+    _registry: Dict[str, 'ReadThroughCache'] = {}
+
+    def __init__(self, name: str, loader: Callable[[], Any], version_fn: Callable[[], Any]):
+        self.name = name
+        self.loader = loader
+        self.version_fn = version_fn
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._loaded = False
+        ReadThroughCache._registry[name] = self
+
+    def get(self) -> Any:
+        version = self.version_fn()
+        with self._lock:
+            if self._loaded and version == self._version:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+        value = self.loader()
+        with self._lock:
+            self._value, self._version, self._loaded = value, version, True
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._value = None
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters of every read-through cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in ReadThroughCache._registry.items()}
+
+def get_data_version(name: str) -> Any:
+    """Version token of 'candidates', 'election_status', 'votes' or 'translations' (used for ETags)."""
+    if name == 'translations':
+        return file_version(TRANSLATIONS_FILE)
+    if name == 'candidates':
+        return _candidates_version()
+    return get_storage().data_version(name)
+
+# --- Candidate Photos ---
+# Set by create_app when the photo cache is on (see utils/photos.py). Candidate models and storage keep the
+# source URL; the payloads sent to browsers point at the local copy (public_photo_url)
+_photo_store = None
+
+def set_photo_store(store) -> None:
+    global _photo_store
+    _photo_store = store
+    _candidates_cache.invalidate()
+    _candidates_json_cache.invalidate()
+
+def public_photo_url(photo: Any) -> Any:
+    """URL to send to browsers for a candidate photo: the local copy if there is one (a missing one is fetched)."""
+    return _photo_store.photo_url(photo) if _photo_store is not None else photo
+
+def _candidates_version() -> Any:
+    """The candidates' version token, plus the photo manifest's (a new local photo changes the payloads)."""
+    version = get_storage().data_version('candidates')
+    return (version, _photo_store.version()) if _photo_store is not None else version
 
 # --- Candidate Data Handling ---
-def get_candidates(include_private: bool = False) -> List[Candidate]:
-    """Loads candidate data. Optionally includes private fields."""
-    data = _load_json_file(CANDIDATES_FILE, [])
-    if not isinstance(data, list):
-        print(f"Warning: Candidates data is not a list. Returning empty list.")
-        return []
+def _load_candidates() -> List[Candidate]:
+    """Reads and parses all candidates from the storage backend."""
+    data = get_storage().load_candidates()
 
     candidates = []
     # --- FIX 3: Corrected iteration syntax ---
     for item in data: # <-- Was missing 'data'
         if isinstance(item, dict):
             try:
-                # Create Candidate object, passing only relevant kwargs
-                # Filter out private fields unless explicitly requested
-                candidate_data = item.copy()
-                if not include_private:
-                    # --- FIX 4: Corrected key names for private fields based on models.py ---
-                    # The original models.py snippet didn't show email/phone, but the new features require them.
-                    # Assuming they are part of the Candidate model now.
-                    # If they are not, the .pop() will just do nothing.
-                    # It's generally safer to handle them in the model's __init__ or to_dict if include_private is used.
-                    # For now, we'll keep this logic as is, assuming the Candidate model handles it.
-                    # The main point is the syntax was correct here.
-                    pass # No action needed inside the if block for the filtering logic itself
-                # Pass all data to Candidate constructor
-                candidates.append(Candidate(**candidate_data))
+                # Create Candidate object (keyword unpacking already copies the values out of the dict)
+                # Private fields are filtered by Candidate.to_dict(include_private=...)
+                candidate = Candidate(**item)
+                candidates.append(candidate)
             except TypeError as e: # Handle missing required fields in Candidate model
                 print(f"Warning: Skipping candidate item due to error: {e}. Data: {item}")
             # --- FIX 5: Corrected else clause association ---
@@ -73,23 +114,40 @@ def get_candidates(include_private: bool = False) -> List[Candidate]:
             print(f"Warning: Skipping non-dict item in candidates list: {item}")
     return candidates
 
+_candidates_cache = ReadThroughCache('candidates', _load_candidates, _candidates_version)
+
+def get_candidates(include_private: bool = False) -> List[Candidate]:
+    """Loads candidate data (cached). Private fields are dropped later by to_dict(include_private=False)."""
+    return list(_candidates_cache.get()) # Copy the list so callers can't reorder the cached one
+
+def _serialize_candidates() -> Dict[bool, bytes]:
+    """Public and private /api/candidates bodies, encoded once per candidates version."""
+    candidates = _candidates_cache.get()
+    photos = [public_photo_url(c.photo) for c in candidates]
+    # Same bytes as Flask's jsonify (sorted keys, compact separators, trailing newline)
+    return {
+        include_private: (json.dumps([dict(c.to_dict(include_private=include_private), photo=photo)
+                                      for c, photo in zip(candidates, photos)],
+                                     sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        for include_private in (False, True)
+    }
+
+_candidates_json_cache = ReadThroughCache('candidates_json', _serialize_candidates, _candidates_version)
+
+def get_candidates_json(include_private: bool = False) -> bytes:
+    """Pre-serialized candidate list (JSON bytes), rebuilt only when the candidates change."""
+    return _candidates_json_cache.get()[include_private]
+
 # --- NEW FUNCTIONS: Candidate Management ---
 # --- FIX 6: Corrected type hint syntax for new_candidate_data parameter ---
 def add_candidate(new_candidate_data: Dict) -> Tuple[bool, str]:
     """
-    Adds a new candidate to candidates.json.
+    Adds a new candidate to the candidate store.
     Returns (success: bool, message_or_error: str).
     """
     try:
-        # Load existing candidates (including private data for ID calculation)
-        # --- FIX 7: Corrected argument name for include_private ---
-        candidates_list = get_candidates(include_private=True) # <-- Renamed variable to avoid confusion
         # Determine new ID (last ID + 1)
-        if candidates_list:
-            # --- FIX 8: Access .id attribute correctly ---
-            new_id = max(candidate.id for candidate in candidates_list) + 1 # <-- Use candidates_list
-        else:
-            new_id = 1
+        new_id = get_storage().next_candidate_id()
 
         # Create candidate object
         # Ensure default values and handle private fields correctly
@@ -127,15 +185,16 @@ def add_candidate(new_candidate_data: Dict) -> Tuple[bool, str]:
         except Exception as e:
              return False, f"Invalid candidate data: {e}"
 
-        # Append the new Candidate object to the list
-        candidates_list.append(new_candidate) # <-- Use candidates_list
+        # Fetch the photo now, so the candidate is served with its local copy from the start (on failure the
+        # remote URL is used and the download retried in the background)
+        if _photo_store is not None:
+            _photo_store.ingest(new_candidate.photo)
 
-        # Save updated list
-        # --- FIX 11: Convert Candidate objects to dicts for saving ---
-        # We need to save the data, not the objects. Use to_dict().
-        # Need to decide if we save private data or not. Let's save all data including private.
-        candidates_dicts = [c.to_dict(include_private=True) for c in candidates_list] # <-- Convert to dicts
-        if _save_json_file(CANDIDATES_FILE, candidates_dicts): # <-- Save the list of dicts
+        # Save the new candidate, including private data
+        saved = get_storage().insert_candidate(new_candidate.to_dict(include_private=True))
+        _candidates_cache.invalidate()
+        _candidates_json_cache.invalidate()
+        if saved:
             return True, f"Candidate '{candidate_obj_data['name']}' added successfully with ID {new_id}."
         else:
             return False, "Failed to save candidate data to file."
@@ -146,27 +205,17 @@ def add_candidate(new_candidate_data: Dict) -> Tuple[bool, str]:
 # --- FIX 12: Corrected type hint syntax for candidate_id parameter ---
 def remove_candidate(candidate_id: int) -> Tuple[bool, str]:
     """
-    Removes a candidate by ID from candidates.json.
+    Removes a candidate by ID from the candidate store.
     Returns (success: bool, message_or_error: str).
     """
     try:
-        # Load existing candidates (including private data)
-        # --- FIX 13: Corrected argument name for include_private ---
-        candidates_list = get_candidates(include_private=True) # <-- Renamed variable
-        original_count = len(candidates_list)
-
-        # Filter out the candidate with the given ID
-        # --- FIX 14: Corrected attribute access from .get('id') to .id ---
-        candidates_list = [c for c in candidates_list if c.id != candidate_id] # <-- Use .id attribute
-
-        if len(candidates_list) < original_count:
-            # Save updated list
-            # --- FIX 15: Convert Candidate objects to dicts for saving ---
-            candidates_dicts = [c.to_dict() for c in candidates_list] # <-- Convert to dicts
-            if _save_json_file(CANDIDATES_FILE, candidates_dicts): # <-- Save the list of dicts
-                 return True, f"Candidate with ID {candidate_id} removed successfully."
-            else:
-                 return False, "Failed to save updated candidate list to file."
+        removed = get_storage().delete_candidate(candidate_id)
+        _candidates_cache.invalidate()
+        _candidates_json_cache.invalidate()
+        if removed:
+            return True, f"Candidate with ID {candidate_id} removed successfully."
+        elif removed is None:
+            return False, "Failed to save updated candidate list."
         else:
             return False, f"Candidate with ID {candidate_id} not found."
     except Exception as e:
@@ -175,47 +224,70 @@ def remove_candidate(candidate_id: int) -> Tuple[bool, str]:
 # --- END NEW FUNCTIONS ---
 
 # --- Vote Data Handling ---
+# With the JSON backend, votes.json is the snapshot/export format and new ballots go to an
+# append-only journal (see utils/storage.py). The SQLite backend stores one row per ballot.
 def get_votes() -> VotesData:
     """Loads vote data."""
-    data = _load_json_file(VOTES_FILE, {"voter_ids": [], "votes": []})
-    if isinstance(data, dict) and 'votes' in data and 'voter_ids' in data: # <-- Added check for 'voter_ids'
-        # Ensure votes are Vote objects
-        votes = []
-        for vote_data in data.get('votes', []):
-            if isinstance(vote_data, dict):
-                try:
-                    # --- FIX 16: Ensure Vote model constructor accepts these arguments ---
-                    # This requires the models.py Vote class to match the keys in vote_data
-                    votes.append(Vote(**vote_data))
-                except TypeError as e: # Catch specific error for argument mismatch
-                    print(f"Warning: Skipping invalid vote data due to TypeError: {e}. Data: {vote_data}")
-                except Exception as e: # Catch other potential errors in Vote construction
-                     print(f"Warning: Skipping invalid vote data due to unexpected error: {e}. Data: {vote_data}")
-        return VotesData(voter_ids=data['voter_ids'], votes=votes)
-    else:
-        print("Warning: Votes data has unexpected structure. Returning empty VotesData.")
-        return VotesData(voter_ids=[], votes=[])
+    return get_storage().load_votes()
+
+def iter_votes() -> Iterator[Vote]:
+    """Yields recorded ballots one at a time (used by streaming exports)."""
+    return get_storage().iter_votes()
 
 # --- FIX 17: Corrected type hint syntax for votes_data parameter ---
 def save_votes(votes_data: VotesData) -> bool:
-    """Saves vote data."""
+    """Saves vote data as a full snapshot. Use append_vote() to record a single ballot."""
     if not isinstance(votes_data, VotesData):
         print("Error: save_votes called with non-VotesData object")
         return False
-    # Convert Vote objects to dictionaries before saving
-    # --- FIX 18: Corrected attribute access from votes_data.votes to votes_data.votes ---
-    # This was already correct, but added comment for clarity.
-    votes_dicts = [vote.to_dict() for vote in votes_data.votes] # <-- Correct
-    data_to_save = {
-        "voter_ids": votes_data.voter_ids, # <-- Correct
-        "votes": votes_dicts
-    }
-    return _save_json_file(VOTES_FILE, data_to_save)
+    return get_storage().save_votes(votes_data)
+
+def snapshot_votes() -> bool:
+    """Brings the vote snapshot up to date with all recorded ballots."""
+    return get_storage().snapshot_votes()
+
+def export_votes_json() -> bool:
+    """Writes an up-to-date votes.json for download."""
+    return get_storage().export_votes_json()
+
+def has_voter_voted(voter_id: str) -> bool:
+    """Constant-time "already voted" check, consistent across worker processes."""
+    return get_storage().has_voted(voter_id)
+
+def get_results_tally() -> ResultsTally:
+    """Per-candidate vote counts, maintained as ballots are recorded (no per-request recount)."""
+    return get_storage().get_tally()
+
+def rebuild_vote_indexes():
+    """Rebuilds the has-voted index and results tally from the vote store (called at startup)."""
+    get_storage().rebuild_ballot_index()
+
+_ballots_frozen = threading.Event()
+
+def freeze_votes(frozen: bool = True):
+    """Stops (or resumes) accepting ballots in this process; set when the election closes."""
+    if frozen:
+        _ballots_frozen.set()
+    else:
+        _ballots_frozen.clear()
+
+def append_vote(vote: Vote) -> bool:
+    """
+    Durably records a single ballot. Returns False if it could not be saved, the voter already voted,
+    or the ballot store is frozen.
+    """
+    if not isinstance(vote, Vote):
+        print("Error: append_vote called with non-Vote object")
+        return False
+    if _ballots_frozen.is_set():
+        print(f"Warning: Ballot {vote.id} rejected; the ballot store is frozen.")
+        return False
+    return get_storage().append_vote(vote)
 
 # --- Election Status Handling ---
-def get_election_status() -> ElectionStatus:
-    """Gets the current election status."""
-    data = _load_json_file(ELECTION_STATUS_FILE, {"is_open": True}) # Default to open
+def _load_election_status() -> ElectionStatus:
+    """Reads and parses the election status from the storage backend."""
+    data = get_storage().load_election_status() # Defaults to open
     if isinstance(data, dict):
         try:
             # Use from_dict for consistent loading and parsing
@@ -228,6 +300,13 @@ def get_election_status() -> ElectionStatus:
         print("Warning: election_status.json content is not a dict. Returning default status.")
         return ElectionStatus(is_open=True)
 
+_election_status_cache = ReadThroughCache('election_status', _load_election_status,
+                                          lambda: get_storage().data_version('election_status'))
+
+def get_election_status() -> ElectionStatus:
+    """Gets the current election status (cached)."""
+    return _election_status_cache.get()
+
 # --- FIX 20: Corrected type hint syntax for status parameter ---
 def save_election_status(status: ElectionStatus) -> bool:
     """Saves the election status."""
@@ -236,25 +315,58 @@ def save_election_status(status: ElectionStatus) -> bool:
         return False
     # --- FIX 21: Corrected method call from to_dict() ---
     # Ensure ElectionStatus model has a to_dict() method
-    return _save_json_file(ELECTION_STATUS_FILE, status.to_dict()) # <-- Correct if to_dict exists
+    saved = get_storage().save_election_status(status.to_dict()) # <-- Correct if to_dict exists
+    _election_status_cache.invalidate()
+    return saved
 
-# --- Voter Session Handling (In-memory, consider persistence for production) ---
-# (This part remains largely unchanged, assuming VoterSession class is in utils.auth or similar)
-# ... (VoterSession class and functions would be here) ...
 #-- Translation --
-DATA_DIR = Config.DATA_FOLDER
-TRANSLATIONS_FILE = os.path.join(DATA_DIR, 'translations.json')
-def load_translations():
+def _load_translations() -> Dict[str, Any]:
     """Loads translation data from the JSON file."""
     try:
         with open(TRANSLATIONS_FILE, 'r', encoding='utf-8') as f: # Ensure utf-8
             return json.load(f)
     except FileNotFoundError:
-        app.logger.error(f"Translation file not found: {TRANSLATIONS_FILE}") # Log specific error
+        print(f"Error: Translation file not found: {TRANSLATIONS_FILE}")
         return {} # Return empty dict
     except json.JSONDecodeError as e: # Catch JSON errors specifically
-        app.logger.error(f"Error decoding JSON from {TRANSLATIONS_FILE}: {e}") # Log specific error
+        print(f"Error decoding JSON from {TRANSLATIONS_FILE}: {e}")
         return {} # Return empty dict
     except Exception as e: # Catch other unexpected errors
-        app.logger.error(f"Unexpected error loading translations from {TRANSLATIONS_FILE}: {e}") # Log
+        print(f"Unexpected error loading translations from {TRANSLATIONS_FILE}: {e}")
         return {} # Return empty dict
+
+_translations_cache = ReadThroughCache('translations', _load_translations,
+                                       lambda: file_version(TRANSLATIONS_FILE))
+
+def load_translations() -> Dict[str, Any]:
+    """Returns translation data, re-reading translations.json only when it changes."""
+    return _translations_cache.get()
+
+def _serialize_translations() -> Dict[str, Tuple[bytes, str]]:
+    """
+    Each language's translations ({key: text}) as JSON bytes plus a content digest (its ETag), encoded once
+    per file version. Editing one language leaves the other languages' ETags unchanged.
+    """
+    slices = {}
+    for lang, strings in _translations_cache.get().items():
+        if isinstance(strings, dict):
+            payload = json.dumps(strings, sort_keys=True, separators=(',', ':')).encode('utf-8')
+            slices[lang] = (payload, hashlib.sha1(payload).hexdigest()[:32])
+    return slices
+
+_translations_json_cache = ReadThroughCache('translations_json', _serialize_translations,
+                                            lambda: file_version(TRANSLATIONS_FILE))
+
+def get_languages() -> List[str]:
+    """Language codes present in translations.json (e.g. ['ar', 'en'])."""
+    return sorted(_translations_json_cache.get())
+
+def get_translations_json(lang: str) -> Optional[bytes]:
+    """Pre-serialized translations of one language, or None if it isn't available."""
+    entry = _translations_json_cache.get().get(lang)
+    return entry[0] if entry else None
+
+def get_translations_digest(lang: str) -> Optional[str]:
+    """Content digest of one language's translations (changes only when that language does), or None."""
+    entry = _translations_json_cache.get().get(lang)
+    return entry[1] if entry else None
@@ -0,0 +1,145 @@
+# utils/election_phase.py
+# Election phase engine. The stored schedule (start_time/end_time) is parsed once per election_status version
+# into an ElectionSchedule; the current phase is then two float comparisons against the clock.
+# Phases: 'unscheduled' (no start time), 'upcoming', 'open' ([start, end), or from start on if there is no end)
+# and 'closed'. Hooks registered with on_start/on_end run once per process when the election opens or closes,
+# whether the transition is noticed by a request or by the background ticker.
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from models import ElectionStatus
+
+PHASES = ('unscheduled', 'upcoming', 'open', 'closed')
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Offset-aware datetime from an ISO string or datetime ('Z' suffix accepted, naive = UTC), or None."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class ElectionSchedule:
+    """Immutable, pre-parsed election window."""
+    __slots__ = ('start', 'end', 'start_ts', 'end_ts')
+
+    def __init__(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        self.start = start
+        self.end = end
+        self.start_ts = start.timestamp() if start else None
+        self.end_ts = end.timestamp() if end else None
+
+    @classmethod
+    def from_status(cls, status: ElectionStatus) -> 'ElectionSchedule':
+        return cls(parse_timestamp(status.start_time), parse_timestamp(status.end_time))
+
+    def phase_at(self, now: float) -> str:
+        if self.start_ts is None:
+            return 'unscheduled'
+        if now < self.start_ts:
+            return 'upcoming'
+        if self.end_ts is None or now < self.end_ts:
+            return 'open'
+        return 'closed'
+
+    def next_transition(self, now: float) -> Optional[float]:
+        """Epoch time of the next phase change, or None if none is scheduled."""
+        for ts in (self.start_ts, self.end_ts):
+            if ts is not None and ts > now:
+                return ts
+        return None
+
+
+class PhaseEngine:
+    def __init__(self, status_fn: Callable[[], ElectionStatus], check_interval: float = 1.0):
+        self.status_fn = status_fn # Cached loader (returns the same object while the stored status is unchanged)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._status = None
+        self._schedule = ElectionSchedule()
+        self._last_phase: Optional[str] = None
+        self._start_hooks: List[Callable[[], None]] = []
+        self._end_hooks: List[Callable[[], None]] = []
+        self._thread = None
+
+    # --- Schedule ---
+    def schedule(self) -> ElectionSchedule:
+        status = self.status_fn()
+        if status is not self._status:
+            schedule = ElectionSchedule.from_status(status) # Parsed once per stored version
+            with self._lock:
+                self._status, self._schedule = status, schedule
+        return self._schedule
+
+    def phase(self, now: Optional[float] = None) -> str:
+        phase = self.schedule().phase_at(time.time() if now is None else now)
+        if phase != self._last_phase:
+            self._observe(phase)
+        return phase
+
+    def is_open(self) -> bool:
+        return self.phase() == 'open'
+
+    def payload(self) -> Dict[str, Any]:
+        """Election status as served by /api/election/status."""
+        schedule = self.schedule()
+        phase = self.phase()
+        return {
+            'is_open': phase == 'open',
+            'phase': phase,
+            'start_time': isoformat(schedule.start),
+            'end_time': isoformat(schedule.end)
+        }
+
+    # --- Transitions ---
+    def on_start(self, hook: Callable[[], None]):
+        self._start_hooks.append(hook)
+
+    def on_end(self, hook: Callable[[], None]):
+        self._end_hooks.append(hook)
+
+    def _observe(self, phase: str):
+        with self._lock:
+            previous, self._last_phase = self._last_phase, phase
+        if previous is None or previous == phase:
+            return # First look after startup: nothing has changed yet
+        hooks = []
+        if phase == 'open':
+            hooks = self._start_hooks
+        elif previous == 'open':
+            hooks = self._end_hooks
+        print(f"Election phase changed: {previous} -> {phase}")
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Error in election {'start' if phase == 'open' else 'end'} hook {hook.__name__}: {e}")
+
+    def start(self):
+        """Starts the ticker thread once; it wakes at the next scheduled transition (or every check_interval)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='election-phase', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                now = time.time()
+                self.phase(now)
+                next_ts = self.schedule().next_transition(now)
+                # Wake exactly at a boundary if one is close; otherwise poll for schedule changes by other workers
+                delay = self.check_interval if next_ts is None else min(self.check_interval, max(next_ts - now, 0.01))
+            except Exception as e:
+                print(f"Error in election phase ticker: {e}")
+                delay = self.check_interval
+            time.sleep(delay)
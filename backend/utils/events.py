@@ -0,0 +1,97 @@
+# utils/events.py
+# Server-sent events: pushes election status transitions and turnout counts to connected browsers.
+# Each worker process has one EventBroker. Routes that change the status publish directly; a watcher
+# thread polls the (cheap, cached) status and vote tally so that scheduled start/end times and writes
+# made by other worker processes are pushed as well.
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+def format_sse(event: str, data: Any) -> str:
+    """One text/event-stream message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class EventBroker:
+    def __init__(self, poll_interval: float = 1.0, turnout_interval: float = 10.0,
+                 max_clients: int = 500, queue_size: int = 100):
+        self.poll_interval = poll_interval
+        self.turnout_interval = turnout_interval
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: List[queue.Queue] = []
+        self._latest: Dict[str, Any] = {} # Last payload per event type, replayed to new subscribers
+        self._watcher: Optional[threading.Thread] = None
+
+    def subscribe(self) -> Optional[queue.Queue]:
+        """Registers a client. Returns None when max_clients are already connected."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            q = queue.Queue(maxsize=self.queue_size)
+            for event, data in self._latest.items():
+                q.put_nowait((event, data))
+            self._subscribers.append(q)
+            return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    @property
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: str, data: Any):
+        """Sends an event to every subscriber unless it equals the last one of its type."""
+        with self._lock:
+            if self._latest.get(event) == data:
+                return
+            self._latest[event] = data
+            for q in self._subscribers:
+                try:
+                    q.put_nowait((event, data))
+                except queue.Full:
+                    pass # Client is not reading; it gets the latest state again when it reconnects
+
+    def start_watcher(self, status_fn: Callable[[], Dict[str, Any]], turnout_fn: Callable[[], int]):
+        """Starts the polling thread once (daemon, so it never blocks shutdown)."""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(status_fn, turnout_fn),
+                                             name='election-events', daemon=True)
+            self._watcher.start()
+
+    def _watch(self, status_fn: Callable[[], Dict[str, Any]], turnout_fn: Callable[[], int]):
+        next_turnout = 0.0
+        while True:
+            try:
+                status = status_fn()
+                self.publish('status', status)
+                now = time.monotonic()
+                if now >= next_turnout or self._latest.get('turnout', {}).get('isOpen') != status['is_open']:
+                    self.publish('turnout', {'totalVotes': turnout_fn(), 'isOpen': status['is_open']})
+                    next_turnout = now + self.turnout_interval
+            except Exception as e:
+                print(f"Error polling election events: {e}")
+            time.sleep(self.poll_interval)
+
+    def stream(self, q: queue.Queue, allow: Callable[[str, Any], bool], keepalive: float = 15.0):
+        """Generator for a text/event-stream response. Unsubscribes when the client goes away."""
+        try:
+            yield "retry: 5000\n\n" # Browser reconnect delay (ms)
+            while True:
+                try:
+                    event, data = q.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n" # Stops proxies from closing an idle connection
+                    continue
+                if allow(event, data):
+                    yield format_sse(event, data)
+        finally:
+            self.unsubscribe(q)
@@ -0,0 +1,222 @@
+# utils/geoip.py
+# Language detection from the client IP for /api/language.
+# Lookups go through an LRU+TTL cache keyed by network prefix (/24 for IPv4, /48 for IPv6), then an
+# optional local CIDR -> country database held as sorted intervals (bisect, no network), and only then
+# the remote service over a pooled HTTP session. The remote URL is configurable, so a local stand-in
+# can replace ipinfo.io in tests. With an outbound executor (utils/outbound.py) the remote lookup runs on its
+# pool and the request waits at most `wait` seconds; a slower answer still lands in the cache.
+import bisect
+import csv
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from utils.outbound import OutboundExecutor, UpstreamUnavailable
+
+# List of Arabic speaking countries ISO codes
+ARABIC_COUNTRIES = {'SA', 'AE', 'EG', 'IQ', 'MA', 'YE', 'SY', 'TN', 'JO', 'OM', 'LB', 'KW', 'QA', 'BH', 'PS', 'DZ'}
+_MISSING = object()
+FAILURE_TTL = 60 # Seconds a failed remote lookup is cached, so an unreachable service isn't retried per request
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries also expire after ttl seconds."""
+    def __init__(self, max_entries: int = 10000, ttl: float = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: 'OrderedDict[Any, Tuple[Any, float]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._data)}
+
+
+class CountryIndex:
+    """
+    Offline IP -> country lookup. Loaded from a CSV file with either 'network,country' rows
+    (e.g. 1.0.0.0/24,AU) or 'first_ip,last_ip,country' rows; a header row and '#' comments are skipped.
+    Ranges (non-overlapping) are kept as sorted start/end integer arrays per IP version and searched with bisect.
+    """
+    def __init__(self, ranges: List[Tuple[int, int, int, str]]):
+        self._starts: Dict[int, List[int]] = {4: [], 6: []}
+        self._ends: Dict[int, List[int]] = {4: [], 6: []}
+        self._countries: Dict[int, List[str]] = {4: [], 6: []}
+        for version, start, end, country in sorted(ranges):
+            self._starts[version].append(start)
+            self._ends[version].append(end)
+            self._countries[version].append(country)
+
+    def __len__(self) -> int:
+        return len(self._starts[4]) + len(self._starts[6])
+
+    @classmethod
+    def load(cls, filepath: str) -> 'CountryIndex':
+        ranges = []
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            for line_no, row in enumerate(csv.reader(f), start=1):
+                row = [cell.strip() for cell in row]
+                if not row or not row[0] or row[0].startswith('#'):
+                    continue
+                try:
+                    if len(row) == 2:
+                        network = ipaddress.ip_network(row[0], strict=False)
+                        first, last = network.network_address, network.broadcast_address
+                    else:
+                        first, last = ipaddress.ip_address(row[0]), ipaddress.ip_address(row[1])
+                    country = row[-1].upper()
+                except ValueError:
+                    if line_no > 1: # The first row may be a header
+                        print(f"Warning: Skipping invalid line {line_no} in {filepath}: {row}")
+                    continue
+                ranges.append((first.version, int(first), int(last), country))
+        return cls(ranges)
+
+    def country(self, ip: Any) -> Optional[str]:
+        value = int(ip)
+        starts = self._starts[ip.version]
+        i = bisect.bisect_right(starts, value) - 1
+        if i >= 0 and value <= self._ends[ip.version][i]:
+            return self._countries[ip.version][i]
+        return None
+
+
+class LanguageResolver:
+    def __init__(self, database_path: Optional[str] = None, lookup_url: str = 'https://ipinfo.io/{ip}/country',
+                 token: Optional[str] = None, timeout: float = 2.0, cache_size: int = 10000,
+                 cache_ttl: float = 86400, session: Optional[requests.Session] = None,
+                 outbound: Optional[OutboundExecutor] = None, wait: float = 0.5):
+        self.lookup_url = lookup_url
+        self.token = token
+        self.timeout = timeout
+        self.outbound = outbound
+        self.wait = wait # Seconds a request waits for a remote lookup running on the outbound pool
+        self._pending: Dict[str, Future] = {} # Network key -> lookup in flight, shared by concurrent requests
+        self._pending_lock = threading.Lock()
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.index = None
+        if database_path:
+            try:
+                self.index = CountryIndex.load(database_path)
+                print(f"Loaded {len(self.index)} GeoIP ranges from {database_path}")
+            except OSError as e:
+                print(f"Warning: GeoIP database {database_path} not loaded: {e}")
+        self.session = session or self._pooled_session()
+        self.remote_lookups = 0
+        self.remote_failures = 0
+        self.remote_skipped = 0 # Refused by the outbound pool (circuit open or saturated)
+
+    @staticmethod
+    def _pooled_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def cache_key(ip: Any) -> str:
+        """Clients in the same /24 (IPv4) or /48 (IPv6) share a cache entry."""
+        prefix = 24 if ip.version == 4 else 48
+        return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+
+    def country_for_ip(self, ip_string: Optional[str]) -> Optional[str]:
+        """ISO country code for an IP address, or None if unknown (private addresses are never looked up)."""
+        try:
+            ip = ipaddress.ip_address((ip_string or '').split(',')[0].strip()) # First X-Forwarded-For hop
+        except ValueError:
+            return None
+        if not ip.is_global:
+            return None
+        key = self.cache_key(ip)
+        country = self.cache.get(key, _MISSING)
+        if country is not _MISSING:
+            return country
+        country = self.index.country(ip) if self.index else None
+        if country is not None or not self.token or not self.lookup_url:
+            # The remote lookup needs a token (IPINFO_TOKEN), as before; unknown results are cached too
+            self.cache.set(key, country)
+            return country
+        if self.outbound is not None:
+            return self._remote_country_pooled(key, ip)
+        try:
+            return self._lookup_remote(key, ip)
+        except requests.RequestException as e:
+            print(f"GeoIP lookup failed for IP {ip}: {e}")
+            return None
+
+    def _remote_country_pooled(self, key: str, ip: Any) -> Optional[str]:
+        with self._pending_lock:
+            future = self._pending.get(key)
+            if future is None:
+                try:
+                    future = self.outbound.submit('geoip', lambda: self._lookup_remote(key, ip))
+                except UpstreamUnavailable:
+                    self.remote_skipped += 1
+                    return None # Not cached: retried once the upstream recovers
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._pending.pop(key, None))
+        try:
+            return future.result(timeout=self.wait)
+        except FutureTimeout:
+            return None # The answer is cached when it arrives
+        except requests.RequestException as e:
+            print(f"GeoIP lookup failed for IP {ip}: {e}")
+            return None
+
+    def _lookup_remote(self, key: str, ip: Any) -> Optional[str]:
+        """Remote lookup whose result is cached (a failure only for FAILURE_TTL). Transport errors are re-raised."""
+        country = None
+        try:
+            country = self._remote_country(ip)
+        finally:
+            if country is None:
+                self.remote_failures += 1
+            self.cache.set(key, country, ttl=None if country is not None else FAILURE_TTL)
+        return country
+
+    def _remote_country(self, ip: Any) -> Optional[str]:
+        self.remote_lookups += 1
+        response = self.session.get(self.lookup_url.format(ip=ip), params={'token': self.token},
+                                    timeout=self.timeout)
+        if response.status_code >= 500:
+            response.raise_for_status() # Counts against the circuit
+        if response.status_code == 200:
+            country = response.text.strip().upper()
+            if len(country) == 2:
+                return country
+        return None
+
+    def language_for_ip(self, ip_string: Optional[str]) -> str:
+        return 'ar' if self.country_for_ip(ip_string) in ARABIC_COUNTRIES else 'en'
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats.update({'ranges': len(self.index) if self.index else 0,
+                      'remoteLookups': self.remote_lookups, 'remoteFailures': self.remote_failures,
+                      'remoteSkipped': self.remote_skipped})
+        return stats
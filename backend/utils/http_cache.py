@@ -0,0 +1,46 @@
+# utils/http_cache.py
+# Conditional GET support for the read-heavy API endpoints. ETags are derived from data version
+# tokens (see StorageBackend.data_version), so an unchanged payload is answered with 304 Not Modified
+# before anything is loaded or serialized, and every worker process computes the same tag.
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional
+from flask import request, jsonify, Response
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag value for a payload identified by its version tokens."""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:32]
+
+def json_object(fields: Dict[str, Any]) -> bytes:
+    """
+    Encodes a JSON object whose values may be pre-serialized JSON bytes (spliced in as they are) or plain
+    objects. Same format as jsonify: sorted keys, compact separators, trailing newline.
+    """
+    parts = []
+    for key in sorted(fields):
+        value = fields[key]
+        encoded = value.rstrip(b'\n') if isinstance(value, bytes) else \
+            json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        parts.append(json.dumps(key).encode('utf-8') + b':' + encoded)
+    return b'{' + b','.join(parts) + b'}\n'
+
+def conditional_json(etag: str, build: Callable[[], Any], cache_control: str,
+                     vary: Optional[str] = None) -> Response:
+    """
+    Returns 304 if the client already holds etag, otherwise jsonify(build()); build may also return
+    pre-serialized JSON bytes, which are sent as they are.
+    Both carry the ETag and Cache-Control headers (and Vary, for payloads that depend on the session).
+    """
+    if request.if_none_match.contains_weak(etag): # RFC 9110: If-None-Match uses weak comparison
+        response = Response(status=304)
+    else:
+        payload = build()
+        if isinstance(payload, bytes):
+            response = Response(payload, mimetype='application/json')
+        else:
+            response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if vary:
+        response.vary.add(vary)
+    return response
@@ -0,0 +1,158 @@
+# utils/metrics.py
+# In-process metrics in the Prometheus text exposition format (served by /api/admin/metrics).
+# Counters and histograms live in one process-wide registry; values that other components already keep
+# (cache hit/miss counters, queue sizes) are read by collector callbacks at scrape time instead of being
+# duplicated. Each worker process keeps its own numbers, so scrape every worker (or sum them).
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # Seconds
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, Any], float] # (labels, value)
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for label_values, value in values:
+            lines.append(f'{self.name}{_format_labels(dict(zip(self.label_names, label_values)))} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[LabelValues, list] = {} # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1 # Non-cumulative here; summed up when rendering
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series_list = sorted((key, list(series)) for key, series in self._series.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label_values, series in series_list:
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": bound})} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": "+Inf"})} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {series[-2]!r}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {series[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, help_text, label_names, buckets))
+
+    def _get_or_create(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """collector() returns (name, type, help, samples) families, evaluated at every scrape. Re-registering replaces."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+            collectors = list(self._collectors.items())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector_name, collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"Error in metrics collector {collector_name}: {e}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# --- File I/O counters (storage files, journals, audit log) ---
+FILE_IO_OPERATIONS = REGISTRY.counter('phoenix_file_io_operations_total', 'File reads and writes by data file.',
+                                      ('op', 'file'))
+FILE_IO_BYTES = REGISTRY.counter('phoenix_file_io_bytes_total', 'Bytes read from and written to data files.',
+                                 ('op', 'file'))
+
+def count_io(op: str, filepath: str, nbytes: int):
+    """Records one 'read' or 'write' of nbytes on a data file (labelled by file name, not full path)."""
+    name = os.path.basename(filepath)
+    FILE_IO_OPERATIONS.inc(op, name)
+    FILE_IO_BYTES.inc(op, name, amount=nbytes)
+
+# --- Storage call timing (see storage.InstrumentedStorage) ---
+STORAGE_DURATION = REGISTRY.histogram('phoenix_storage_operation_duration_seconds',
+                                      'Duration of storage backend calls.', ('backend', 'operation'))
+
+# --- Request timing (see create_app) ---
+REQUEST_DURATION = REGISTRY.histogram('phoenix_http_request_duration_seconds',
+                                      'Time to produce a response (streamed bodies excluded), by route.',
+                                      ('method', 'route', 'status'))
+
+def stats_samples(stats: Dict[str, Dict[str, Any]], key: str, label: str = 'cache') -> List[Sample]:
+    """Samples of one numeric field (e.g. 'hits') from a {name: {field: value}} stats dict."""
+    return [({label: name}, values[key]) for name, values in sorted(stats.items())
+            if isinstance(values, dict) and isinstance(values.get(key), (int, float))]
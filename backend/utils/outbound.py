@@ -0,0 +1,141 @@
+# utils/outbound.py
+# Outbound calls (Google, ipinfo.io) run on a small bounded thread pool with a deadline and a circuit breaker
+# per upstream. A slow or failing upstream can then hold at most max_pending request threads for at most
+# `timeout` seconds each; further calls are refused at once (UpstreamUnavailable) instead of queueing, so
+# voting and the read endpoints keep their worker threads.
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+class UpstreamUnavailable(Exception):
+    """The call was not made (circuit open, pool saturated) or did not finish before its deadline."""
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and refuses calls for reset_timeout seconds.
+    Then one trial call is let through (half-open): success closes the circuit, failure opens it again.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self._opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_running:
+                self._trial_running = True # Half-open: exactly one trial call
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_running:
+                    self.opens += 1
+                    print(f"Circuit for {self.name} opened after {self._failures} consecutive failure(s)")
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {'state': self.state, 'consecutiveFailures': self._failures, 'opens': self.opens,
+                'rejected': self.rejected}
+
+
+class OutboundExecutor:
+    def __init__(self, max_workers: int = 8, max_pending: int = 32, timeout: float = 10.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.timeout = timeout # Default deadline (seconds) a caller waits for a result
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='outbound')
+        self._slots = threading.BoundedSemaphore(max_pending) # Calls queued or running
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.saturated = 0
+        self.timeouts = 0
+
+    def breaker(self, upstream: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(upstream)
+            if breaker is None:
+                breaker = self._breakers[upstream] = CircuitBreaker(upstream, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def submit(self, upstream: str, fn: Callable[[], Any], expected: Tuple[Type[BaseException], ...] = ()) -> Future:
+        """
+        Schedules fn() on the pool without waiting. Exceptions of the `expected` types mean the upstream
+        answered (e.g. an OAuth error response) and don't count against its circuit.
+        Raises UpstreamUnavailable if the circuit is open or max_pending calls are already in flight.
+        """
+        breaker = self.breaker(upstream)
+        if not breaker.allow():
+            raise UpstreamUnavailable(upstream, 'circuit open')
+        if not self._slots.acquire(blocking=False):
+            self.saturated += 1
+            if breaker.state == 'half_open':
+                breaker.record_failure() # Give the trial slot back; try again after the next reset_timeout
+            raise UpstreamUnavailable(upstream, 'too many calls in flight')
+
+        def run():
+            try:
+                result = fn()
+            except expected:
+                breaker.record_success()
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            finally:
+                self._slots.release()
+            breaker.record_success()
+            return result
+
+        try:
+            return self._pool.submit(run)
+        except RuntimeError: # Pool shut down (interpreter exit)
+            self._slots.release()
+            raise UpstreamUnavailable(upstream, 'shutting down')
+
+    def call(self, upstream: str, fn: Callable[[], Any], timeout: Optional[float] = None,
+             expected: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """Runs fn() on the pool and waits up to timeout seconds for its result (or exception)."""
+        future = self.submit(upstream, fn, expected)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            # The call keeps running in the pool (bounded by its own HTTP timeout); the caller moves on
+            self.timeouts += 1
+            raise UpstreamUnavailable(upstream, 'timed out') from None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = {name: breaker.stats() for name, breaker in self._breakers.items()}
+        return {'saturated': self.saturated, 'timeouts': self.timeouts, 'circuits': breakers}
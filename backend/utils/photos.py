@@ -0,0 +1,326 @@
+# utils/photos.py
+# Local copies of candidate photos. A remote photo URL is downloaded once (through the outbound pool, see
+# utils/outbound.py), cropped to a fixed-size square thumbnail and stored as JPEG and WebP under the photos
+# folder (Pillow is required; downloads it can't decode are rejected, never stored full size). manifest.json
+# maps each source URL to its photo id; candidate payloads then point at /photos/<id>, which is served with long-lived caching.
+# Only public hosts are fetched from (or those in PHOTO_ALLOWED_HOSTS): each URL, including every redirect
+# hop, is checked before the request, so candidate data can't make the server call internal addresses.
+# The manifest's mtime is the version token, so other workers pick up new photos with a stat. Workers add
+# entries under a lock file (manifest.json.lock), so concurrent ingests don't drop each other's entries.
+import hashlib
+import io
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from urllib.parse import urljoin, urlsplit
+from typing import Any, Dict, Optional, Tuple
+import requests
+try:
+    import fcntl # Cross-process lock (POSIX only)
+except ImportError:
+    fcntl = None
+from utils.metrics import count_io
+from utils.outbound import OutboundExecutor, UpstreamUnavailable
+from utils.storage import file_version
+try:
+    from PIL import Image, ImageOps # Required by PhotoStore; without it the app serves the source URLs
+except ImportError:
+    Image = None
+
+MANIFEST_NAME = 'manifest.json'
+FAILURE_TTL = 600 # Seconds before a photo that failed to download is tried again
+MAX_REDIRECTS = 3
+ANSWERED_ERRORS = (requests.HTTPError, ValueError) # The host answered (404, not an image, too large): not an outage
+INGEST_ERRORS = (requests.RequestException, UpstreamUnavailable, ValueError, OSError)
+# Image types accepted from remote hosts, by leading bytes (the Content-Type header isn't trusted)
+SIGNATURES = ((b'\xff\xd8\xff', 'image/jpeg', '.jpg'), (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+              (b'GIF87a', 'image/gif', '.gif'), (b'GIF89a', 'image/gif', '.gif'))
+
+def sniff_image(data: bytes) -> Optional[Tuple[str, str]]:
+    """(mimetype, extension) of JPEG, PNG, GIF or WebP data, else None."""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp', '.webp'
+    for signature, mimetype, extension in SIGNATURES:
+        if data.startswith(signature):
+            return mimetype, extension
+    return None
+
+def is_remote(source: Any) -> bool:
+    return isinstance(source, str) and source.startswith(('http://', 'https://'))
+
+def check_host(url: str, allowed_hosts: frozenset = frozenset()):
+    """
+    Raises ValueError unless url may be fetched: its host is in allowed_hosts if that is set, otherwise every
+    address it resolves to is public (no loopback, link-local, private or reserved ranges).
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        raise ValueError(f"not an http(s) URL: {url}")
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f"host {host} is not in PHOTO_ALLOWED_HOSTS")
+        return
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP):
+        address = ipaddress.ip_address(info[4][0].split('%')[0]) # Drop an IPv6 zone id
+        if not address.is_global:
+            raise ValueError(f"host {host} resolves to non-public address {address}")
+
+def upstream_name(source: str) -> str:
+    """Outbound upstream (circuit breaker) per photo host, so one dead host doesn't block the others."""
+    return f"photos:{urlsplit(source).hostname or ''}"
+
+
+class PhotoStore:
+    def __init__(self, folder: str, size: int = 200, max_bytes: int = 5 * 1024 * 1024, timeout: float = 10.0,
+                 outbound: Optional[OutboundExecutor] = None, url_prefix: str = '/photos/', allowed_hosts: str = ''):
+        if Image is None:
+            raise RuntimeError("Pillow is not installed, so candidate photo thumbnails can't be made (pip install Pillow)")
+        self.folder = folder
+        self.size = size # Thumbnail edge in pixels (cards show photos at 80-100 CSS px)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.outbound = outbound
+        self.url_prefix = url_prefix
+        self.allowed_hosts = frozenset(host.strip().lower() for host in allowed_hosts.split(',') if host.strip())
+        self.manifest_path = os.path.join(folder, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock() # Manifest rewrites by this process's threads; workers use the lock file
+        self._sources: Dict[str, Dict[str, Any]] = {} # Source URL -> {'id', 'files': {mimetype: filename}}
+        self._ids: Dict[str, Dict[str, Any]] = {} # Photo id -> same entry
+        self._version = None
+        self._pending = set() # Sources being downloaded in the background
+        self._failed: Dict[str, float] = {} # Source -> monotonic time of the last failure
+        self._session = requests.Session()
+        self.ingested = 0
+        self.failures = 0
+
+    # --- Manifest ---
+    def version(self) -> Any:
+        return file_version(self.manifest_path)
+
+    def _refresh(self):
+        """Reloads the manifest if another worker (or this one) changed it."""
+        version = self.version()
+        if version == self._version:
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+                count_io('read', self.manifest_path, f.tell())
+        except FileNotFoundError:
+            manifest = {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read photo manifest {self.manifest_path}: {e}")
+            return
+        with self._lock:
+            self._sources = {source: entry for source, entry in manifest.items() if isinstance(entry, dict)}
+            self._ids = {entry['id']: entry for entry in self._sources.values() if 'id' in entry}
+            self._version = version
+
+    def _record(self, source: str, entry: Dict[str, Any]):
+        """Adds an entry to the manifest on disk. Re-read under the lock file, so other workers' entries are kept."""
+        os.makedirs(self.folder, exist_ok=True)
+        with self._manifest_lock, open(self.manifest_path + '.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                self._version = None
+                self._refresh()
+                manifest = dict(self._sources, **{source: entry})
+                self._write(MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+                with self._lock:
+                    self._sources = manifest
+                    self._ids[entry['id']] = entry
+                    self._version = self.version()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, filename: str, data: bytes):
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, filename)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" # Unique: workers may write at once
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        count_io('write', path, len(data))
+        os.replace(tmp_path, path)
+
+    # --- Lookup ---
+    def local_url(self, source: Any) -> Optional[str]:
+        """The /photos/<id> URL of an ingested source, or None."""
+        if not isinstance(source, str):
+            return None
+        self._refresh()
+        entry = self._sources.get(source)
+        return self.url_prefix + entry['id'] if entry else None
+
+    def photo_url(self, source: Any) -> Any:
+        """
+        URL to put in candidate payloads: the local copy if there is one. Otherwise the source as it is, and a
+        remote source is downloaded in the background (the manifest version then changes and payloads are rebuilt).
+        """
+        url = self.local_url(source)
+        if url:
+            return url
+        if is_remote(source):
+            self.ingest_async(source)
+        return source
+
+    def find(self, photo_id: str, accept_webp: bool = False) -> Optional[Tuple[str, str]]:
+        """(path, mimetype) of the file to send for a photo id: WebP if the client takes it, else the fallback."""
+        self._refresh()
+        entry = self._ids.get(photo_id)
+        if not entry:
+            return None
+        files = entry.get('files', {})
+        for mimetype in (('image/webp',) if accept_webp else ()) + ('image/jpeg', entry.get('original')):
+            if mimetype in files:
+                return os.path.join(self.folder, files[mimetype]), mimetype
+        return None
+
+    # --- Ingest ---
+    def ingest(self, source: str) -> Optional[str]:
+        """
+        Downloads a remote photo and stores its variants; returns its local URL. None if that failed, or if it
+        takes longer than the outbound deadline (it is then stored when done, like an ingest_async() download).
+        """
+        url = self.local_url(source)
+        if url or not is_remote(source):
+            return url
+        if self.outbound is None:
+            try:
+                return self._fetch(source)
+            except INGEST_ERRORS as e:
+                self._fail(source, e)
+                return None
+        with self._lock:
+            self._failed.pop(source, None) # Asked for explicitly: don't wait out an earlier failure
+        future = self.ingest_async(source)
+        if future is None:
+            return self.local_url(source) # Already being downloaded, or refused (circuit open, pool busy)
+        try:
+            return future.result(timeout=self.outbound.timeout)
+        except FutureTimeout:
+            return None
+        except INGEST_ERRORS:
+            return None # Reported by _finish()
+
+    def ingest_async(self, source: str) -> Optional[Future]:
+        """
+        Like ingest() without waiting; at most one download per source, and none soon after a failure.
+        Returns the outbound future of the download it started, if any.
+        """
+        with self._lock:
+            failed_at = self._failed.get(source)
+            if source in self._pending or (failed_at is not None and time.monotonic() - failed_at < FAILURE_TTL):
+                return None
+            self._pending.add(source)
+        if self.outbound is None:
+            threading.Thread(target=self._ingest_pending, args=(source,), name='photo-ingest', daemon=True).start()
+            return None
+        try:
+            future = self.outbound.submit(upstream_name(source), lambda: self._fetch(source), expected=ANSWERED_ERRORS)
+        except UpstreamUnavailable:
+            self._done(source) # Circuit open or pool busy: the next payload rebuild tries again
+            return None
+        future.add_done_callback(lambda f: self._finish(source, f))
+        return future
+
+    def _ingest_pending(self, source: str):
+        try:
+            self.ingest(source)
+        finally:
+            self._done(source)
+
+    def _fetch(self, source: str) -> str:
+        return self._store(source, self._download(source))
+
+    def _finish(self, source: str, future: Future):
+        """Records the outcome of a pool download (runs on the pool thread that did it)."""
+        try:
+            future.result()
+        except INGEST_ERRORS as e:
+            self._fail(source, e)
+        finally:
+            self._done(source)
+
+    def _done(self, source: str):
+        with self._lock:
+            self._pending.discard(source)
+
+    def _fail(self, source: str, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self._failed[source] = time.monotonic()
+        print(f"Warning: Could not fetch candidate photo {source}: {error}")
+
+    def _download(self, source: str) -> bytes:
+        """Fetches source, following redirects by hand so every hop's host is checked first."""
+        url = source
+        for _ in range(MAX_REDIRECTS + 1):
+            check_host(url, self.allowed_hosts)
+            with self._session.get(url, timeout=self.timeout, stream=True, allow_redirects=False) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers['Location'])
+                    continue
+                response.raise_for_status()
+                declared = response.headers.get('Content-Length')
+                if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                    raise ValueError(f"photo larger than {self.max_bytes} bytes")
+                chunks, total = [], 0
+                for chunk in response.iter_content(64 * 1024):
+                    total += len(chunk)
+                    if total > self.max_bytes:
+                        raise ValueError(f"photo larger than {self.max_bytes} bytes")
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        raise ValueError(f"more than {MAX_REDIRECTS} redirects")
+
+    def _store(self, source: str, data: bytes) -> str:
+        kind = sniff_image(data)
+        if kind is None:
+            raise ValueError('not a JPEG, PNG, GIF or WebP image')
+        mimetype, _ = kind
+        photo_id = f"{hashlib.sha256(data).hexdigest()[:16]}-{self.size}"
+        variants = self._thumbnails(data)
+        if not variants:
+            raise ValueError('image could not be converted to a thumbnail')
+        files = {}
+        for variant_type, (variant_extension, variant_data) in variants.items():
+            files[variant_type] = photo_id + variant_extension
+            self._write(files[variant_type], variant_data)
+        self._record(source, {'id': photo_id, 'original': mimetype, 'files': files})
+        self.ingested += 1
+        return self.url_prefix + photo_id
+
+    def _thumbnails(self, data: bytes) -> Dict[str, Tuple[str, bytes]]:
+        """Square size x size JPEG and WebP versions (centre crop), or {} if Pillow can't decode the image."""
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image = ImageOps.exif_transpose(image).convert('RGB')
+                thumbnail = ImageOps.fit(image, (self.size, self.size), Image.LANCZOS)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            print(f"Warning: Could not decode candidate photo: {e}")
+            return {}
+        variants = {}
+        for mimetype, extension, fmt, options in (('image/jpeg', '.jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+                                                  ('image/webp', '.webp', 'WEBP', {'quality': 80, 'method': 6})):
+            out = io.BytesIO()
+            try:
+                thumbnail.save(out, fmt, **options)
+            except (OSError, KeyError, ValueError): # e.g. Pillow built without WebP support
+                continue
+            variants[mimetype] = (extension, out.getvalue())
+        return variants
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh()
+        with self._lock:
+            return {'photos': len(self._ids), 'ingested': self.ingested, 'failures': self.failures,
+                    'pending': len(self._pending)}
@@ -0,0 +1,197 @@
+# utils/prerender.py
+# Server-side rendering of index.html. Each (language, privacy tier) variant has the translations applied to the
+# data-i18n elements, the candidate grids filled in and the bootstrap data (translations, candidates) embedded,
+# so the first paint is already in the visitor's language and the frontend starts without any API call.
+# Variants are built on first use and rebuilt only when the template, the candidates or that language's
+# translations change. Only the session and election status are added per request; the gzip stream of the
+# shared part is kept, so that part is not compressed again either.
+import hashlib
+import html
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, Tuple
+from utils.data_handler import (get_candidates, get_candidates_json, get_data_version, get_languages,
+                                get_translations_digest, get_translations_json, load_translations,
+                                public_photo_url)
+from utils.http_cache import json_object
+
+I18N_TAG = re.compile(r'<(?P<tag>[a-zA-Z][\w-]*)(?P<attrs>[^>]*\sdata-i18n="(?P<spec>[^"]*)"[^>]*)>')
+VOID_TAGS = frozenset(('area', 'br', 'hr', 'img', 'input', 'link', 'meta', 'source'))
+RTL_LANGUAGES = frozenset(('ar',))
+GZIP_LEVEL = 6
+
+def _escape(text: Any) -> str:
+    return html.escape(str(text), quote=True)
+
+def _set_attribute(tag: str, name: str, value: str) -> str:
+    """Opening tag markup with attribute `name` set to value (replaced if present, else appended)."""
+    pattern = re.compile(rf'(\s{re.escape(name)}=")[^"]*(")')
+    if pattern.search(tag):
+        return pattern.sub(lambda m: m.group(1) + _escape(value) + m.group(2), tag, count=1)
+    end = len(tag) - (2 if tag.endswith('/>') else 1)
+    return f'{tag[:end]} {name}="{_escape(value)}"{tag[end:]}'
+
+def apply_translations(markup: str, strings: Dict[str, str]) -> str:
+    """
+    What I18nModule.applyTranslations does on page load: sets the text of each data-i18n element (or, for
+    'key|attribute', that attribute). Elements with parameters or unknown keys are left for the frontend.
+    """
+    out, pos = [], 0
+    for m in I18N_TAG.finditer(markup):
+        if m.start() < pos or 'data-i18n-params' in m.group('attrs'):
+            continue # Inside an element already replaced, or needs runtime parameters
+        key, _, attribute = m.group('spec').partition('|')
+        text = strings.get(key)
+        if not isinstance(text, str):
+            continue
+        if attribute:
+            out.append(markup[pos:m.start()] + _set_attribute(m.group(0), attribute, text))
+            pos = m.end()
+            continue
+        tag = m.group('tag').lower()
+        close = markup.find(f'</{tag}>', m.end())
+        if tag in VOID_TAGS or close < 0 or re.search(rf'<{tag}[\s>]', markup[m.end():close]):
+            continue # No closing tag, or a nested element of the same name makes the end ambiguous
+        out.append(markup[pos:m.end()] + html.escape(text, quote=False))
+        pos = close
+    out.append(markup[pos:])
+    return ''.join(out)
+
+def _fill_element(markup: str, element_id: str, inner: str) -> str:
+    """Replaces the (placeholder) content of the div with the given id."""
+    m = re.search(rf'<div id="{re.escape(element_id)}"[^>]*>', markup)
+    if not m:
+        return markup
+    close = markup.find('</div>', m.end())
+    if close < 0 or '<div' in markup[m.end():close]:
+        return markup # Not a placeholder
+    return markup[:m.end()] + inner + markup[close:]
+
+# --- Candidate cards (same markup as candidates.js renders; the frontend re-renders them with listeners) ---
+def _activity(candidate) -> Tuple[str, str]:
+    activity = candidate.activity or 0
+    level = 'high' if activity >= 5 else 'medium' if activity >= 3 else 'low'
+    return f'activity-{level}', f'candidates.activity.{level}'
+
+def _translated(strings: Dict[str, str], key: str, default: str) -> str:
+    return f'<span data-i18n="{key}">{_escape(strings.get(key, default))}</span>'
+
+def _vote_card(candidate, strings: Dict[str, str]) -> str:
+    cid, name = _escape(candidate.id), _escape(candidate.name)
+    activity_class, activity_key = _activity(candidate)
+    return (
+        f'<div class="candidate-item" data-id="{cid}"><div class="candidate-main-content">'
+        f'<div class="candidate-info" data-id="{cid}"><i class="fas fa-info"></i></div>'
+        f'<img src="{_escape(public_photo_url(candidate.photo))}" alt="{name}" class="candidate-image">'
+        f'<div class="candidate-text-info"><div class="candidate-name">{name}</div>'
+        f'<div class="candidate-position">'
+        f'{_escape(candidate.field_of_activity) if candidate.field_of_activity else _translated(strings, "common.n_a", "N/A")}'
+        f'</div></div></div>'
+        f'<div class="candidate-activity-and-badge"><div class="activity-indicator {activity_class}" '
+        f'data-i18n="{activity_key}">{_escape(strings.get(activity_key, "Activity Level"))}</div></div>'
+        f'<div class="candidate-details" id="details-{cid}"><div class="close-details" data-id="{cid}">×</div>'
+        f'<h4>{name}</h4>'
+        f'<p>{_escape(candidate.bio) if candidate.bio else _translated(strings, "candidates.bio.unavailable", "No brief bio available.")}</p>'
+        f'<p><strong>{_translated(strings, "candidates.activity.weekly", "Weekly Activity")}:</strong> '
+        f'{_escape(candidate.activity)} {_translated(strings, "common.hours", "hours")}</p></div></div>'
+    )
+
+def _info_card(candidate, strings: Dict[str, str]) -> str:
+    name = _escape(candidate.name)
+    activity_class, activity_key = _activity(candidate)
+    return (
+        f'<div class="candidate-item info-candidate-item" data-id="{_escape(candidate.id)}">'
+        f'<img src="{_escape(public_photo_url(candidate.photo))}" alt="{name}" class="candidate-image">'
+        f'<div class="candidate-name">{name}</div>'
+        f'<div class="candidate-position">'
+        f'{_escape(candidate.field_of_activity) if candidate.field_of_activity else _translated(strings, "common.n_a", "N/A")}'
+        f'</div>'
+        f'<div class="activity-indicator {activity_class}" data-i18n="{activity_key}">'
+        f'{_escape(strings.get(activity_key, "Activity Level"))}</div>'
+        f'<div class="candidate-bio-preview"><p>'
+        f'{_escape(candidate.bio) if candidate.bio else _translated(strings, "candidates.bio.unavailable.full", "No brief biography available.")}'
+        f'</p></div></div>'
+    )
+
+def _script_json(payload: bytes) -> bytes:
+    """JSON for a <script type="application/json"> element: '<' can only occur in strings, so escaping it is safe."""
+    return payload.rstrip(b'\n').replace(b'<', b'\\u003c')
+
+
+class RenderedPage:
+    """One variant, split where the per-request session data goes."""
+    def __init__(self, prefix: bytes, suffix: bytes):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.digest = hashlib.sha1(prefix + suffix).hexdigest()[:16]
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # wbits 31: gzip container
+        self.gzip_prefix = self._compressor.compress(prefix) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def body(self, session_json: bytes, gzip: bool = False) -> bytes:
+        tail = _script_json(session_json) + self.suffix
+        if not gzip:
+            return self.prefix + tail
+        compressor = self._compressor.copy() # Continues the stream after the shared prefix
+        return self.gzip_prefix + compressor.compress(tail) + compressor.flush()
+
+
+class PageRenderer:
+    def __init__(self, static_assets, filename: str = 'index.html'):
+        self.static_assets = static_assets
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._pages: Dict[Tuple[str, bool], Tuple[Any, RenderedPage]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def page(self, lang: str, include_private: bool = False) -> RenderedPage:
+        """The cached variant for lang and privacy tier, rebuilt if its template or data changed."""
+        template_path = self.static_assets.path(self.filename)
+        version = (template_path, os.path.getmtime(template_path), get_data_version('candidates'),
+                   get_translations_digest(lang))
+        key = (lang, include_private)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        page = self._render(template_path, lang, include_private)
+        with self._lock:
+            self._pages[key] = (version, page)
+        return page
+
+    def _render(self, template_path: str, lang: str, include_private: bool) -> RenderedPage:
+        with open(template_path, 'r', encoding='utf-8') as f:
+            markup = f.read()
+        strings = (load_translations() or {}).get(lang) or {}
+        markup = apply_translations(markup, strings)
+        markup = re.sub(r'<html\b[^>]*>', lambda m: _set_attribute(m.group(0), 'lang', lang), markup, count=1)
+        if lang in RTL_LANGUAGES:
+            markup = re.sub(r'<body\b[^>]*>', lambda m: _set_attribute(m.group(0), 'class', 'rtl'), markup, count=1)
+
+        candidates = sorted(get_candidates(include_private=False), key=lambda c: str(c.name).casefold())
+        markup = _fill_element(markup, 'candidateList', ''.join(_vote_card(c, strings) for c in candidates))
+        markup = _fill_element(markup, 'infoCandidateList', ''.join(_info_card(c, strings) for c in candidates))
+
+        # The shared fields of /api/bootstrap; core-main.js merges in the per-request session script
+        data = json_object({
+            'candidates': get_candidates_json(include_private=include_private),
+            'language': lang,
+            'languages': get_languages(),
+            'translations': get_translations_json(lang) or {}
+        })
+        body_end = markup.rfind('</body>')
+        if body_end < 0:
+            body_end = len(markup)
+        prefix = (markup[:body_end].encode('utf-8') +
+                  b'    <script id="bootstrapData" type="application/json">' + _script_json(data) + b'</script>\n' +
+                  b'    <script id="bootstrapSession" type="application/json">')
+        return RenderedPage(prefix, b'</script>\n' + markup[body_end:].encode('utf-8'))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'variants': len(self._pages)}
+
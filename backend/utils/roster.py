@@ -0,0 +1,206 @@
+# utils/roster.py
+# Voter roster: who may vote and who is an admin, keyed by normalized email.
+# Loaded from a CSV ('email[,role]') or NDJSON ({"email": ..., "role": ...}) file into hash sets, merged with the
+# PHOENIX_ELIGIBLE_VOTER_EMAILS / PHOENIX_ADMIN_EMAILS environment variables, and reloaded when the file changes
+# (so an import in one worker reaches the others). Role defaults to 'voter'; an email may appear once per role.
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+try:
+    import fcntl # Cross-process lock (POSIX only)
+except ImportError:
+    fcntl = None
+
+ROLES = ('voter', 'admin')
+
+def normalize_email(email: Any) -> Optional[str]:
+    """Lower-cased, trimmed email, or None if it doesn't look like one."""
+    if not isinstance(email, str):
+        return None
+    email = email.strip().lower()
+    return email if '@' in email and ' ' not in email else None
+
+def parse_roster(text: str, fmt: str = 'csv') -> Tuple[List[Tuple[str, str]], int]:
+    """(email, role) entries from CSV or NDJSON text, and the number of rejected rows."""
+    entries, rejected = [], 0
+    if fmt == 'ndjson':
+        rows = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                rejected += 1
+                continue
+            rows.append([item] if isinstance(item, str) else
+                        [item.get('email'), item.get('role')] if isinstance(item, dict) else [None])
+    else:
+        rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+        if rows and rows[0][0].strip().lower() == 'email': # Header row
+            rows = rows[1:]
+    for row in rows:
+        email = normalize_email(row[0])
+        role = str(row[1] if len(row) > 1 and row[1] else 'voter').strip().lower()
+        if email is None or role not in ROLES:
+            rejected += 1
+            continue
+        entries.append((email, role))
+    return entries, rejected
+
+def roster_format(filepath: str) -> str:
+    return 'ndjson' if filepath.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+def _env_emails(value: str) -> List[str]:
+    return [email for email in (normalize_email(part) for part in value.split(',')) if email]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives; ~error_rate false positives)."""
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class VoterRoster:
+    def __init__(self, filepath: str, eligible_env: str = '', admin_env: str = '',
+                 use_bloom_filter: bool = False, reload_interval: float = 2.0):
+        self.filepath = filepath # e.g. data/voter_roster.csv (created by the first import)
+        self.format = roster_format(filepath)
+        self.eligible_env = _env_emails(eligible_env)
+        self.admin_env = _env_emails(admin_env)
+        self.use_bloom_filter = use_bloom_filter
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        # (voters, admins, bloom over voters) swapped as one tuple, so readers never see a half-loaded roster
+        self._index: Tuple[FrozenSet[str], FrozenSet[str], Optional[BloomFilter]] = (frozenset(), frozenset(), None)
+        self._file_signature = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.bloom_rejects = 0
+        self._reload(force=True)
+
+    # --- Lookups (O(1)) ---
+    def is_eligible(self, email: Any) -> bool:
+        email = normalize_email(email)
+        if email is None:
+            return False
+        self._maybe_reload()
+        voters, _, bloom = self._index
+        if bloom is not None and email not in bloom:
+            self.bloom_rejects += 1
+            return False
+        return email in voters
+
+    def is_admin(self, email: Any) -> bool:
+        email = normalize_email(email)
+        if email is None:
+            return False
+        self._maybe_reload()
+        return email in self._index[1]
+
+    # --- Loading ---
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        if self._signature() != self._file_signature:
+            self._reload()
+
+    def _read_file(self) -> List[Tuple[str, str]]:
+        try:
+            with open(self.filepath, 'r', encoding='utf-8-sig', newline='') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return []
+        entries, rejected = parse_roster(text, self.format)
+        if rejected:
+            print(f"Warning: Skipped {rejected} invalid row(s) in {self.filepath}")
+        return entries
+
+    def _reload(self, force: bool = False):
+        with self._lock:
+            signature = self._signature()
+            if not force and signature == self._file_signature:
+                return # Another thread got here first
+            try:
+                entries = self._read_file()
+            except OSError as e:
+                print(f"Error loading voter roster {self.filepath}: {e}")
+                return
+            voters = set(self.eligible_env)
+            admins = set(self.admin_env)
+            for email, role in entries:
+                (admins if role == 'admin' else voters).add(email)
+            bloom = None
+            if self.use_bloom_filter:
+                bloom = BloomFilter(len(voters))
+                for email in voters:
+                    bloom.add(email)
+            self._index = (frozenset(voters), frozenset(admins), bloom)
+            self._file_signature = signature
+            self.reloads += 1
+        print(f"Loaded voter roster: {len(voters)} eligible voter(s), {len(admins)} admin(s).")
+
+    # --- Bulk import ---
+    def import_entries(self, entries: Iterable[Tuple[str, str]], replace: bool = False) -> Dict[str, int]:
+        """
+        Adds (email, role) entries to the roster file, or replaces its contents, then reloads.
+        The file is rewritten atomically under a lock file, so concurrent imports from several workers serialize.
+        """
+        new_entries = list(dict.fromkeys(entries))
+        os.makedirs(os.path.dirname(self.filepath) or '.', exist_ok=True)
+        with open(self.filepath + '.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                existing = [] if replace else self._read_file()
+                merged = list(dict.fromkeys(existing + new_entries))
+                tmp_path = self.filepath + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                    if self.format == 'ndjson':
+                        f.writelines(json.dumps({'email': email, 'role': role}) + '\n' for email, role in merged)
+                    else:
+                        writer = csv.writer(f)
+                        writer.writerow(['email', 'role'])
+                        writer.writerows(merged)
+                os.replace(tmp_path, self.filepath)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        self._reload(force=True)
+        return {'added': len(merged) - len(existing), 'total': len(merged)}
+
+    def stats(self) -> Dict[str, Any]:
+        voters, admins, bloom = self._index
+        return {'voters': len(voters), 'admins': len(admins), 'reloads': self.reloads,
+                'bloomFilter': bloom is not None, 'bloomRejects': self.bloom_rejects}
@@ -0,0 +1,224 @@
+# utils/session_store.py
+# Voter session store: an in-memory LRU map with TTL expiry in front of the storage backend's sessions.
+# Session updates are written behind in batches by a background thread; creates and deletes flush the
+# pending batch immediately, so another worker sees a new login before the OAuth redirect lands and a
+# logout takes effect everywhere. The same thread sweeps expired sessions and compacts the session file; with
+# several worker processes, only the one holding the sweep lock file does that.
+# When the sessions change (a batch from this worker or another one), only the sessions that batch wrote are
+# evicted from the cache, as reported by storage.session_changes().
+import atexit
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from utils.storage import StorageBackend
+try:
+    import fcntl # Cross-process lock (POSIX only)
+except ImportError:
+    fcntl = None
+
+def _parse_utc(value: Any) -> Optional[float]:
+    """Epoch seconds of an ISO timestamp ('...Z', '+00:00' or naive UTC), or None if unparsable."""
+    if not isinstance(value, str):
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+class SessionStore:
+    def __init__(self, storage: StorageBackend, ttl_seconds: float = 86400, max_entries: int = 10000,
+                 flush_interval: float = 1.0, sweep_interval: float = 300, sweep_lock_path: Optional[str] = None):
+        self.storage = storage
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.sweep_lock_path = sweep_lock_path # None: this process always sweeps
+        self._sweep_lock_file = None # Open (and locked) while this process is the sweeper
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # Keeps batches in order
+        self._sync_lock = threading.Lock() # One catch-up with the storage's session changes at a time
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict() # session_id -> (data, expires_at epoch)
+        self._cache_version = None # storage.data_version('sessions') the cache is up to date with
+        self._changes_token = None # Position in storage.session_changes() the cache is up to date with
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {} # Not yet persisted; None = delete
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.flushes = 0
+
+    def expires_at(self, session_data: Dict[str, Any]) -> float:
+        """Expiry from 'expires_at', or created_at + TTL for sessions created before expiry existed."""
+        expires = _parse_utc(session_data.get('expires_at'))
+        if expires is not None:
+            return expires
+        created = _parse_utc(session_data.get('created_at'))
+        return created + self.ttl_seconds if created is not None else 0.0 # Unknown age: treat as expired
+
+    def new_expiry(self) -> str:
+        """'expires_at' value for a session created now."""
+        expires = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.ttl_seconds)
+        return expires.isoformat() + 'Z'
+
+    # --- Reads ---
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        version = self.storage.data_version('sessions')
+        if version != self._cache_version:
+            self._catch_up(version)
+        with self._lock:
+            if session_id in self._pending:
+                session_data = self._pending[session_id]
+                if session_data is None or self.expires_at(session_data) <= time.time():
+                    return None
+                return session_data
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                self._cache.move_to_end(session_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            session_data = self.storage.get_session(session_id)
+            if session_data is None:
+                return None
+            entry = (session_data, self.expires_at(session_data))
+            with self._lock:
+                if self._cache_version == version: # Else a change may have landed after our read
+                    self._remember(session_id, entry)
+        session_data, expires = entry
+        if expires <= time.time():
+            self.expired += 1
+            self.delete(session_id, flush=False)
+            return None
+        return session_data
+
+    def _catch_up(self, version: Any):
+        """Evicts the sessions written since the cache was last brought up to date (everything if unknown)."""
+        with self._sync_lock:
+            if version == self._cache_version:
+                return # Another thread caught up already
+            token, changed = self.storage.session_changes(self._changes_token)
+            with self._lock:
+                if changed is None:
+                    self._cache.clear()
+                else:
+                    for session_id in changed:
+                        self._cache.pop(session_id, None)
+                self._changes_token = token
+                self._cache_version = version
+
+    def _remember(self, session_id: str, entry: tuple):
+        """Caller must hold _lock."""
+        self._cache[session_id] = entry
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    # --- Writes ---
+    def create(self, session_id: str, session_data: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._pending[session_id] = session_data
+        return self.flush()
+
+    def update(self, session_id: str, session_data: Dict[str, Any]):
+        """Written behind: persisted with the next batch."""
+        with self._lock:
+            self._pending[session_id] = session_data
+            self._cache.pop(session_id, None)
+
+    def delete(self, session_id: str, flush: bool = True) -> bool:
+        with self._lock:
+            self._pending[session_id] = None
+            self._cache.pop(session_id, None)
+        return self.flush() if flush else True
+
+    def flush(self) -> bool:
+        """Persists all pending changes as one batch."""
+        with self._flush_lock:
+            with self._lock:
+                changes, self._pending = self._pending, {}
+            if not changes:
+                return True
+            if self.storage.apply_session_changes(changes):
+                self.flushes += 1
+                # Move the cache to the version our batch produced; that evicts only the batch's sessions
+                # (a get() may have cached one of them while the batch was being written)
+                self._catch_up(self.storage.data_version('sessions'))
+                return True
+            with self._lock:
+                # Keep the batch for the next attempt, unless newer changes replaced an entry meanwhile
+                for session_id, session_data in changes.items():
+                    self._pending.setdefault(session_id, session_data)
+            return False
+
+    # --- Expiry ---
+    def sweep(self) -> int:
+        """Deletes expired sessions from storage and compacts it (if any expired). Returns the number removed."""
+        now = time.time()
+        expired_ids = [session_id for session_id, session_data in self.storage.load_sessions().items()
+                       if not isinstance(session_data, dict) or self.expires_at(session_data) <= now]
+        if not expired_ids:
+            return 0
+        with self._lock:
+            for session_id in expired_ids:
+                self._pending[session_id] = None
+                self._cache.pop(session_id, None)
+        self.flush()
+        self.storage.compact_sessions()
+        return len(expired_ids)
+
+    def is_sweeper(self) -> bool:
+        """
+        True in the one process that sweeps: the first to take the sweep lock file keeps it until it exits
+        (the OS then releases it, and another worker takes over at its next sweep interval).
+        """
+        if self._sweep_lock_file is not None or self.sweep_lock_path is None or fcntl is None:
+            return True
+        try:
+            lock_file = open(self.sweep_lock_path, 'a')
+        except OSError as e:
+            print(f"Warning: Could not open session sweep lock {self.sweep_lock_path}: {e}")
+            return True
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False # Another worker is the sweeper
+        self._sweep_lock_file = lock_file
+        return True
+
+    # --- Background writer/sweeper ---
+    def start(self):
+        """Starts the background flush/sweep thread once; pending changes are also flushed at exit."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='session-store', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        next_sweep = 0.0 # Sweep once at startup to clear sessions left over from earlier runs
+        while True:
+            try:
+                self.flush()
+                if time.monotonic() >= next_sweep:
+                    if self.is_sweeper():
+                        removed = self.sweep()
+                        if removed:
+                            print(f"Removed {removed} expired voter session(s).")
+                    next_sweep = time.monotonic() + self.sweep_interval
+            except Exception as e:
+                print(f"Error in session store background thread: {e}")
+            time.sleep(self.flush_interval)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'expired': self.expired, 'flushes': self.flushes,
+                    'cached': len(self._cache), 'pending': len(self._pending)}
@@ -0,0 +1,96 @@
+# utils/static_assets.py
+# Serves the built frontend (see build_static.py). The build writes content-hashed, minified bundles with
+# .gz/.br variants and a manifest to frontend/dist. Hashed files never change, so they are cached for a year;
+# the variant matching Accept-Encoding is sent as is (nothing is compressed per request).
+# Without a build, or when the sources changed after it, files are served from the frontend folder as before.
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+from flask import Request, Response, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+MANIFEST_NAME = 'manifest.json'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz')) # Preference order
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+def source_hashes(source_folder: str, names) -> Dict[str, Optional[str]]:
+    """Content hash of each source file (None if missing); the build records these to detect a stale dist."""
+    hashes = {}
+    for name in names:
+        try:
+            with open(os.path.join(source_folder, name), 'rb') as f:
+                hashes[name] = content_hash(f.read())
+        except FileNotFoundError:
+            hashes[name] = None
+    return hashes
+
+
+class StaticAssets:
+    def __init__(self, source_folder: str, dist_folder: Optional[str] = None):
+        self.source_folder = source_folder
+        self.dist_folder = None
+        self.assets: Dict[str, str] = {} # Logical name -> hashed name (e.g. js/app.js -> js/app.3f2a9c1d0b.js)
+        self._hashed = frozenset()
+        self._variants: Dict[str, Tuple[Tuple[str, str], ...]] = {} # Built file -> available (encoding, suffix)
+        if dist_folder:
+            self._load(dist_folder)
+
+    def _load(self, dist_folder: str):
+        try:
+            with open(os.path.join(dist_folder, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return # Not built: serve the sources
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable asset manifest in {dist_folder}: {e}")
+            return
+        sources = manifest.get('sources', {})
+        stale = [name for name, digest in source_hashes(self.source_folder, sources).items() if digest != sources[name]]
+        if stale:
+            print(f"Warning: {', '.join(sorted(stale))} changed since the last build_static.py run; serving unbuilt files.")
+            return
+        self.dist_folder = dist_folder
+        self.assets = manifest.get('assets', {})
+        self._hashed = frozenset(self.assets.values())
+        print(f"Serving built frontend from {dist_folder} ({len(self.assets)} hashed assets)")
+
+    @property
+    def built(self) -> bool:
+        return self.dist_folder is not None
+
+    def path(self, filename: str) -> Optional[str]:
+        """Filesystem path of a frontend file: the built version if there is one, else the source."""
+        if self.dist_folder:
+            path = safe_join(self.dist_folder, filename)
+            if path and os.path.isfile(path):
+                return path
+        return safe_join(self.source_folder, filename)
+
+    def send(self, filename: str, request: Request) -> Response:
+        """Response for a frontend file: the built (precompressed) version if there is one, else the source."""
+        if self.dist_folder:
+            path = safe_join(self.dist_folder, filename)
+            if path and os.path.isfile(path):
+                return self._send_built(path, filename, request)
+        return send_from_directory(self.source_folder, filename)
+
+    def _send_built(self, path: str, filename: str, request: Request) -> Response:
+        variants = self._variants.get(path)
+        if variants is None: # Build output doesn't change while we run, so look once
+            variants = self._variants[path] = tuple((encoding, suffix) for encoding, suffix in ENCODINGS
+                                                    if os.path.isfile(path + suffix))
+        encoding, suffix = next(((enc, suf) for enc, suf in variants if request.accept_encodings[enc]), (None, ''))
+        response = send_file(path + suffix, mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                             conditional=True, etag=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if variants:
+            response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE if filename in self._hashed else REVALIDATE
+        return response
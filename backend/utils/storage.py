@@ -0,0 +1,1043 @@
+# utils/storage.py
+# Storage backends for candidates, votes, voter sessions and election status.
+# JSONStorage keeps the original flat files in DATA_FOLDER; SQLiteStorage keeps everything
+# in one WAL-mode database so several WSGI workers can share state safely.
+# The backend is chosen with Config.STORAGE_BACKEND ('json' or 'sqlite').
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Any, Dict, Optional, Set, Tuple, Iterator
+from config import Config
+try:
+    import fcntl # Cross-process lock for the vote and session journals (POSIX only)
+except ImportError:
+    fcntl = None
+from models import (Vote, VotesData, ResultsTally, encode_votes, decode_votes, iter_ballot_selections,
+                    read_ballot_header, read_ballot_voter_ids, BALLOT_HEADER_SIZE)
+from utils.metrics import STORAGE_DURATION, count_io
+
+# --- Constants ---
+DATA_DIR = Config.DATA_FOLDER
+CANDIDATES_FILE = os.path.join(DATA_DIR, 'candidates.json')
+VOTES_FILE = os.path.join(DATA_DIR, 'votes.json')
+ELECTION_STATUS_FILE = os.path.join(DATA_DIR, 'election_status.json')
+SESSIONS_FILE = os.path.join(DATA_DIR, 'voter_sessions.json')
+SESSIONS_JOURNAL_FILE = os.path.join(DATA_DIR, 'voter_sessions_journal.ndjson') # Session changes since the last compaction
+VOTES_JOURNAL_FILE = os.path.join(DATA_DIR, 'votes_journal.ndjson') # One ballot per line, appended on submit
+SNAPSHOT_MARKER = 'snapshot_ballots' # First journal line after a snapshot: {"snapshot_ballots": <ballots in it>}
+VOTES_JOURNAL_PREVIOUS_FILE = os.path.join(DATA_DIR, 'votes_journal.prev.ndjson') # The journal the last snapshot folded
+VOTES_SNAPSHOT_INTERVAL = Config.VOTES_SNAPSHOT_INTERVAL # Fold the journal into votes.json every N appends
+VOTES_BINARY_FILE = os.path.join(DATA_DIR, 'votes.bin') # Compact ballot snapshot (see models.encode_votes)
+VOTES_SNAPSHOT_FORMAT = (Config.VOTES_SNAPSHOT_FORMAT or 'json').lower() # 'json' or 'binary'
+
+# --- Helper Functions for File I/O ---
+def _load_json_file(filepath: str, default_data: Any) -> Any:
+    """Loads data from a JSON file. Returns default_data if file not found or invalid."""
+    try:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+            count_io('read', filepath, os.fstat(f.fileno()).st_size)
+            return data
+    except FileNotFoundError:
+        print(f"Warning: File {filepath} not found. Using default data.")
+        return default_data
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON from {filepath}: {e}. Using default data.")
+        return default_data
+
+def _save_json_file(filepath: str, data: Any, indent: int = 4) -> bool:
+    """Saves data to a JSON file."""
+    try:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        # Write to a temp file and swap it in so a crash never leaves a half-written file
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=indent, default=str) # Use indent for readability
+            count_io('write', filepath, f.tell())
+        os.replace(tmp_path, filepath)
+        return True
+    except Exception as e:
+        print(f"Error saving data to {filepath}: {e}")
+        return False
+
+def _save_binary_file(filepath: str, data: bytes) -> bool:
+    """Saves bytes to a file via a temp file, like _save_json_file."""
+    try:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        count_io('write', filepath, len(data))
+        os.replace(tmp_path, filepath)
+        return True
+    except Exception as e:
+        print(f"Error saving data to {filepath}: {e}")
+        return False
+
+def file_version(filepath: str) -> Optional[Tuple[int, int]]:
+    """Cheap change token for a file: (mtime in ns, size), or None if it does not exist."""
+    try:
+        st = os.stat(filepath)
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+def _votes_from_dict(data: Any) -> VotesData:
+    """Builds VotesData from the votes.json structure, skipping invalid ballots."""
+    if isinstance(data, dict) and 'votes' in data and 'voter_ids' in data:
+        # Ensure votes are Vote objects
+        votes = []
+        for vote_data in data.get('votes', []):
+            if isinstance(vote_data, dict):
+                try:
+                    votes.append(Vote(**vote_data))
+                except TypeError as e: # Catch specific error for argument mismatch
+                    print(f"Warning: Skipping invalid vote data due to TypeError: {e}. Data: {vote_data}")
+                except Exception as e: # Catch other potential errors in Vote construction
+                     print(f"Warning: Skipping invalid vote data due to unexpected error: {e}. Data: {vote_data}")
+        return VotesData(voter_ids=data['voter_ids'], votes=votes)
+    else:
+        print("Warning: Votes data has unexpected structure. Returning empty VotesData.")
+        return VotesData(voter_ids=[], votes=[])
+
+
+class StorageBackend:
+    """Interface shared by all storage backends. Records are plain dicts (or Vote/VotesData for ballots)."""
+
+    def data_version(self, name: str) -> Any:
+        """
+        Cheap token that changes whenever the named data set ('candidates', 'election_status', 'votes', 'sessions')
+        is written, by this process or another one. Used to revalidate in-memory caches.
+        """
+        raise NotImplementedError
+
+    # --- Candidates ---
+    def load_candidates(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def next_candidate_id(self) -> int:
+        raise NotImplementedError
+
+    def insert_candidate(self, candidate_data: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def delete_candidate(self, candidate_id: int) -> Optional[bool]:
+        """Returns True if removed, False if not found, None if the write failed."""
+        raise NotImplementedError
+
+    # --- Votes ---
+    def load_votes(self) -> VotesData:
+        raise NotImplementedError
+
+    def iter_votes(self) -> Iterator[Vote]:
+        """Yields recorded ballots in order (exports stream from this instead of holding a VotesData)."""
+        yield from self.load_votes().votes
+
+    def append_vote(self, vote: Vote) -> bool:
+        raise NotImplementedError
+
+    def save_votes(self, votes_data: VotesData) -> bool:
+        raise NotImplementedError
+
+    def snapshot_votes(self) -> bool:
+        """Brings the vote snapshot up to date."""
+        raise NotImplementedError
+
+    def export_votes_json(self) -> bool:
+        """Writes an up-to-date votes.json (the export format)."""
+        return _save_json_file(VOTES_FILE, self.load_votes().to_dict())
+
+    def has_voted(self, voter_id: str) -> bool:
+        """Constant-time check whether a ballot from voter_id has been recorded (by any worker)."""
+        raise NotImplementedError
+
+    def get_tally(self) -> ResultsTally:
+        """
+        Per-candidate council/executive counts over all recorded ballots (by any worker).
+        Maintained incrementally; returns a copy the caller may keep.
+        """
+        raise NotImplementedError
+
+    def rebuild_ballot_index(self):
+        """Rebuilds the in-memory has-voted index and results tally from the vote store."""
+        raise NotImplementedError
+
+    # --- Election status ---
+    def load_election_status(self) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save_election_status(self, status_data: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    # --- Voter sessions ---
+    def load_sessions(self) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def delete_session(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def apply_session_changes(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        """Writes a batch of session changes at once: session_id -> data, or None to delete."""
+        ok = True
+        for session_id, session_data in changes.items():
+            if session_data is None:
+                self.delete_session(session_id)
+            else:
+                ok = self.put_session(session_id, session_data) and ok
+        return ok
+
+    def session_changes(self, since: Any) -> Tuple[Any, Optional[Set[str]]]:
+        """
+        (token, ids of the sessions written since the `since` token, by any worker). The ids are None when the
+        backend can't tell (no token yet, or the changes were compacted away); callers then drop what they cached.
+        """
+        return None, None
+
+    def compact_sessions(self) -> bool:
+        """Reclaims space left by changed and deleted sessions, if the backend needs it."""
+        return True
+
+
+class JSONStorage(StorageBackend):
+    """The original flat JSON files, plus the append-only vote journal."""
+
+    def __init__(self):
+        self._votes_lock = threading.Lock() # Serializes journal writes between threads of this process
+        self._appends_since_snapshot = 0
+        self._sessions_lock = threading.Lock()
+        self._sessions = None # Loaded on first use, see _sync_sessions()
+        self._sessions_snapshot = None
+        self._sessions_offset = 0
+        self._ballot_index_lock = threading.Lock()
+        self._voter_ids = None # Built on first use, see _sync_ballot_index()
+        self._tally = None
+        self._ballot_index_snapshot = None
+        self._journal_offset = 0
+
+    _VERSION_FILES = {
+        'candidates': (CANDIDATES_FILE,),
+        'election_status': (ELECTION_STATUS_FILE,),
+        'votes': (VOTES_FILE, VOTES_BINARY_FILE, VOTES_JOURNAL_FILE),
+        'sessions': (SESSIONS_FILE, SESSIONS_JOURNAL_FILE),
+    }
+
+    def data_version(self, name: str) -> Any:
+        return tuple(file_version(path) for path in self._VERSION_FILES[name])
+
+    # --- Candidates ---
+    def _load_candidate_list(self) -> List[Any]:
+        data = _load_json_file(CANDIDATES_FILE, [])
+        if not isinstance(data, list):
+            print(f"Warning: Candidates data is not a list. Returning empty list.")
+            return []
+        return data
+
+    def load_candidates(self) -> List[Dict[str, Any]]:
+        return self._load_candidate_list()
+
+    def next_candidate_id(self) -> int:
+        ids = [item.get('id', 0) for item in self._load_candidate_list() if isinstance(item, dict)]
+        return max(ids) + 1 if ids else 1
+
+    def insert_candidate(self, candidate_data: Dict[str, Any]) -> bool:
+        data = self._load_candidate_list()
+        data.append(candidate_data)
+        return _save_json_file(CANDIDATES_FILE, data)
+
+    def delete_candidate(self, candidate_id: int) -> Optional[bool]:
+        data = self._load_candidate_list()
+        remaining = [item for item in data if not (isinstance(item, dict) and item.get('id') == candidate_id)]
+        if len(remaining) == len(data):
+            return False
+        return True if _save_json_file(CANDIDATES_FILE, remaining) else None
+
+    # --- Votes ---
+    # The snapshot is votes.json, or votes.bin when VOTES_SNAPSHOT_FORMAT is 'binary' (votes.json is then
+    # only written for export). New ballots are appended to VOTES_JOURNAL_FILE (one JSON record per line,
+    # fsynced) and replayed on top of the snapshot when loading. Writing a snapshot keeps a copy of the journal
+    # it folded (VOTES_JOURNAL_PREVIOUS_FILE, for workers' ballot indexes that hadn't read all of it yet), then
+    # empties the journal down to one SNAPSHOT_MARKER line with the snapshot's ballot count.
+    @staticmethod
+    def _snapshot_version() -> Any:
+        return (file_version(VOTES_FILE), file_version(VOTES_BINARY_FILE))
+
+    def _load_votes_snapshot(self) -> VotesData:
+        if VOTES_SNAPSHOT_FORMAT == 'binary' and os.path.exists(VOTES_BINARY_FILE):
+            try:
+                with open(VOTES_BINARY_FILE, 'rb') as f:
+                    data = f.read()
+                count_io('read', VOTES_BINARY_FILE, len(data))
+                return decode_votes(data)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Error decoding ballots from {VOTES_BINARY_FILE}: {e}. Using empty VotesData.")
+                return VotesData(voter_ids=[], votes=[])
+        # JSON format, or binary format before the first binary snapshot has been written
+        return _votes_from_dict(_load_json_file(VOTES_FILE, {"voter_ids": [], "votes": []}))
+
+    def _load_ballot_index_snapshot(self) -> Tuple[List[str], List[Tuple[List[int], List[int]]]]:
+        """
+        voter_ids and per-ballot (council, executive) selections of the snapshot. From votes.bin only those
+        parts are decoded; the ballots' ids, names, emails and timestamps are skipped.
+        """
+        if VOTES_SNAPSHOT_FORMAT == 'binary' and os.path.exists(VOTES_BINARY_FILE):
+            try:
+                with open(VOTES_BINARY_FILE, 'rb') as f:
+                    data = f.read()
+                count_io('read', VOTES_BINARY_FILE, len(data))
+                return read_ballot_voter_ids(data), list(iter_ballot_selections(data))
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Error decoding ballots from {VOTES_BINARY_FILE}: {e}. Using empty ballot index.")
+                return [], []
+        snapshot = self._load_votes_snapshot()
+        return snapshot.voter_ids, [(vote.selected_candidates, vote.executive_candidates) for vote in snapshot.votes]
+
+    @staticmethod
+    @contextmanager
+    def _locked_journal(filepath: str, lock: threading.Lock):
+        """Opens a journal file for appending while holding the thread and file locks."""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with lock:
+            with open(filepath, 'a+') as f:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX) # Other WSGI workers wait here
+                try:
+                    yield f
+                finally:
+                    if fcntl:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _locked_votes_journal(self):
+        return self._locked_journal(VOTES_JOURNAL_FILE, self._votes_lock)
+
+    @staticmethod
+    def _terminate_torn_line(journal, record: str) -> str:
+        """Prefixes a newline if a crash left the journal's last line unterminated."""
+        end = journal.seek(0, os.SEEK_END)
+        if end:
+            journal.seek(end - 1)
+            if journal.read(1) != '\n':
+                return '\n' + record
+        return record
+
+    def _read_votes_journal(self) -> List[Dict]:
+        """Reads all ballot records from the vote journal, skipping unreadable lines."""
+        records = []
+        try:
+            with open(VOTES_JOURNAL_FILE, 'r') as f:
+                count_io('read', VOTES_JOURNAL_FILE, os.fstat(f.fileno()).st_size)
+                for line_no, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        # A torn final line after a crash is expected; anything else is worth a warning too
+                        print(f"Warning: Skipping unreadable line {line_no} in {VOTES_JOURNAL_FILE}: {e}")
+        except FileNotFoundError:
+            pass # No ballots since the last snapshot
+        return records
+
+    @staticmethod
+    def _read_snapshot_marker() -> Tuple[Optional[int], int]:
+        """(ballot count, line length) of the journal's SNAPSHOT_MARKER line; (None, 0) if it doesn't start with one."""
+        try:
+            with open(VOTES_JOURNAL_FILE, 'rb') as f:
+                line = f.readline(256)
+        except FileNotFoundError:
+            return None, 0
+        try:
+            record = json.loads(line) if line.endswith(b'\n') else None
+        except ValueError:
+            record = None
+        count = record.get(SNAPSHOT_MARKER) if isinstance(record, dict) else None
+        return (count, len(line)) if isinstance(count, int) else (None, 0)
+
+    def _replay_votes_journal(self, votes_data: VotesData) -> VotesData:
+        """Applies journaled ballots on top of a snapshot. Ballots already in the snapshot are skipped."""
+        seen_vote_ids = {vote.id for vote in votes_data.votes}
+        known_voter_ids = set(votes_data.voter_ids)
+        for vote_data in self._read_votes_journal():
+            if not isinstance(vote_data, dict) or SNAPSHOT_MARKER in vote_data or vote_data.get('id') in seen_vote_ids:
+                continue
+            try:
+                vote = Vote(**vote_data)
+            except TypeError as e:
+                print(f"Warning: Skipping invalid journaled vote due to TypeError: {e}. Data: {vote_data}")
+                continue
+            votes_data.votes.append(vote)
+            seen_vote_ids.add(vote.id)
+            if vote.voter_id not in known_voter_ids:
+                votes_data.voter_ids.append(vote.voter_id)
+                known_voter_ids.add(vote.voter_id)
+        return votes_data
+
+    def load_votes(self) -> VotesData:
+        return self._replay_votes_journal(self._load_votes_snapshot())
+
+    def _write_votes_snapshot(self, votes_data: VotesData, journal) -> bool:
+        """Writes the snapshot and empties the journal. Caller must hold the journal lock."""
+        journal.seek(0)
+        if not _save_binary_file(VOTES_JOURNAL_PREVIOUS_FILE, journal.read().encode('utf-8')): # Before the snapshot
+            return False
+        if VOTES_SNAPSHOT_FORMAT == 'binary':
+            saved = _save_binary_file(VOTES_BINARY_FILE, encode_votes(votes_data))
+        else:
+            saved = _save_json_file(VOTES_FILE, votes_data.to_dict())
+        if not saved:
+            return False
+        # Only drop the journal once the snapshot holding its ballots is safely on disk
+        journal.truncate(0)
+        journal.write(json.dumps({SNAPSHOT_MARKER: len(votes_data.votes)}) + '\n')
+        journal.flush()
+        os.fsync(journal.fileno())
+        self._appends_since_snapshot = 0
+        return True
+
+    def save_votes(self, votes_data: VotesData) -> bool:
+        try:
+            with self._locked_votes_journal() as journal:
+                return self._write_votes_snapshot(votes_data, journal)
+        except Exception as e:
+            print(f"Error saving votes: {e}")
+            return False
+
+    def snapshot_votes(self) -> bool:
+        """Folds the vote journal into the snapshot. Does nothing if no ballot was journaled since the last one."""
+        try:
+            with self._locked_votes_journal() as journal:
+                _, marker_size = self._read_snapshot_marker()
+                if os.path.getsize(VOTES_JOURNAL_FILE) <= marker_size:
+                    return True # No ballots since the last snapshot
+                return self._write_votes_snapshot(self.load_votes(), journal)
+        except Exception as e:
+            print(f"Error writing votes snapshot: {e}")
+            return False
+
+    def export_votes_json(self) -> bool:
+        if not self.snapshot_votes():
+            return False
+        if VOTES_SNAPSHOT_FORMAT == 'binary':
+            return super().export_votes_json()
+        return True # votes.json is the snapshot itself
+
+    def append_vote(self, vote: Vote) -> bool:
+        """Appends a single ballot to the vote journal and fsyncs it. Refuses a second ballot from the same voter."""
+        record = json.dumps(vote.to_dict(), separators=(',', ':'))
+        try:
+            with self._locked_votes_journal() as journal:
+                # Checked under the journal lock, so two workers can't both accept a ballot from one voter
+                if self.has_voted(vote.voter_id):
+                    print(f"Error appending vote: voter {vote.voter_id} already has a ballot")
+                    return False
+                # Terminate a torn line left by a crash so this ballot stays readable
+                record = self._terminate_torn_line(journal, record + '\n')
+                journal.write(record)
+                journal.flush()
+                count_io('write', VOTES_JOURNAL_FILE, len(record.encode('utf-8')))
+                os.fsync(journal.fileno())
+                self.get_tally() # Fold the new ballot into the index/tally now rather than on the next read
+                self._appends_since_snapshot += 1
+                snapshot_due = VOTES_SNAPSHOT_INTERVAL and self._appends_since_snapshot >= VOTES_SNAPSHOT_INTERVAL
+        except Exception as e:
+            print(f"Error appending vote to journal: {e}")
+            return False
+        if snapshot_due:
+            self.snapshot_votes() # The ballot is already durable; a failed snapshot is retried next time
+        return True
+
+    # --- Ballot index: has-voted set and results tally ---
+    # voter_ids and per-candidate counts from the snapshot plus the journal. Each sync only reads journal
+    # bytes appended since the previous one (by any worker). A new snapshot is a fold of ballots the index
+    # holds already, apart from the end of the journal it had not read yet: that is read from the copy kept
+    # in VOTES_JOURNAL_PREVIOUS_FILE, and the index carries on with the new journal from its start. It is
+    # rebuilt from the snapshot only if its ballot count then differs from the snapshot's (e.g. it missed
+    # two snapshots, or the votes were replaced).
+    def _rebuild_ballot_index(self):
+        """Caller must hold _ballot_index_lock."""
+        for _ in range(3): # Retry if a snapshot lands while we read
+            snapshot_version = self._snapshot_version()
+            snapshot_voter_ids, selections = self._load_ballot_index_snapshot()
+            voter_ids = set(snapshot_voter_ids)
+            tally = ResultsTally()
+            for selected, executive in selections:
+                tally.add_ballot(selected, executive)
+            if self._snapshot_version() == snapshot_version:
+                break
+        self._voter_ids = voter_ids
+        self._tally = tally
+        self._ballot_index_snapshot = snapshot_version
+        self._journal_offset = 0
+
+    def _snapshot_ballot_count(self) -> Optional[int]:
+        """Ballots in the current snapshot: from the votes.bin header, else the journal's SNAPSHOT_MARKER line."""
+        if VOTES_SNAPSHOT_FORMAT == 'binary' and os.path.exists(VOTES_BINARY_FILE):
+            try:
+                with open(VOTES_BINARY_FILE, 'rb') as f:
+                    return read_ballot_header(f.read(BALLOT_HEADER_SIZE))[2]
+            except (OSError, ValueError, struct.error):
+                return None
+        return self._read_snapshot_marker()[0]
+
+    def _sync_ballot_index(self):
+        """Caller must hold _ballot_index_lock."""
+        try:
+            journal_size = os.path.getsize(VOTES_JOURNAL_FILE)
+        except FileNotFoundError:
+            journal_size = 0
+        if self._voter_ids is None:
+            self._rebuild_ballot_index()
+        else:
+            snapshot_version = self._snapshot_version()
+            if snapshot_version != self._ballot_index_snapshot or journal_size < self._journal_offset:
+                # Journal was folded into a new snapshot (by any worker): finish the folded journal, then re-base
+                self._index_journal(VOTES_JOURNAL_PREVIOUS_FILE, self._journal_offset, None)
+                if self._snapshot_ballot_count() == self._tally.vote_count:
+                    self._ballot_index_snapshot = snapshot_version
+                    self._journal_offset = 0 # Ballots still in the journal are skipped by voter id
+                else:
+                    self._rebuild_ballot_index() # It has ballots this index never saw (or was replaced)
+        if journal_size > self._journal_offset:
+            self._journal_offset += self._index_journal(VOTES_JOURNAL_FILE, self._journal_offset, journal_size)
+
+    def _index_journal(self, path: str, start: int, end: Optional[int]) -> int:
+        """
+        Adds the ballots in bytes start..end (None: to the end) of a journal file to the index.
+        Returns the number of bytes consumed (complete lines only). Caller must hold _ballot_index_lock.
+        """
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                chunk = f.read() if end is None else f.read(end - start)
+        except FileNotFoundError:
+            return 0
+        count_io('read', path, len(chunk))
+        complete = chunk.rfind(b'\n') + 1 # A line still being written is picked up next time
+        for line in chunk[:complete].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # Torn line, already reported by _read_votes_journal()
+            if not isinstance(record, dict) or not record.get('voter_id'):
+                continue
+            if record['voter_id'] in self._voter_ids:
+                continue # Already in the snapshot (journal not yet truncated after a snapshot)
+            self._voter_ids.add(record['voter_id'])
+            self._tally.add_ballot(record.get('selected_candidates', []), record.get('executive_candidates', []))
+        return complete
+
+    def has_voted(self, voter_id: str) -> bool:
+        with self._ballot_index_lock:
+            self._sync_ballot_index()
+            return voter_id in self._voter_ids
+
+    def get_tally(self) -> ResultsTally:
+        with self._ballot_index_lock:
+            self._sync_ballot_index()
+            return self._tally.copy()
+
+    def rebuild_ballot_index(self):
+        with self._ballot_index_lock:
+            self._rebuild_ballot_index()
+            self._sync_ballot_index()
+
+    # --- Election status ---
+    def load_election_status(self) -> Optional[Dict[str, Any]]:
+        return _load_json_file(ELECTION_STATUS_FILE, {"is_open": True}) # Default to open
+
+    def save_election_status(self, status_data: Dict[str, Any]) -> bool:
+        return _save_json_file(ELECTION_STATUS_FILE, status_data)
+
+    # --- Voter sessions ---
+    # voter_sessions.json is a snapshot; changes are appended to SESSIONS_JOURNAL_FILE as {"id", "data"} lines
+    # (data null = deleted), so a login or logout is one short write however many sessions exist.
+    # compact_sessions() folds the journal back into the snapshot. Changes made by other workers are picked
+    # up by reading only the journal bytes appended since the last sync.
+    def _load_sessions_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        data = _load_json_file(SESSIONS_FILE, {})
+        if not isinstance(data, dict):
+            print(f"Warning: {SESSIONS_FILE} does not contain an object. Initializing empty sessions.")
+            return {}
+        return data
+
+    @staticmethod
+    def _session_records(chunk: bytes) -> Iterator[Dict[str, Any]]:
+        for line in chunk.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # Torn line after a crash
+            if isinstance(record, dict) and record.get('id'):
+                yield record
+
+    def _sync_sessions(self):
+        """Caller must hold _sessions_lock."""
+        snapshot_version = file_version(SESSIONS_FILE)
+        try:
+            journal_size = os.path.getsize(SESSIONS_JOURNAL_FILE)
+        except FileNotFoundError:
+            journal_size = 0
+        if (self._sessions is None or snapshot_version != self._sessions_snapshot
+                or journal_size < self._sessions_offset): # Journal was compacted into a new snapshot
+            self._sessions = self._load_sessions_snapshot()
+            self._sessions_snapshot = snapshot_version
+            self._sessions_offset = 0
+        if journal_size > self._sessions_offset:
+            with open(SESSIONS_JOURNAL_FILE, 'rb') as f:
+                f.seek(self._sessions_offset)
+                chunk = f.read(journal_size - self._sessions_offset)
+            count_io('read', SESSIONS_JOURNAL_FILE, len(chunk))
+            complete = chunk.rfind(b'\n') + 1 # A line still being written is picked up next time
+            for record in self._session_records(chunk[:complete]):
+                if record.get('data') is None:
+                    self._sessions.pop(record['id'], None)
+                else:
+                    self._sessions[record['id']] = record['data']
+            self._sessions_offset += complete
+
+    def load_sessions(self) -> Dict[str, Dict[str, Any]]:
+        with self._sessions_lock:
+            self._sync_sessions()
+            return dict(self._sessions)
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._sessions_lock:
+            self._sync_sessions()
+            return self._sessions.get(session_id)
+
+    def put_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
+        return self.apply_session_changes({session_id: session_data})
+
+    def delete_session(self, session_id: str) -> bool:
+        if self.get_session(session_id) is None:
+            return False
+        return self.apply_session_changes({session_id: None})
+
+    def apply_session_changes(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        if not changes:
+            return True
+        records = ''.join(json.dumps({'id': session_id, 'data': session_data}, separators=(',', ':'), default=str) + '\n'
+                          for session_id, session_data in changes.items())
+        try:
+            with self._locked_journal(SESSIONS_JOURNAL_FILE, self._sessions_lock) as journal:
+                self._sync_sessions() # Apply other workers' changes first so ours win
+                records = self._terminate_torn_line(journal, records)
+                journal.write(records)
+                journal.flush()
+                count_io('write', SESSIONS_JOURNAL_FILE, len(records.encode('utf-8')))
+                for session_id, session_data in changes.items():
+                    if session_data is None:
+                        self._sessions.pop(session_id, None)
+                    else:
+                        self._sessions[session_id] = session_data
+                self._sessions_offset = os.fstat(journal.fileno()).st_size
+            return True
+        except Exception as e:
+            print(f"Error saving voter sessions to {SESSIONS_JOURNAL_FILE}: {e}")
+            return False
+
+    def session_changes(self, since: Any) -> Tuple[Any, Optional[Set[str]]]:
+        """The token is (snapshot version, journal offset): the ids are those in the journal lines after the offset."""
+        snapshot_version = file_version(SESSIONS_FILE)
+        journal_size = (file_version(SESSIONS_JOURNAL_FILE) or (0, 0))[1]
+        start = since[1] if isinstance(since, tuple) and since[0] == snapshot_version else None
+        if start is None or start > journal_size: # Compacted since: the journal no longer has those changes
+            return (snapshot_version, journal_size), None
+        chunk = b''
+        if journal_size > start:
+            with open(SESSIONS_JOURNAL_FILE, 'rb') as f:
+                f.seek(start)
+                chunk = f.read(journal_size - start)
+            count_io('read', SESSIONS_JOURNAL_FILE, len(chunk))
+        if file_version(SESSIONS_FILE) != snapshot_version: # Compacted while we read
+            return (file_version(SESSIONS_FILE), 0), None
+        complete = chunk.rfind(b'\n') + 1
+        return (snapshot_version, start + complete), {record['id'] for record in self._session_records(chunk[:complete])}
+
+    def compact_sessions(self) -> bool:
+        """Folds the session journal into voter_sessions.json. Does nothing if the journal is empty."""
+        try:
+            with self._locked_journal(SESSIONS_JOURNAL_FILE, self._sessions_lock) as journal:
+                if os.fstat(journal.fileno()).st_size == 0:
+                    return True
+                self._sync_sessions()
+                if not _save_json_file(SESSIONS_FILE, self._sessions, indent=2):
+                    return False
+                journal.truncate(0)
+                journal.flush()
+                self._sessions_snapshot = file_version(SESSIONS_FILE)
+                self._sessions_offset = 0
+                return True
+        except Exception as e:
+            print(f"Error compacting voter sessions: {e}")
+            return False
+
+
+class SQLiteStorage(StorageBackend):
+    """Single SQLite database in WAL mode. Each write touches only the affected row."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS votes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            voter_id TEXT NOT NULL,
+            selected_candidates TEXT NOT NULL,
+            executive_candidates TEXT NOT NULL,
+            timestamp TEXT,
+            voter_name TEXT NOT NULL DEFAULT '',
+            voter_email TEXT NOT NULL DEFAULT ''
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_votes_voter_id ON votes (voter_id);
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            user_id TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id);
+        CREATE TABLE IF NOT EXISTS session_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS election_status (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO data_versions (name) VALUES ('candidates'), ('election_status'), ('votes'), ('sessions');
+    """
+    # Every write to these tables bumps its counter in data_versions, whichever process made it
+    VERSIONED_TABLES = ('candidates', 'election_status', 'votes', 'sessions')
+    SESSION_CHANGES_KEPT = 10000 # compact_sessions() trims the session change feed to this many entries
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local() # sqlite3 connections must not be shared between threads
+        self._tally_lock = threading.Lock()
+        self._tally = None # Built on first use, see _sync_tally()
+        self._tally_seq = 0
+        self._tally_version = None
+        is_new = not os.path.exists(db_path)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        for table in self.VERSIONED_TABLES:
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version AFTER {event} ON {table} "
+                    f"BEGIN UPDATE data_versions SET version = version + 1 WHERE name = '{table}'; END")
+        # Which sessions each write touched, so other workers' session caches evict just those (session_changes())
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_sessions_{event.lower()}_change AFTER {event} ON sessions "
+                f"BEGIN INSERT INTO session_changes (session_id) VALUES ({row}.session_id); END")
+        if is_new:
+            self.import_from(JSONStorage())
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: autocommit, explicit BEGIN IMMEDIATE where several statements must agree
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL') # Ballots must survive a power cut
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def import_from(self, source: StorageBackend):
+        """Copies all records from another backend (used to seed a new database from the JSON files)."""
+        with self._transaction() as conn:
+            for item in source.load_candidates():
+                if isinstance(item, dict) and 'id' in item:
+                    conn.execute('INSERT OR REPLACE INTO candidates (id, data) VALUES (?, ?)',
+                                 (item['id'], json.dumps(item)))
+            for vote in source.load_votes().votes:
+                conn.execute('INSERT OR IGNORE INTO votes (id, voter_id, selected_candidates, executive_candidates, '
+                             'timestamp, voter_name, voter_email) VALUES (?, ?, ?, ?, ?, ?, ?)', self._vote_row(vote))
+            for session_id, session_data in source.load_sessions().items():
+                conn.execute('INSERT OR REPLACE INTO sessions (session_id, user_id, data) VALUES (?, ?, ?)',
+                             (session_id, session_data.get('user_id'), json.dumps(session_data, default=str)))
+            status_data = source.load_election_status()
+            if isinstance(status_data, dict):
+                conn.execute('INSERT OR REPLACE INTO election_status (id, data) VALUES (1, ?)',
+                             (json.dumps(status_data),))
+        print(f"Initialized SQLite storage at {self.db_path} from JSON data files.")
+
+    def data_version(self, name: str) -> Any:
+        row = self._conn().execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    # --- Candidates ---
+    def load_candidates(self) -> List[Dict[str, Any]]:
+        rows = self._conn().execute('SELECT data FROM candidates ORDER BY id').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def next_candidate_id(self) -> int:
+        return self._conn().execute('SELECT COALESCE(MAX(id), 0) + 1 FROM candidates').fetchone()[0]
+
+    def insert_candidate(self, candidate_data: Dict[str, Any]) -> bool:
+        try:
+            self._conn().execute('INSERT INTO candidates (id, data) VALUES (?, ?)',
+                                 (candidate_data['id'], json.dumps(candidate_data)))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error inserting candidate into {self.db_path}: {e}")
+            return False
+
+    def delete_candidate(self, candidate_id: int) -> Optional[bool]:
+        try:
+            cursor = self._conn().execute('DELETE FROM candidates WHERE id = ?', (candidate_id,))
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error deleting candidate from {self.db_path}: {e}")
+            return None
+
+    # --- Votes ---
+    @staticmethod
+    def _vote_row(vote: Vote) -> tuple:
+        return (vote.id, vote.voter_id, json.dumps(vote.selected_candidates), json.dumps(vote.executive_candidates),
+                vote.timestamp, vote.voter_name, vote.voter_email)
+
+    def load_votes(self) -> VotesData:
+        rows = self._conn().execute(
+            'SELECT id, voter_id, selected_candidates, executive_candidates, timestamp, voter_name, voter_email '
+            'FROM votes ORDER BY seq').fetchall()
+        votes = [Vote(id=row[0], voter_id=row[1], selected_candidates=json.loads(row[2]),
+                      executive_candidates=json.loads(row[3]), timestamp=row[4],
+                      voter_name=row[5], voter_email=row[6]) for row in rows]
+        return VotesData(voter_ids=[vote.voter_id for vote in votes], votes=votes)
+
+    def iter_votes(self, batch_size: int = 500) -> Iterator[Vote]:
+        cursor = self._conn().execute(
+            'SELECT id, voter_id, selected_candidates, executive_candidates, timestamp, voter_name, voter_email '
+            'FROM votes ORDER BY seq')
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield Vote(id=row[0], voter_id=row[1], selected_candidates=json.loads(row[2]),
+                               executive_candidates=json.loads(row[3]), timestamp=row[4],
+                               voter_name=row[5], voter_email=row[6])
+        finally:
+            cursor.close()
+
+    def append_vote(self, vote: Vote) -> bool:
+        try:
+            self._conn().execute(
+                'INSERT INTO votes (id, voter_id, selected_candidates, executive_candidates, timestamp, '
+                'voter_name, voter_email) VALUES (?, ?, ?, ?, ?, ?, ?)', self._vote_row(vote))
+            self.get_tally() # Fold the new ballot into the tally now rather than on the next read
+            return True
+        except sqlite3.IntegrityError as e:
+            print(f"Error appending vote: voter {vote.voter_id} already has a ballot ({e})")
+            return False
+        except sqlite3.Error as e:
+            print(f"Error appending vote to {self.db_path}: {e}")
+            return False
+
+    def save_votes(self, votes_data: VotesData) -> bool:
+        try:
+            with self._transaction() as conn:
+                conn.execute('DELETE FROM votes')
+                conn.executemany(
+                    'INSERT INTO votes (id, voter_id, selected_candidates, executive_candidates, timestamp, '
+                    'voter_name, voter_email) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [self._vote_row(vote) for vote in votes_data.votes])
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving votes to {self.db_path}: {e}")
+            return False
+
+    def has_voted(self, voter_id: str) -> bool:
+        # Served by the unique index on votes.voter_id
+        row = self._conn().execute('SELECT 1 FROM votes WHERE voter_id = ? LIMIT 1', (voter_id,)).fetchone()
+        return row is not None
+
+    def _sync_tally(self):
+        """Caller must hold _tally_lock. Reads only ballot rows added since the last sync."""
+        query = 'SELECT seq, selected_candidates, executive_candidates FROM votes WHERE seq > ? ORDER BY seq'
+        conn = self._conn()
+        conn.execute('BEGIN') # Version and rows from one consistent read snapshot
+        try:
+            version = conn.execute("SELECT version FROM data_versions WHERE name = 'votes'").fetchone()[0]
+            if self._tally is not None and version == self._tally_version:
+                return
+            incremental = self._tally is not None
+            rows = conn.execute(query, (self._tally_seq if incremental else 0,)).fetchall()
+            # The version counter moves once per row written. If it moved by more than the new rows we see,
+            # ballots were changed or removed (save_votes), so recount everything.
+            if incremental and version - self._tally_version != len(rows):
+                incremental = False
+                rows = conn.execute(query, (0,)).fetchall()
+        finally:
+            conn.execute('COMMIT')
+        if not incremental:
+            self._tally, self._tally_seq = ResultsTally(), 0
+        for seq, selected, executive in rows:
+            self._tally.add_ballot(json.loads(selected), json.loads(executive))
+            self._tally_seq = seq
+        self._tally_version = version
+
+    def get_tally(self) -> ResultsTally:
+        with self._tally_lock:
+            self._sync_tally()
+            return self._tally.copy()
+
+    def rebuild_ballot_index(self):
+        with self._tally_lock:
+            self._tally = None
+            self._tally_version = None
+            self._sync_tally()
+
+    def snapshot_votes(self) -> bool:
+        """Exports the ballots table to votes.json."""
+        return _save_json_file(VOTES_FILE, self.load_votes().to_dict())
+
+    # --- Election status ---
+    def load_election_status(self) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute('SELECT data FROM election_status WHERE id = 1').fetchone()
+        return json.loads(row[0]) if row else {"is_open": True} # Default to open, as with the JSON file
+
+    def save_election_status(self, status_data: Dict[str, Any]) -> bool:
+        try:
+            self._conn().execute('INSERT OR REPLACE INTO election_status (id, data) VALUES (1, ?)',
+                                 (json.dumps(status_data),))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving election status to {self.db_path}: {e}")
+            return False
+
+    # --- Voter sessions ---
+    def load_sessions(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._conn().execute('SELECT session_id, data FROM sessions').fetchall()
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute('SELECT data FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
+        try:
+            self._conn().execute('INSERT OR REPLACE INTO sessions (session_id, user_id, data) VALUES (?, ?, ?)',
+                                 (session_id, session_data.get('user_id'), json.dumps(session_data, default=str)))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving voter session to {self.db_path}: {e}")
+            return False
+
+    def delete_session(self, session_id: str) -> bool:
+        try:
+            cursor = self._conn().execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error deleting voter session from {self.db_path}: {e}")
+            return False
+
+    def apply_session_changes(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        if not changes:
+            return True
+        puts = [(session_id, session_data.get('user_id'), json.dumps(session_data, default=str))
+                for session_id, session_data in changes.items() if session_data is not None]
+        deletes = [(session_id,) for session_id, session_data in changes.items() if session_data is None]
+        try:
+            with self._transaction() as conn:
+                conn.executemany('INSERT OR REPLACE INTO sessions (session_id, user_id, data) VALUES (?, ?, ?)', puts)
+                conn.executemany('DELETE FROM sessions WHERE session_id = ?', deletes)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving voter sessions to {self.db_path}: {e}")
+            return False
+
+    def session_changes(self, since: Any) -> Tuple[Any, Optional[Set[str]]]:
+        """The token is the last seq of the session_changes feed."""
+        conn = self._conn()
+        latest, oldest = conn.execute('SELECT COALESCE(MAX(seq), 0), MIN(seq) FROM session_changes').fetchone()
+        if not isinstance(since, int) or since > latest or (oldest is not None and since < oldest - 1):
+            return latest, None # No token yet, a different database, or the entries were trimmed
+        rows = conn.execute('SELECT session_id FROM session_changes WHERE seq > ? AND seq <= ?',
+                            (since, latest)).fetchall()
+        return latest, {row[0] for row in rows}
+
+    def compact_sessions(self) -> bool:
+        """Trims the session change feed to its last SESSION_CHANGES_KEPT entries."""
+        try:
+            self._conn().execute('DELETE FROM session_changes WHERE seq <= (SELECT MAX(seq) FROM session_changes) - ?',
+                                 (self.SESSION_CHANGES_KEPT,))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error compacting voter session changes in {self.db_path}: {e}")
+            return False
+
+
+# --- Instrumentation ---
+class InstrumentedStorage:
+    """
+    Wraps a backend and times each public call into the storage duration histogram (see utils.metrics).
+    data_version() runs on every cached read and iter_votes() returns a generator, so both pass through untimed.
+    """
+    UNTIMED = frozenset({'data_version', 'iter_votes'})
+
+    def __init__(self, backend: StorageBackend, name: str):
+        self.backend = backend
+        self.name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self.backend, attr)
+        if attr.startswith('_') or attr in self.UNTIMED or not callable(value):
+            return value
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return value(*args, **kwargs)
+            finally:
+                STORAGE_DURATION.observe(time.perf_counter() - start, self.name, attr)
+        self.__dict__[attr] = timed # Later lookups skip __getattr__
+        return timed
+
+
+# --- Backend selection ---
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> StorageBackend:
+    """Returns the process-wide storage backend selected by Config.STORAGE_BACKEND."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            backend = (Config.STORAGE_BACKEND or 'json').lower()
+            if backend == 'sqlite':
+                _storage = InstrumentedStorage(SQLiteStorage(Config.SQLITE_DATABASE), backend)
+            elif backend == 'json':
+                _storage = InstrumentedStorage(JSONStorage(), backend)
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'. Use 'json' or 'sqlite'.")
+        return _storage
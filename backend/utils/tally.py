@@ -0,0 +1,122 @@
+# utils/tally.py
+# Vectorized tally engine for recounts, audits and what-if analyses.
+# Ballots are loaded once into dense boolean ballot x candidate matrices; counts, rankings and
+# tie detection are then single NumPy reductions instead of Python loops over every ballot.
+from typing import List, Dict, Any, Optional, Iterable
+import numpy as np
+from models import Candidate, Vote, ResultsTally
+
+
+class TallyEngine:
+    def __init__(self, votes: List[Vote], candidates: List[Candidate]):
+        self.candidates = sorted(candidates, key=lambda c: c.id)
+        self.candidate_ids = np.array([c.id for c in self.candidates], dtype=np.int64)
+        self.votes = votes
+        self.voter_ids = [vote.voter_id for vote in votes]
+        self.council = self._build_matrix([vote.selected_candidates for vote in votes])
+        self.executive = self._build_matrix([vote.executive_candidates for vote in votes])
+
+    def _build_matrix(self, selections: List[List[int]]) -> np.ndarray:
+        """ballots x candidates boolean matrix. Ids that are not current candidates are ignored."""
+        matrix = np.zeros((len(selections), len(self.candidate_ids)), dtype=bool)
+        lengths = np.fromiter((len(s) for s in selections), dtype=np.int64, count=len(selections))
+        if not lengths.sum() or not len(self.candidate_ids):
+            return matrix
+        rows = np.repeat(np.arange(len(selections)), lengths)
+        ids = np.fromiter((cid for s in selections for cid in s), dtype=np.int64, count=int(lengths.sum()))
+        # candidate_ids is sorted, so searchsorted maps ids to column numbers
+        cols = np.clip(np.searchsorted(self.candidate_ids, ids), 0, len(self.candidate_ids) - 1)
+        known = self.candidate_ids[cols] == ids
+        matrix[rows[known], cols[known]] = True
+        return matrix
+
+    @property
+    def ballot_count(self) -> int:
+        return self.council.shape[0]
+
+    def _ballot_weights(self, weights: Optional[Dict[str, float]], exclude_voters: Iterable[str]) -> np.ndarray:
+        """Per-ballot weights: 1.0 unless re-weighted by voter id; excluded voters get 0."""
+        w = np.ones(self.ballot_count, dtype=np.float64)
+        if weights or exclude_voters:
+            excluded = set(exclude_voters)
+            weights = weights or {}
+            w = np.array([0.0 if voter_id in excluded else float(weights.get(voter_id, 1.0))
+                          for voter_id in self.voter_ids], dtype=np.float64)
+        return w
+
+    def counts(self, weights: Optional[Dict[str, float]] = None, exclude_voters: Iterable[str] = ()):
+        """(council_counts, executive_counts) per candidate column, as float arrays (weights may be fractional)."""
+        w = self._ballot_weights(weights, exclude_voters)
+        return w @ self.council, w @ self.executive
+
+    def ranking(self, exclude_candidates: Iterable[int] = (), weights: Optional[Dict[str, float]] = None,
+                exclude_voters: Iterable[str] = (), seats: int = 15) -> Dict[str, Any]:
+        """
+        Candidates ranked by council then executive votes, with tie groups and whether a tie straddles
+        the last council seat. Excluded candidates are dropped from the ranking (their votes are not
+        redistributed, matching how ballots are counted).
+        """
+        council, executive = self.counts(weights, exclude_voters)
+        keep = ~np.isin(self.candidate_ids, np.fromiter(exclude_candidates, dtype=np.int64))
+        cols = np.nonzero(keep)[0]
+        # lexsort sorts by the last key first: council desc, then executive desc, then id asc
+        order = cols[np.lexsort((self.candidate_ids[cols], -executive[cols], -council[cols]))]
+        c_sorted, e_sorted = council[order], executive[order]
+        # A new rank starts wherever the (council, executive) pair differs from the previous row
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = (c_sorted[1:] != c_sorted[:-1]) | (e_sorted[1:] != e_sorted[:-1])
+        group_ids = np.cumsum(new_group) - 1
+        group_sizes = np.bincount(group_ids) if len(order) else np.array([], dtype=np.int64)
+        ranks = np.nonzero(new_group)[0][group_ids] + 1 # Competition ranking: 1, 2, 2, 4
+        results = [
+            {
+                'id': int(self.candidate_ids[col]),
+                'name': self.candidates[col].name,
+                'councilVotes': _number(c_sorted[i]),
+                'executiveVotes': _number(e_sorted[i]),
+                'rank': int(ranks[i]),
+                'tied': bool(group_sizes[group_ids[i]] > 1)
+            }
+            for i, col in enumerate(order)
+        ]
+        ties = [[int(self.candidate_ids[col]) for col in order[group_ids == g]]
+                for g in np.nonzero(group_sizes > 1)[0]]
+        seat_tie = bool(0 < seats < len(order) and group_ids[seats - 1] == group_ids[seats])
+        return {
+            'totalVotes': _number(self._ballot_weights(weights, exclude_voters).sum()),
+            'results': results,
+            'ties': ties,
+            'seatBoundaryTie': seat_tie
+        }
+
+    def verify(self, tally: Optional[ResultsTally] = None) -> Dict[str, Any]:
+        """
+        Cross-checks the vectorized counts against the original loop-based count over the Vote objects
+        and, if given, against the incrementally maintained ResultsTally.
+        """
+        council, executive = self.counts()
+        matrix_counts = {int(cid): (int(council[i]), int(executive[i])) for i, cid in enumerate(self.candidate_ids)}
+        # Same loop /api/results used to run on every request
+        loop_counts = {cid: [0, 0] for cid in matrix_counts}
+        for vote in self.votes:
+            for candidate_id in vote.selected_candidates:
+                if candidate_id in loop_counts:
+                    loop_counts[candidate_id][0] += 1
+            for candidate_id in vote.executive_candidates:
+                if candidate_id in loop_counts:
+                    loop_counts[candidate_id][1] += 1
+        mismatches = [cid for cid, counts in matrix_counts.items() if list(counts) != loop_counts[cid]]
+        report = {'ballots': self.ballot_count, 'matchesLoopTally': not mismatches, 'loopMismatches': mismatches}
+        if tally is not None:
+            tally_mismatches = [cid for cid, counts in matrix_counts.items()
+                                if counts != (tally.council_votes.get(cid, 0), tally.executive_votes.get(cid, 0))]
+            report['matchesMaintainedTally'] = not tally_mismatches and tally.vote_count == self.ballot_count
+            report['maintainedTallyMismatches'] = tally_mismatches
+            report['maintainedVoteCount'] = tally.vote_count
+        return report
+
+
+def _number(value) -> Any:
+    """JSON-friendly count: int when whole, float otherwise (re-weighted tallies)."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
@@ -0,0 +1,48 @@
+# utils/timing.py
+# Per-operation latency counters: call/error counts plus percentiles over a window of recent calls.
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+class LatencyRecorder:
+    def __init__(self, window: int = 1024):
+        self.window = window # Recent samples kept per operation for percentiles
+        self._lock = threading.Lock()
+        self._ops: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, elapsed_ms: float, error: bool = False):
+        with self._lock:
+            op = self._ops.get(name)
+            if op is None:
+                op = self._ops[name] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                        'samples': deque(maxlen=self.window)}
+            op['count'] += 1
+            op['errors'] += int(error)
+            op['total_ms'] += elapsed_ms
+            op['max_ms'] = max(op['max_ms'], elapsed_ms)
+            op['samples'].append(elapsed_ms)
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Times the block; an exception escaping it is counted as an error (and re-raised)."""
+        start = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, error)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            ops = {name: (op['count'], op['errors'], op['total_ms'], op['max_ms'], sorted(op['samples']))
+                   for name, op in self._ops.items()}
+        result = {}
+        for name, (count, errors, total_ms, max_ms, samples) in ops.items():
+            def pct(p: float) -> float:
+                return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+            result[name] = {'count': count, 'errors': errors, 'avgMs': round(total_ms / count, 2),
+                            'maxMs': round(max_ms, 2), 'p50Ms': pct(0.50), 'p95Ms': pct(0.95), 'p99Ms': pct(0.99)}
+        return result
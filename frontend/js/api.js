@@ -67,6 +67,18 @@ class ElectionAPI {
         return await response.json();
     }
 
+    // Session, language + translations, candidates and election status in one request (initial page load)
+    static async getBootstrap(lang) {
+        const query = lang ? `?lang=${encodeURIComponent(lang)}` : '';
+        const response = await fetch(`${API_BASE_URL}/bootstrap${query}`, {
+            credentials: 'include'
+        });
+        if (!response.ok) {
+            throw new Error(`Bootstrap request failed with status ${response.status}`);
+        }
+        return await response.json();
+    }
+
     static async getElectionStatus() {
         const response = await fetch(`${API_BASE_URL}/election/status`, {
              credentials: 'include' // Ensure session cookie is sent if needed
@@ -114,21 +114,23 @@ const AuthModule = {
             Utils.showMessage('auth.googleError', 'error');
         }
     },
+    // --- Apply a session payload ({authenticated, user}, from /api/auth/session or /api/bootstrap) ---
+    applySession: function (data) {
+        if (data && data.authenticated) {
+            window.State.currentUser = data.user;
+            console.log("User authenticated:", window.State.currentUser);
+            return true;
+        }
+        console.log("User is not authenticated.");
+        window.State.currentUser = null;
+        return false;
+    },
     // --- Check Auth Status ---
     checkAuthStatus: async function () {
         try {
             const response = await fetch('/api/auth/session', { credentials: 'include' });
             if (response.ok) {
-                const data = await response.json();
-                if (data.authenticated) {
-                    window.State.currentUser = data.user;
-                    console.log("User authenticated:", window.State.currentUser);
-                    return true;
-                } else {
-                    console.log("User is not authenticated.");
-                    window.State.currentUser = null;
-                    return false;
-                }
+                return this.applySession(await response.json());
             } else {
                 console.log(`Failed to fetch auth session. Status: ${response.status}`);
                 window.State.currentUser = null;
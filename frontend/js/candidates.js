@@ -1,26 +1,31 @@
 // candidates.js - Candidate data management and display logic
 const CandidatesModule = {
-    // --- Load Candidates from Backend ---
-    loadCandidates: async function () {
+    // --- Load Candidates from Backend (or use a list already fetched, e.g. by /api/bootstrap) ---
+    loadCandidates: async function (preloadedCandidates) {
         const candidateListElement = document.getElementById('candidateList');
         if (!candidateListElement) {
             console.error("Candidate list container (#candidateList) not found in the DOM.");
             return;
         }
-        // Use data-i18n for loading text
-        candidateListElement.innerHTML = '<div class="loader" data-i18n="loadingCandidates">Loading candidates...</div>';
+        // Use data-i18n for loading text (a preloaded list keeps the pre-rendered cards until they are replaced)
+        if (!Array.isArray(preloadedCandidates)) {
+            candidateListElement.innerHTML = '<div class="loader" data-i18n="loadingCandidates">Loading candidates...</div>';
 
-        // Apply translations for the loader
-        if (typeof I18nModule !== 'undefined' && typeof I18nModule.applyTranslations === 'function') {
-            I18nModule.applyTranslations();
+            // Apply translations for the loader
+            if (typeof I18nModule !== 'undefined' && typeof I18nModule.applyTranslations === 'function') {
+                I18nModule.applyTranslations();
+            }
         }
 
         try {
-            const response = await fetch('/api/candidates');
-            if (!response.ok) {
-                throw new Error(`Backend returned error ${response.status}: ${response.statusText}`);
+            let candidatesData = preloadedCandidates;
+            if (!Array.isArray(candidatesData)) {
+                const response = await fetch('/api/candidates');
+                if (!response.ok) {
+                    throw new Error(`Backend returned error ${response.status}: ${response.statusText}`);
+                }
+                candidatesData = await response.json();
             }
-            const candidatesData = await response.json();
             if (!Array.isArray(candidatesData)) {
                 throw new Error("Received candidate data is not in the expected array format.");
             }
@@ -86,7 +91,7 @@ const CandidatesModule = {
                         <i class="fas fa-info"></i>
                     </div>
                     <img src="${candidate.photo}" alt="${candidate.name}" class="candidate-image"
-                         onerror="this.src='https://via.placeholder.com/80x80/cccccc/666666?text=${candidate.name.charAt(0)}'">
+                         onerror="this.onerror=null; this.src=Utils.photoPlaceholder(this.alt)">
                     <div class="candidate-text-info">
                         <div class="candidate-name">${candidate.name}</div>
                         <div class="candidate-position">${candidate.field_of_activity || '<span data-i18n="common.n_a">N/A</span>'}</div>
@@ -196,7 +201,7 @@ const CandidatesModule = {
             // --- Updated Card Content ---
             infoCard.innerHTML = `
                 <img src="${candidate.photo}" alt="${candidate.name}" class="candidate-image"
-                     onerror="this.src='https://via.placeholder.com/80x80/cccccc/666666?text=${encodeURIComponent(candidate.name.charAt(0))}'">
+                     onerror="this.onerror=null; this.src=Utils.photoPlaceholder(this.alt)">
                 <div class="candidate-name">${candidate.name}</div>
                 <div class="candidate-position">${candidate.field_of_activity || '<span data-i18n="common.n_a">N/A</span>'}</div>
                 <div class="activity-indicator ${activityClass}" data-i18n="${activityTextKey}">Activity Level</div>
@@ -295,7 +300,7 @@ const CandidatesModule = {
 
             popupBody.innerHTML = `
             <div class="popup-header" style="text-align: center; margin-bottom: 20px;">
-                <img src="${candidate.photo}" alt="${candidate.name}" class="candidate-popup-image" style="width: 100px; height: 100px; border-radius: 50%; object-fit: cover; margin-bottom: 10px;" onerror="this.src='https://via.placeholder.com/100x100/cccccc/666666?text=${encodeURIComponent(candidate.name.charAt(0))}'">
+                <img src="${candidate.photo}" alt="${candidate.name}" class="candidate-popup-image" style="width: 100px; height: 100px; border-radius: 50%; object-fit: cover; margin-bottom: 10px;" onerror="this.onerror=null; this.src=Utils.photoPlaceholder(this.alt)">
                 <h2 style="margin: 0; color: var(--primary);">${candidate.name}</h2>
                 <p style="margin: 5px 0 0 0; font-size: 1.1em; color: var(--secondary);">${candidate.field_of_activity || '<span data-i18n="candidates.field.unspecified">Field of Activity Not Specified</span>'}</p>
                 <div class="activity-indicator ${activityClass}" data-i18n="${activityTextKey}" style="margin: 10px auto 0 auto; width: fit-content;">
@@ -15,17 +15,60 @@ document.addEventListener('DOMContentLoaded', async function () {
         authSkeletonShown = true;
         console.log("Initial auth skeleton screen shown.");
     }
-    // --- Language Initialization ---
+    // --- Bootstrap: session, language + translations, candidates and election status in one request ---
+    // Falls back to the individual endpoints below if it fails.
+    let savedLang = null;
+    try {
+        savedLang = localStorage.getItem('preferredLanguage');
+    } catch (e) {
+        console.warn('Could not read saved language preference:', e);
+    }
+    // The pre-rendered page embeds it (shared data plus this session), so usually no request is needed
+    let boot = null;
     try {
-        await I18nModule.fetchTranslations();
+        const sharedData = document.getElementById('bootstrapData');
+        const sessionData = document.getElementById('bootstrapSession');
+        if (sharedData && sessionData) {
+            boot = Object.assign(JSON.parse(sharedData.textContent), JSON.parse(sessionData.textContent));
+            if (savedLang && savedLang !== boot.language && boot.languages.includes(savedLang)) {
+                boot = null; // Rendered without knowing the saved choice (no cookie yet); fetch it instead
+            }
+        }
     } catch (error) {
-        console.error("Failed to fetch translations:", error);
-        // Decide how to handle translation loading failure
+        console.warn("Could not read the embedded bootstrap data:", error);
+        boot = null;
+    }
+    if (!boot) {
+        try {
+            boot = await ElectionAPI.getBootstrap(savedLang);
+        } catch (error) {
+            console.error("Bootstrap request failed, loading data separately:", error);
+        }
+    }
+    if (boot) {
+        translations = { [boot.language]: boot.translations };
+        console.log("Bootstrap data loaded for language:", boot.language);
+    }
+    // --- Language Initialization ---
+    if (!boot) {
+        try {
+            await I18nModule.fetchTranslations();
+        } catch (error) {
+            console.error("Failed to fetch translations:", error);
+            // Decide how to handle translation loading failure
+        }
     }
     let determinedLanguage = 'en';
     try {
-        const savedLang = localStorage.getItem('preferredLanguage');
-        if (savedLang && translations[savedLang]) {
+        if (boot) {
+            // The server honoured the saved choice if it could, else detected one
+            determinedLanguage = boot.language;
+            try {
+                I18nModule.saveLanguagePreference(determinedLanguage); // Also sets the cookie for older saved choices
+            } catch (e) {
+                console.warn('Could not save backend-determined language to localStorage:', e);
+            }
+        } else if (savedLang && translations[savedLang]) {
             console.log(`Using language from localStorage: ${savedLang}`);
             determinedLanguage = savedLang;
         } else {
@@ -38,7 +81,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                     console.log(`Using language determined by backend: ${backendLang}`);
                     determinedLanguage = backendLang;
                     try {
-                        localStorage.setItem('preferredLanguage', determinedLanguage);
+                        I18nModule.saveLanguagePreference(determinedLanguage);
                         console.log(`Saved backend-determined language (${determinedLanguage}) to localStorage.`);
                     } catch (e) {
                         console.warn('Could not save backend-determined language to localStorage:', e);
@@ -56,11 +99,12 @@ document.addEventListener('DOMContentLoaded', async function () {
     I18nModule.switchLanguage(currentLanguage);
     const langSwitcher = document.getElementById('languageSwitcher');
     if (langSwitcher) {
-        langSwitcher.addEventListener('click', () => {
+        langSwitcher.addEventListener('click', async () => {
             const otherLang = currentLanguage === 'en' ? 'ar' : 'en';
+            await I18nModule.ensureLanguage(otherLang); // Only the initial language came with the bootstrap
             I18nModule.switchLanguage(otherLang);
             try {
-                localStorage.setItem('preferredLanguage', otherLang);
+                I18nModule.saveLanguagePreference(otherLang);
                 console.log(`Saved manually chosen language (${otherLang}) to localStorage.`);
             } catch (e) {
                 console.warn('Could not save manually chosen language to localStorage:', e);
@@ -70,7 +114,7 @@ document.addEventListener('DOMContentLoaded', async function () {
     // --- Initialize App DOM Elements ---
     initDOMElements();
     // --- Start Loading Candidates (Independent of Auth) ---
-    const candidatesLoadPromise = CandidatesModule.loadCandidates().catch(err => {
+    const candidatesLoadPromise = CandidatesModule.loadCandidates(boot ? boot.candidates : undefined).catch(err => {
          console.error("Error loading candidates (initial):", err);
          // Handle candidate loading error if critical for initial display
     });
@@ -78,7 +122,7 @@ document.addEventListener('DOMContentLoaded', async function () {
     // This is the key check. We wait for it to complete.
     let isAuthenticated = false;
     try {
-        isAuthenticated = await AuthModule.checkAuthStatus();
+        isAuthenticated = boot ? AuthModule.applySession(boot) : await AuthModule.checkAuthStatus();
         console.log("Auth check completed. Is authenticated:", isAuthenticated);
     } catch (authErr) {
         console.error("Error during initial auth check:", authErr);
@@ -86,12 +130,12 @@ document.addEventListener('DOMContentLoaded', async function () {
     }
     // --- Handle Auth Callback (if this was a redirect from login) ---
     // This might trigger another auth check, but it's quick.
-    handleAuthCallback();
+    handleAuthCallback(isAuthenticated);
     // --- Fetch Initial Election Status and User Vote Status (if authenticated) ---
     let electionStatusFetched = false;
     if (isAuthenticated) {
         try {
-            const statusResponse = await ElectionAPI.getElectionStatus();
+            const statusResponse = boot ? boot.election : await ElectionAPI.getElectionStatus();
             window.State.electionOpen = statusResponse.is_open !== undefined ? statusResponse.is_open : true;
             window.State.electionStartTime = statusResponse.start_time || null;
             window.State.electionEndTime = statusResponse.end_time || null;
@@ -152,16 +196,20 @@ document.addEventListener('DOMContentLoaded', async function () {
             let displayText = '';
             let cssClass = '';
 
-            if (!startTime || !endTime) {
+            if (!startTime) {
                 displayText = '<i class="fas fa-exclamation-triangle"></i> <span data-i18n="core.noElectionScheduled">No election scheduled</span>';
                 cssClass = 'warning';
             } else if (now < startTime) {
                 const timeDiff = startTime - now;
                 displayText = `<i class="fas fa-clock"></i> <span data-i18n="core.opensIn">Opens in</span> ${formatCountdown(timeDiff)}`;
                 cssClass = 'warning';
-            } else if (now >= endTime) {
+            } else if (endTime && now >= endTime) {
                 displayText = '<i class="fas fa-lock"></i> <span data-i18n="electionIsClosed">Election Closed</span>';
                 cssClass = 'closed';
+            } else if (!endTime) {
+                // Opened by an admin without a scheduled end
+                displayText = '<i class="fas fa-lock-open"></i> <span data-i18n="electionIsOpen">Election is open</span>';
+                cssClass = 'open';
             } else {
                 const timeDiff = endTime - now;
                 displayText = `<i class="fas fa-clock"></i> <span data-i18n="core.closesIn">Closes in</span> ${formatCountdown(timeDiff)}`;
@@ -184,6 +232,14 @@ document.addEventListener('DOMContentLoaded', async function () {
             }, 1000);
         }
         updateVotingTabContent();
+        // --- Subscribe to pushed status transitions and turnout instead of re-requesting ---
+        if (typeof ElectionEvents !== 'undefined') {
+            ElectionEvents.on('status', applyElectionStatusEvent);
+            if (typeof ResultsModule !== 'undefined' && ResultsModule.subscribeToEvents) {
+                ResultsModule.subscribeToEvents();
+            }
+            ElectionEvents.connect();
+        }
         const adminTabBtn = document.getElementById('adminTabBtn');
         if (adminTabBtn && window.State.currentUser && window.State.currentUser.isAdmin) {
             adminTabBtn.classList.remove('hidden-by-status');
@@ -287,11 +343,14 @@ document.addEventListener('DOMContentLoaded', async function () {
                 const response = await ElectionAPI.scheduleElection(startISO, endISO);
                 if (response.message) {
                     Utils.showMessage('<span data-i18n="core.scheduleSuccess">Election schedule updated successfully!</span>', 'success');
-                    const statusResponse = await ElectionAPI.getElectionStatus();
-                    window.State.electionOpen = statusResponse.is_open !== undefined ? statusResponse.is_open : false;
-                    window.State.electionStartTime = statusResponse.start_time || null;
-                    window.State.electionEndTime = statusResponse.end_time || null;
-                    updateElectionStatusDisplay();
+                    // The new status arrives as a pushed 'status' event; only re-request without the stream
+                    if (typeof ElectionEvents === 'undefined' || !ElectionEvents.source) {
+                        const statusResponse = await ElectionAPI.getElectionStatus();
+                        window.State.electionOpen = statusResponse.is_open !== undefined ? statusResponse.is_open : false;
+                        window.State.electionStartTime = statusResponse.start_time || null;
+                        window.State.electionEndTime = statusResponse.end_time || null;
+                        updateElectionStatusDisplay();
+                    }
                 } else {
                     Utils.showMessage(`<span data-i18n="core.scheduleFailed">Failed to set schedule</span>: ${response.message || 'Unknown error'}`, 'error');
                 }
@@ -394,12 +453,14 @@ function showInstructionsPopup() {
 }
 // --- END NEW FUNCTION ---
 
-// --- Authentication Callback Handler (unchanged) ---
-function handleAuthCallback() {
+// --- Authentication Callback Handler ---
+function handleAuthCallback(alreadyAuthenticated = false) {
     const urlParams = new URLSearchParams(window.location.search);
     const authenticated = urlParams.get('authenticated');
     console.log("Handling auth callback. Authenticated param:", authenticated);
-    if (authenticated === 'true') {
+    if (authenticated === 'true' && alreadyAuthenticated) {
+        window.history.replaceState({}, document.title, window.location.pathname); // Session already loaded
+    } else if (authenticated === 'true') {
         console.log("Redirected from Google OAuth2, re-checking auth status...");
         AuthModule.checkAuthStatus().then((isAuth) => {
              console.log("Auth check after callback. Is authenticated:", isAuth);
@@ -436,8 +497,8 @@ const UIController = {
         selectedContent.style.display = 'block';
         console.log(`Successfully switched to tab: ${tabName}`);
         if (tabName === 'results') {
-            if (typeof ResultsModule !== 'undefined' && ResultsModule.renderResults) {
-                ResultsModule.renderResults();
+            if (typeof ResultsModule !== 'undefined' && ResultsModule.showResults) {
+                ResultsModule.showResults();
             } else {
                 console.warn("ResultsModule or renderResults not available.");
             }
@@ -545,13 +606,30 @@ function formatCountdown(ms) {
 }
 
 // --- Helper Function: Update Election Status Display (for Timer) ---
+// --- Apply a status pushed over /api/events (open/close, schedule changes) ---
+function applyElectionStatusEvent(status) {
+    const wasOpen = window.State.electionOpen;
+    window.State.electionOpen = !!status.is_open;
+    window.State.electionStartTime = status.start_time || null;
+    window.State.electionEndTime = status.end_time || null;
+    updateElectionStatusDisplay();
+    if (wasOpen !== window.State.electionOpen) {
+        console.log("Election status changed (pushed). Election Open:", window.State.electionOpen);
+        updateVotingTabContent();
+        const activeTab = document.querySelector('.tab.active');
+        if (!window.State.electionOpen && activeTab && activeTab.dataset.tab === 'vote') {
+            UIController.switchTab('info');
+        }
+    }
+}
+
 function updateElectionStatusDisplay() {
     const electionStatus = document.getElementById('electionStatus');
     if (!electionStatus) return;
     const startTime = window.State.electionStartTime ? new Date(window.State.electionStartTime) : null;
     const endTime = window.State.electionEndTime ? new Date(window.State.electionEndTime) : null;
     const now = new Date();
-    if (!startTime || !endTime) {
+    if (!startTime) {
         electionStatus.innerHTML = '<i class="fas fa-exclamation-triangle"></i> <span data-i18n="core.noElectionScheduled">No election scheduled</span>';
         electionStatus.classList.remove('open', 'closed', 'warning');
         electionStatus.classList.add('warning');
@@ -562,9 +640,13 @@ function updateElectionStatusDisplay() {
             const timeDiff = startTime - now;
             displayText = `<i class="fas fa-clock"></i> <span data-i18n="core.opensIn">Opens in</span> ${formatCountdown(timeDiff)}`;
             cssClass = 'warning';
-        } else if (now >= endTime) {
+        } else if (endTime && now >= endTime) {
             displayText = '<i class="fas fa-lock"></i> <span data-i18n="electionIsClosed">Election Closed</span>';
             cssClass = 'closed';
+        } else if (!endTime) {
+            // Opened by an admin without a scheduled end
+            displayText = '<i class="fas fa-lock-open"></i> <span data-i18n="electionIsOpen">Election is open</span>';
+            cssClass = 'open';
         } else {
             const timeDiff = endTime - now;
             displayText = `<i class="fas fa-clock"></i> <span data-i18n="core.closesIn">Closes in</span> ${formatCountdown(timeDiff)}`;
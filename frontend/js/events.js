@@ -0,0 +1,55 @@
+// events.js - Server-sent events: election status transitions and turnout pushed by /api/events
+const ElectionEvents = {
+    source: null,
+    handlers: {},
+    // --- Register a handler for 'status' or 'turnout' events ---
+    on: function (eventType, handler) {
+        (this.handlers[eventType] = this.handlers[eventType] || []).push(handler);
+        if (this.source) {
+            this.source.addEventListener(eventType, this._dispatch);
+        }
+    },
+    // --- Open the stream (idempotent). The browser reconnects automatically after drops ---
+    connect: function () {
+        if (this.source || typeof EventSource === 'undefined') {
+            return;
+        }
+        this.source = new EventSource('/api/events', { withCredentials: true });
+        Object.keys(this.handlers).forEach(eventType => {
+            this.source.addEventListener(eventType, this._dispatch);
+        });
+        this.source.onerror = () => {
+            console.warn('Election event stream interrupted; the browser will retry.');
+        };
+        console.log('Subscribed to election events.');
+    },
+    // --- Reopen after login/logout so the server sees the current session ---
+    reconnect: function () {
+        this.disconnect();
+        this.connect();
+    },
+    disconnect: function () {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    },
+    _dispatch: function (event) {
+        let data = null;
+        try {
+            data = JSON.parse(event.data);
+        } catch (e) {
+            console.error('Invalid election event payload:', e);
+            return;
+        }
+        (ElectionEvents.handlers[event.type] || []).forEach(handler => {
+            try {
+                handler(data);
+            } catch (e) {
+                console.error(`Error handling '${event.type}' event:`, e);
+            }
+        });
+    }
+};
+
+window.ElectionEvents = ElectionEvents;
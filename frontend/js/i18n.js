@@ -15,6 +15,33 @@ const I18nModule = {
         }
     },
 
+    // --- Fetch One Language (other languages are only loaded when the user switches to them) ---
+    fetchLanguage: async function(lang) {
+        try {
+            const response = await fetch(`/api/translations/${encodeURIComponent(lang)}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            translations[lang] = await response.json();
+        } catch (error) {
+            console.error(`Failed to fetch '${lang}' translations from backend:`, error);
+        }
+    },
+
+    // --- Remember the chosen language (the cookie lets the server pre-render the page in it) ---
+    saveLanguagePreference: function(lang) {
+        localStorage.setItem('preferredLanguage', lang);
+        document.cookie = `preferredLanguage=${encodeURIComponent(lang)}; path=/; max-age=31536000; SameSite=Lax`;
+    },
+
+    // --- Make sure a language's translations are loaded (the bootstrap only brings the initial one) ---
+    ensureLanguage: async function(lang) {
+        if (!translations[lang]) {
+            await this.fetchLanguage(lang);
+        }
+        return Boolean(translations[lang]);
+    },
+
 // --- Switch Language ---
 switchLanguage: function(lang) {
     if (lang && translations && typeof translations === 'object' && translations[lang]) {
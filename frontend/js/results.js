@@ -1,6 +1,43 @@
 // results.js - Results fetching, rendering, and winner popup logic (modernized & mobile-friendly)
 const ResultsModule = {
     currentChart: null,
+    // Last rendered state; pushed events mark it stale instead of re-fetching on every tab switch
+    lastIsOpen: null,
+    lastTotalVotes: null,
+    lastTotalCandidates: 0,
+    stale: true,
+    // --- Show Results (tab switch): re-fetch only if something changed since the last render ---
+    showResults: function () {
+        const subscribed = typeof ElectionEvents !== 'undefined' && ElectionEvents.source;
+        if (this.stale || !subscribed) {
+            this.renderResults();
+        }
+    },
+    // --- Subscribe to status transitions and turnout pushed by the server ---
+    subscribeToEvents: function () {
+        if (typeof ElectionEvents === 'undefined') return;
+        ElectionEvents.on('status', (status) => {
+            if (this.lastIsOpen !== null && status.is_open !== this.lastIsOpen) {
+                this.stale = true;
+                const resultsTab = document.getElementById('results');
+                if (resultsTab && resultsTab.classList.contains('active')) {
+                    this.renderResults();
+                }
+            }
+        });
+        ElectionEvents.on('turnout', (turnout) => {
+            // Only sent to viewers allowed to see it; counts stay hidden while voting is open
+            if (turnout.isOpen || this.lastIsOpen !== false || turnout.totalVotes === this.lastTotalVotes) return;
+            this.stale = true;
+            this.lastTotalVotes = turnout.totalVotes;
+            const totalVotesEl = document.getElementById('votesCastStat');
+            const voterTurnoutEl = document.getElementById('turnoutRateStat');
+            if (totalVotesEl) totalVotesEl.textContent = turnout.totalVotes.toLocaleString();
+            if (voterTurnoutEl && this.lastTotalCandidates > 0) {
+                voterTurnoutEl.textContent = `${Math.round((turnout.totalVotes / this.lastTotalCandidates) * 100)}%`;
+            }
+        });
+    },
     // --- Render Results ---
     renderResults: async function () {
         const resultsContent = document.getElementById('resultsContent');
@@ -28,6 +65,10 @@ const ResultsModule = {
             if (totalCandidatesEl) totalCandidatesEl.textContent = totalCandidates;
             // --- Conditional Display Logic ---
             const isOpen = !!resultsData.isOpen;
+            this.lastIsOpen = isOpen;
+            this.lastTotalVotes = totalVotes;
+            this.lastTotalCandidates = totalCandidates;
+            this.stale = false;
             if (voterTurnoutEl) {
                 if (isOpen) {
                     voterTurnoutEl.innerHTML = '<span data-i18n="electionStatus">Elections are open</span>';
@@ -66,6 +66,14 @@ const Utils = {
         }
     },
 
+    // --- Placeholder for a candidate photo that failed to load (inline SVG with the initial, no network) ---
+    photoPlaceholder: function(name) {
+        const initial = (name || '').trim().charAt(0).toUpperCase().replace(/[<>&"']/g, '') || '?';
+        const svg = `<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100"><rect width="100" height="100" fill="#cccccc"/>` +
+            `<text x="50" y="50" dy=".35em" text-anchor="middle" font-family="sans-serif" font-size="40" fill="#666666">${initial}</text></svg>`;
+        return 'data:image/svg+xml;charset=utf-8,' + encodeURIComponent(svg);
+    },
+
     // --- Sort Candidates Utility ---
     sortCandidates: function(candidatesArray, criteria) {
         return candidatesArray.sort((a, b) => {